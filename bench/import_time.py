@@ -0,0 +1,73 @@
+"""Start-up cost of ``import trains.env``.
+
+Run from the repository root::
+
+    PYTHONPATH=src python bench/import_time.py [--runs N] [--max-ms MS]
+
+Each run imports the package in a fresh interpreter and the median time
+over a bare interpreter start is reported, along with any heavy
+dependency the import pulled in. With ``--max-ms`` the script exits
+non-zero when the median is over budget or a heavy dependency was
+loaded, so it can guard start-up latency in CI.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+MODULE = "trains.env"
+HEAVY = (
+    "numpy",
+    "pydantic",
+    "torch",
+    "torch_geometric",
+    "networkx",
+    "jsonschema",
+    "trains.ser",
+)
+
+
+def run(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True)
+    return time.perf_counter() - start
+
+
+def loaded_heavy(module: str) -> list[str]:
+    code = (
+        f"import sys, json, {module}; "
+        f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True
+    )
+    return json.loads(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--max-ms", type=float, default=None)
+    parser.add_argument("--module", default=MODULE)
+    args = parser.parse_args()
+
+    bare = [run("pass") for _ in range(args.runs)]
+    imported = [run(f"import {args.module}") for _ in range(args.runs)]
+    cost = (statistics.median(imported) - statistics.median(bare)) * 1e3
+    heavy = loaded_heavy(args.module)
+
+    print(f"import {args.module}: {cost:.1f} ms over a bare interpreter")
+    print(f"heavy modules loaded: {', '.join(heavy) or 'none'}")
+
+    if args.max_ms is not None and (cost > args.max_ms or heavy):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
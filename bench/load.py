@@ -0,0 +1,87 @@
+"""Time loading a layout file through each ``System`` entry point.
+
+Run from the repository root::
+
+    PYTHONPATH=src python bench/load.py [--switches N] [--trains N]
+
+A ladder layout of the requested size is generated and written to a
+temporary file, then loaded with ``json.load`` plus ``from_json`` (the
+old path), ``from_file`` with validation, ``from_file`` trusted and
+``from_file`` from a warm binary cache. The topology cache is cleared
+before every load so each one builds the layout from scratch.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+
+from trains.env import System
+from trains.env.generate import generate
+from trains.env.topology import Topology
+
+
+def best_of(repeat: int, load) -> float:
+    times = []
+    for _ in range(repeat):
+        Topology._cache.clear()
+        gc.collect()
+        start = time.perf_counter()
+        load()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--family", default="ladder")
+    parser.add_argument("--switches", type=int, default=50_000)
+    parser.add_argument("--trains", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    system = generate(
+        args.family, args.switches, trains=args.trains, seed=0
+    )
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(system.to_json(), f)
+        path = f.name
+    del system
+
+    def from_json():
+        with open(path) as f:
+            return System.from_json(json.load(f))
+
+    cache = path + ".bin"
+    System.from_file(path, cache=cache)
+
+    try:
+        size = os.path.getsize(path)
+        print(f"{args.family}, {args.switches} switches, {size / 1e6:.1f} MB")
+        baseline = None
+        for name, load in (
+            ("json.load + from_json", from_json),
+            ("from_file", lambda: System.from_file(path)),
+            (
+                "from_file(validate=False)",
+                lambda: System.from_file(path, validate=False),
+            ),
+            (
+                "from_file(cache=...)",
+                lambda: System.from_file(path, cache=cache),
+            ),
+        ):
+            seconds = best_of(args.repeat, load)
+            baseline = baseline or seconds
+            print(f"{name:<28}{seconds:8.3f} s  {baseline / seconds:5.2f}x")
+    finally:
+        os.unlink(path)
+        os.unlink(cache)
+
+
+if __name__ == "__main__":
+    main()
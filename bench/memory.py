@@ -0,0 +1,65 @@
+"""Per-object memory of the core ``trains.env`` classes.
+
+Run from the repository root::
+
+    PYTHONPATH=src python bench/memory.py [--count N]
+
+Each class is instantiated ``N`` times under ``tracemalloc`` and the
+allocated bytes per instance are printed, including objects an instance
+owns (the branches of a switch or dead end, the history of a train).
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import tracemalloc
+from typing import Callable
+
+from trains.env.branch import Branch
+from trains.env.deadend import DeadEnd
+from trains.env.switch import Switch
+from trains.env.track import Track
+from trains.env.train import Train
+
+
+def measure(make: Callable[[int], object], count: int) -> float:
+    """Bytes allocated per object by ``make``, net of the holding list."""
+    objects: list[object] = [None] * count
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        objects[i] = make(i)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    count = args.count
+    owner = Switch("S")
+    end = DeadEnd("D")
+    track = Track((owner.through, end.branch), 10.0)
+    owner.through.track = track
+    end.branch.track = track
+
+    cases: dict[str, Callable[[int], object]] = {
+        "Branch": lambda i: Branch(owner, "through"),
+        "Switch (+3 branches)": lambda i: Switch(i),
+        "DeadEnd (+1 branch)": lambda i: DeadEnd(i),
+        "Track": lambda i: Track((owner.through, end.branch), 10.0),
+        "Train (+history)": lambda i: Train(i, owner.through, 1.0, 2.0, 1.0),
+    }
+
+    print(f"{'class':<24}{'bytes/object':>14}")
+    for name, make in cases.items():
+        print(f"{name:<24}{measure(make, count):>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compare ``VectorSystem`` with ``ProcessVectorSystem`` stepping.
+
+Run from the repository root::
+
+    PYTHONPATH=src python bench/pool.py [--envs N] [--workers N ...]
+
+A generated loop layout is stepped ``--steps`` times with random
+switch actions, in one process and then with each worker count given,
+synchronously and with ``step_async`` overlapping the next actions.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from trains.env.generate import generate
+from trains.env.pool import ProcessVectorSystem
+from trains.env.vector import VectorSystem
+
+
+def run(envs, steps: int, asynchronous: bool = False) -> float:
+    rng = np.random.default_rng(0)
+    shape = (envs.num_envs, envs.num_switches)
+    start = time.perf_counter()
+    actions = rng.random(shape) < 0.01
+    for _ in range(steps):
+        if asynchronous:
+            envs.step_async(actions, 1.0)
+            actions = rng.random(shape) < 0.01
+            envs.step_wait()
+        else:
+            envs.step(actions, 1.0)
+            actions = rng.random(shape) < 0.01
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--switches", type=int, default=200)
+    parser.add_argument("--envs", type=int, default=4096)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--start-method", default=None)
+    args = parser.parse_args()
+
+    system = generate("loop", args.switches, density=0.2, speed=0.5, seed=0)
+    baseline = run(VectorSystem(system, args.envs, 100), args.steps)
+    print(f"{args.envs} envs, {args.steps} steps")
+    print(f"{'VectorSystem':<24}{baseline:8.3f} s")
+    for workers in args.workers:
+        with ProcessVectorSystem(
+            system, args.envs, workers, 100, args.start_method
+        ) as envs:
+            for asynchronous in (False, True):
+                seconds = run(envs, args.steps, asynchronous)
+                name = f"{workers} workers"
+                if asynchronous:
+                    name += " async"
+                speedup = baseline / seconds
+                print(f"{name:<24}{seconds:8.3f} s  {speedup:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Time stepping with and without a ``TrajectoryRecorder`` attached.
+
+Run from the repository root::
+
+    PYTHONPATH=src python bench/record.py [--switches N] [--trains N]
+
+A generated loop layout of the requested size is stepped ``--steps``
+times bare, then again while recording into a temporary directory.
+Trains placed on sidings are parked, since they would run into the dead
+end. Both timings are printed with the recording's size on disk.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from trains.env import System
+from trains.env.deadend import DeadEnd
+from trains.env.generate import generate
+from trains.env.record import TrajectoryRecorder
+
+
+def run(system, steps: int, dt: float) -> float:
+    start = time.perf_counter()
+    for _ in range(steps):
+        system.step(dt)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--switches", type=int, default=1_000)
+    parser.add_argument("--trains", type=int, default=10)
+    parser.add_argument("--steps", type=int, default=100_000)
+    parser.add_argument("--dt", type=float, default=0.5)
+    args = parser.parse_args()
+
+    generated = generate("loop", args.switches, trains=args.trains, seed=0)
+    for train in generated.trains:
+        if isinstance(train.head_branch.track.ends[1].parent, DeadEnd):
+            train.speed = 0.0
+    data = generated.to_json()
+
+    def system():
+        return System.from_json(data)
+
+    bare = run(system(), args.steps, args.dt)
+
+    with tempfile.TemporaryDirectory() as directory:
+        recorded = system()
+        with TrajectoryRecorder(directory, recorded) as recorder:
+            recorded.recorder = recorder
+            seconds = run(recorded, args.steps, args.dt)
+        size = sum(
+            os.path.getsize(os.path.join(directory, name))
+            for name in os.listdir(directory)
+        )
+
+    per_step = 1e6 / args.steps
+    print(f"{args.steps} steps, {args.trains} trains")
+    print(f"{'bare':<12}{bare:8.3f} s  {bare * per_step:7.2f} us/step")
+    print(
+        f"{'recorded':<12}{seconds:8.3f} s  {seconds * per_step:7.2f} us/step"
+        f"  {seconds / bare:5.2f}x  {size / 1e6:.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Benchmark suite over synthetic layouts at several scales.
+
+Run from the repository root::
+
+    PYTHONPATH=src python bench/run.py --sizes 100 1000 --output new.json
+    PYTHONPATH=src python bench/run.py --compare old.json new.json
+
+For every ``generate`` layout family and every size it times
+``System.from_json``, ``step``, a full ``detect_collisions`` pass and
+``set_switch_state``, and measures the memory held by the system.
+Results are written as JSON; ``--compare`` prints the ratio of every
+timing between two result files.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+from trains.env import System
+from trains.env.deadend import DeadEnd
+from trains.env.generate import FAMILIES, generate
+from trains.env.topology import Topology
+from trains.exceptions import SwitchOverlapError
+
+
+TRACK_LENGTH = 100.0
+TRAIN_LENGTH = 20.0
+METRICS = (
+    "from_json_s",
+    "step_s",
+    "detect_collisions_s",
+    "set_switch_state_s",
+)
+
+
+def best_of(repeat: int, run: Callable[[], Any]) -> float:
+    times = []
+    for _ in range(repeat):
+        # Without this every ``from_json`` after the first would reuse
+        # the cached topology instead of building the layout.
+        Topology._cache.clear()
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench_layout(
+    family: str,
+    size: int,
+    density: float,
+    steps: int,
+    dt: float,
+    repeat: int,
+) -> dict[str, Any]:
+    # Trains on dead-end lines must not reach the end during the timed
+    # steps; on the loop's ring they circulate and cross a few nodes.
+    budget = steps * dt
+    slow = (TRACK_LENGTH - TRAIN_LENGTH) / 2 / budget
+    generated = generate(
+        family,
+        size,
+        track_length=TRACK_LENGTH,
+        density=density,
+        train_length=TRAIN_LENGTH,
+        speed=slow,
+        seed=0,
+    )
+    if family == "loop":
+        for train in generated.trains:
+            end = train.head_branch.track.ends[1]
+            if not isinstance(end.parent, DeadEnd):
+                train.speed = 3 * TRACK_LENGTH / budget
+    data = generated.to_json()
+    del generated
+
+    from_json_s = best_of(repeat, lambda: System.from_json(data))
+
+    gc.collect()
+    tracemalloc.start()
+    system = System.from_json(data)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    snapshot = system.snapshot()
+
+    def run_steps():
+        system.restore(snapshot)
+        for _ in range(steps):
+            system.step(dt)
+
+    step_s = best_of(repeat, run_steps) / steps
+
+    occupancy = system.occupancy
+
+    def detect_all():
+        occupancy.changed.update(occupancy.track_trains)
+        system.detect_collisions()
+
+    detect_collisions_s = best_of(repeat, detect_all)
+
+    states = [
+        (switch.tag, system.switch_state(switch)) for switch in system.switches
+    ]
+    blocked = 0
+
+    def flip_all():
+        nonlocal blocked
+        blocked = 0
+        for tag, state in states:
+            try:
+                system.set_switch_state(tag, state)
+            except SwitchOverlapError:
+                blocked += 1
+
+    set_switch_state_s = best_of(repeat, flip_all) / max(len(states), 1)
+
+    return {
+        "family": family,
+        "size": size,
+        "switches": len(system.switches),
+        "tracks": len(system.topology.tracks),
+        "trains": len(system.trains),
+        "blocked_switches": blocked,
+        "from_json_s": from_json_s,
+        "step_s": step_s,
+        "detect_collisions_s": detect_collisions_s,
+        "set_switch_state_s": set_switch_state_s,
+        "memory_bytes": memory,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.decode().strip()
+
+
+def compare(old_path: Path, new_path: Path):
+    old = json.loads(old_path.read_text())
+    new = json.loads(new_path.read_text())
+    baseline = {(r["family"], r["size"]): r for r in old["results"]}
+
+    print(f"{'layout':<16}" + "".join(f"{m:>22}" for m in METRICS))
+    for result in new["results"]:
+        key = (result["family"], result["size"])
+        if key not in baseline:
+            continue
+        ratios = [result[m] / baseline[key][m] for m in METRICS]
+        print(
+            f"{key[0] + ' ' + str(key[1]):<16}"
+            + "".join(f"{r:>21.2f}x" for r in ratios)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--families", nargs="+", default=list(FAMILIES), choices=FAMILIES
+    )
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100, 1000])
+    parser.add_argument("--density", type=float, default=0.5)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--dt", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument(
+        "--compare", nargs=2, type=Path, metavar=("OLD", "NEW")
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = []
+    for family in args.families:
+        for size in args.sizes:
+            result = bench_layout(
+                family, size, args.density, args.steps, args.dt, args.repeat
+            )
+            results.append(result)
+            print(
+                f"{family:<8}{size:>8}  "
+                f"step {result['step_s'] * 1e3:8.3f} ms  "
+                f"from_json {result['from_json_s'] * 1e3:8.1f} ms",
+                file=sys.stderr,
+            )
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "density": args.density,
+            "steps": args.steps,
+            "dt": args.dt,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        args.output.write_text(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,11 +26,12 @@ def main():
     for i in range(steps):
         if i in (5, 12):
             try:
-                system.set_switch_state("B", not system.node_map["B"].state)
+                system.set_switch_state("B", not system.get_switch_state("B"))
             except Exception:
                 pass
 
-        print(f"step={i:02d}  B={system.node_map['B'].state}  {where(train)}")
+        state = system.get_switch_state("B")
+        print(f"step={i:02d}  B={state}  {where(train)}")
 
         system.step(dt)
 
@@ -0,0 +1,418 @@
+"""Struct-of-arrays stepping engine for a :class:`System`."""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from trains.env.compiled import DEAD_END, CompiledTopology
+from trains.env.deadend import DeadEndCollision
+from trains.env.status import StepStatus, TrainStatus
+from trains.env.switch import SwitchPassthroughError
+from trains.exceptions import SwitchOverlapError, TrainCollisionError
+
+
+if TYPE_CHECKING:
+    from trains.env.system import System
+    from trains.env.track import Track
+    from trains.env.train import Train
+
+
+def push_heads(
+    history: np.ndarray,
+    history_len: np.ndarray,
+    rows: np.ndarray,
+    branches: np.ndarray,
+) -> np.ndarray:
+    """Prepend ``branches`` to the history of ``rows``, growing if full."""
+    if rows.size and history_len[rows].max() >= history.shape[1]:
+        padding = np.full_like(history, -1)
+        history = np.concatenate([history, padding], axis=1)
+    history[rows, 1:] = history[rows, :-1]
+    history[rows, 0] = branches
+    history_len[rows] += 1
+    return history
+
+
+def advance(
+    topology: CompiledTopology,
+    switch_state: np.ndarray,
+    history: np.ndarray,
+    history_len: np.ndarray,
+    head_distance: np.ndarray,
+    distance: np.ndarray,
+    switch_offset: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Move every train ``distance`` along its route in one batch.
+
+    Mirrors ``Train.step``: each pass of the loop moves all trains that
+    still have distance left either to their new position on the current
+    track or across exactly one node. Trains that hit a dead end or a
+    wrong-way switch stop at the end of their track.
+
+    ``switch_offset`` gives each train the index in ``switch_state`` of
+    its system's first switch, so one call can step many systems.
+
+    Returns the (possibly widened) history and a per-train status holding
+    ``0`` or the transition-table code that stopped the train.
+    """
+    status = np.zeros(len(head_distance), dtype=np.int64)
+    active = np.flatnonzero(distance > 0)
+
+    while active.size:
+        head = history[active, 0]
+        remaining = topology.branch_length[head] - head_distance[active]
+        step = distance[active]
+
+        stays = step < remaining
+        staying = active[stays]
+        head_distance[staying] += step[stays]
+        distance[staying] = 0.0
+
+        crosses = ~stays
+        crossing = active[crosses]
+        if not crossing.size:
+            break
+        distance[crossing] = step[crosses] - remaining[crosses]
+        head = head[crosses]
+
+        switch = topology.exit_switch[head]
+        has_switch = switch >= 0
+        if switch_offset is not None:
+            switch = switch + switch_offset[crossing]
+        state = np.zeros(len(head), dtype=np.int64)
+        state[has_switch] = switch_state[switch[has_switch]]
+        next_head = topology.exit_table[head, state]
+
+        blocked = next_head < 0
+        stopped = crossing[blocked]
+        head_distance[stopped] = topology.branch_length[head[blocked]]
+        distance[stopped] = 0.0
+        status[stopped] = next_head[blocked]
+
+        moved = crossing[~blocked]
+        history = push_heads(history, history_len, moved, next_head[~blocked])
+        head_distance[moved] = 0.0
+        active = moved[distance[moved] > 0]
+
+    return history, status
+
+
+def covered_lengths(
+    topology: CompiledTopology,
+    history: np.ndarray,
+    history_len: np.ndarray,
+    head_distance: np.ndarray,
+) -> np.ndarray:
+    """Distance from the head to the far side of each history entry.
+
+    Column ``j`` is ``head_distance`` plus the lengths of the tracks of
+    entries ``1..j``, summed in the same order as the object model.
+    """
+    width = history.shape[1]
+    valid = np.arange(1, width) < history_len[:, None]
+    segments = np.where(valid, topology.branch_length[history[:, 1:]], 0.0)
+    return np.cumsum(
+        np.concatenate([head_distance[:, None], segments], axis=1), axis=1
+    )
+
+
+def trim(
+    topology: CompiledTopology,
+    history: np.ndarray,
+    history_len: np.ndarray,
+    head_distance: np.ndarray,
+    length: np.ndarray,
+):
+    """Drop history entries behind the tail, like ``Train.trim``."""
+    width = history.shape[1]
+    if width < 2:
+        return
+    covered = covered_lengths(topology, history, history_len, head_distance)
+    valid = np.arange(1, width) < history_len[:, None]
+    needed = valid & (covered[:, :-1] < length[:, None])
+    history_len[:] = 1 + needed.sum(axis=1)
+    history[np.arange(width) >= history_len[:, None]] = -1
+
+
+def collision_pairs(
+    topology: CompiledTopology,
+    history: np.ndarray,
+    history_len: np.ndarray,
+    head_distance: np.ndarray,
+    length: np.ndarray,
+    track_offset: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find overlapping trains, returning ``(train_a, train_b, track)``.
+
+    Histories must be trimmed so that every entry is occupied. Pairs are
+    ordered like ``System.detect_collisions``: by first appearance of the
+    track, then by train index.
+
+    ``track_offset`` is added to each train's track ids so that trains of
+    different systems never share a track; returned tracks include it.
+    """
+    width = history.shape[1]
+    covered = covered_lengths(topology, history, history_len, head_distance)
+    train, col = np.nonzero(np.arange(width) < history_len[:, None])
+    branch = history[train, col]
+    local_track = topology.branch_track[branch]
+    track = local_track
+    n_tracks = len(topology.tracks)
+    if track_offset is not None and track_offset.size:
+        track = local_track + track_offset[train]
+        n_tracks += int(track_offset.max())
+
+    # A train occupies each track once in the object model; keep the
+    # entry closest to the head. ``position`` preserves the original
+    # train-major order for ranking tracks by first appearance.
+    _, position = np.unique(train * n_tracks + track, return_index=True)
+    train, col = train[position], col[position]
+    branch, track = branch[position], track[position]
+
+    track_len = topology.track_length[local_track[position]]
+    train_len = length[train]
+    hd = head_distance[train]
+    tail_lo = track_len - (train_len - covered[train, col - 1])
+    lo = np.where(col == 0, np.maximum(0.0, hd - train_len), tail_lo)
+    hi = np.where(col == 0, hd, track_len)
+    forward = topology.branch_forward[branch]
+    lo, hi = (
+        np.where(forward, lo, track_len - hi),
+        np.where(forward, hi, track_len - lo),
+    )
+
+    order = np.lexsort((lo, track))
+    train, track, lo, hi = train[order], track[order], lo[order], hi[order]
+    position = position[order]
+
+    # Every later interval on the same track starts at or after this one,
+    # so a pair overlaps exactly when the later one starts before this
+    # one ends.
+    ends = np.searchsorted(track, track, side="right")
+    count = ends - np.arange(len(track)) - 1
+    i = np.repeat(np.arange(len(track)), count)
+    starts = np.repeat(np.cumsum(count) - count, count)
+    j = i + 1 + np.arange(count.sum()) - starts
+    hit = lo[j] <= hi[i]
+    i, j = i[hit], j[hit]
+
+    train_a = np.minimum(train[i], train[j])
+    train_b = np.maximum(train[i], train[j])
+    pair_track = track[i]
+
+    track_rank = np.full(n_tracks, len(position), dtype=np.int64)
+    np.minimum.at(track_rank, track, position)
+    order = np.lexsort((train_b, train_a, track_rank[pair_track]))
+    return train_a[order], train_b[order], pair_track[order]
+
+
+def first_partners(
+    num_trains: int, train_a: np.ndarray, train_b: np.ndarray
+) -> np.ndarray:
+    """Each train's first collision partner in pair order, or ``-1``."""
+    rows = np.stack([train_a, train_b], axis=1).ravel()
+    others = np.stack([train_b, train_a], axis=1).ravel()
+    partner = np.full(num_trains, -1, dtype=np.int64)
+    _, first = np.unique(rows, return_index=True)
+    partner[rows[first]] = others[first]
+    return partner
+
+
+class ArraySystem:
+    """Struct-of-arrays mirror of a :class:`System` for fast stepping.
+
+    The layout comes from the topology's :class:`CompiledTopology`, which
+    is built once per topology, and train state is kept in arrays: a
+    head-first history of branch ids per train, ``head_distance``,
+    ``speed`` and ``length``. ``step`` advances every train in one
+    batched operation and behaves like ``System.step``, raising the same
+    exceptions with the same objects.
+
+    Histories are trimmed to the branches each train body covers after
+    every step. Call ``sync`` to write the state back to the system.
+    """
+
+    def __init__(self, system: System):
+        self.system = system
+        self.topology = system.topology.compiled
+
+        trains = system.trains
+        self.switch_state = np.array(system.switch_states, dtype=bool)
+        self.head_distance = np.array(
+            [train.head_distance for train in trains], dtype=np.float64
+        )
+        self.speed = np.array(
+            [train.speed for train in trains], dtype=np.float64
+        )
+        self.length = np.array(
+            [train.length for train in trains], dtype=np.float64
+        )
+
+        width = max((len(train.history) for train in trains), default=1)
+        self.history = np.full((len(trains), width), -1, dtype=np.int64)
+        self.history_len = np.zeros(len(trains), dtype=np.int64)
+        branch_index = self.topology.branch_index
+        for i, train in enumerate(trains):
+            ids = [branch_index[branch] for branch in train.history]
+            self.history[i, : len(ids)] = ids
+            self.history_len[i] = len(ids)
+        self._trim()
+        self._clean_state: tuple[np.ndarray, ...] | None = None
+
+    @property
+    def head(self) -> np.ndarray:
+        return self.history[:, 0]
+
+    def step(self, dt: float, pre_check: bool = True):
+        """Advance every train by ``dt``, like ``System.step``.
+
+        The check before moving is skipped when the train arrays still
+        hold the state the last clean check ran on, which is the case
+        between consecutive steps. ``pre_check=False`` skips it always.
+        """
+        if pre_check and not self._known_clean():
+            collisions = self.detect_collisions()
+            if collisions:
+                raise TrainCollisionError(collisions)
+
+        saved = (
+            self.history.copy(),
+            self.history_len.copy(),
+            self.head_distance.copy(),
+        )
+        self.history, status = advance(
+            self.topology,
+            self.switch_state,
+            self.history,
+            self.history_len,
+            self.head_distance,
+            dt * self.speed,
+        )
+
+        failed = np.flatnonzero(status)
+        if failed.size:
+            # The object model stops at the first failing train, leaving
+            # the trains after it unstepped.
+            first = failed[0]
+            self._restore_after(first, saved)
+            self._trim()
+            raise self._blocked_error(first, status[first])
+
+        self._trim()
+
+        if collisions := self.detect_collisions():
+            raise TrainCollisionError(collisions)
+        self._clean_state = tuple(array.copy() for array in self._state())
+
+    def step_status(self, dt: float) -> StepStatus:
+        """Non-raising ``step``, matching ``System.step_status``."""
+        self.history, status = advance(
+            self.topology,
+            self.switch_state,
+            self.history,
+            self.history_len,
+            self.head_distance,
+            dt * self.speed,
+        )
+        self._trim()
+
+        train_a, train_b, _ = self.collision_pairs()
+        partner = first_partners(len(status), train_a, train_b)
+        status[partner >= 0] = TrainStatus.COLLISION
+        return StepStatus(status, partner)
+
+    def set_switch_state(self, switch_tag: str | int, state: bool):
+        index = self.topology.switch_index[switch_tag]
+        overlapping = np.flatnonzero(
+            np.isin(self.history, (3 * index, 3 * index + 1, 3 * index + 2))
+            .any(axis=1)
+        )
+        if overlapping.size:
+            trains = self.system.trains
+            raise SwitchOverlapError(
+                self.topology.switches[index],
+                [trains[i] for i in overlapping],
+            )
+        self.switch_state[index] = state
+
+    def _state(self) -> tuple[np.ndarray, ...]:
+        """The arrays collisions depend on."""
+        return (
+            self.history,
+            self.history_len,
+            self.head_distance,
+            self.length,
+        )
+
+    def _known_clean(self) -> bool:
+        # The arrays are public and may be written to between steps, so
+        # compare them with copies kept after the last clean check; that
+        # costs far less than a collision check.
+        clean = self._clean_state
+        return clean is not None and all(
+            np.array_equal(kept, now)
+            for kept, now in zip(clean, self._state())
+        )
+
+    def collision_pairs(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return collision_pairs(
+            self.topology,
+            self.history,
+            self.history_len,
+            self.head_distance,
+            self.length,
+        )
+
+    def detect_collisions(self) -> list[tuple[Train, Train, Track]] | None:
+        train_a, train_b, track = self.collision_pairs()
+        if not track.size:
+            return None
+        trains = self.system.trains
+        tracks = self.topology.tracks
+        return [
+            (trains[a], trains[b], tracks[t])
+            for a, b, t in zip(train_a, train_b, track)
+        ]
+
+    def sync(self):
+        """Write switch states and train positions back to the system."""
+        self.system.switch_states[:] = self.switch_state.tolist()
+
+        branches = self.topology.branches
+        for i, train in enumerate(self.system.trains):
+            train.place(
+                deque(
+                    branches[b]
+                    for b in self.history[i, : self.history_len[i]]
+                ),
+                float(self.head_distance[i]),
+            )
+
+    def _trim(self):
+        trim(
+            self.topology,
+            self.history,
+            self.history_len,
+            self.head_distance,
+            self.length,
+        )
+
+    def _restore_after(
+        self, index: int, saved: tuple[np.ndarray, np.ndarray, np.ndarray]
+    ):
+        history, history_len, head_distance = saved
+        rest = slice(index + 1, None)
+        self.history[rest] = -1
+        self.history[rest, : history.shape[1]] = history[rest]
+        self.history_len[rest] = history_len[rest]
+        self.head_distance[rest] = head_distance[rest]
+
+    def _blocked_error(self, index: int, code: int) -> Exception:
+        topology = self.topology
+        arrival = topology.branches[topology.branch_other[self.head[index]]]
+        if code == DEAD_END:
+            return DeadEndCollision(arrival.parent)
+        return SwitchPassthroughError(arrival.parent, arrival)
@@ -8,6 +8,8 @@ if TYPE_CHECKING:
 
 
 class Tagged(Protocol):
+    __slots__ = ()
+
     tag: str
 
     def __str__(self) -> str:
@@ -15,7 +17,9 @@ class Tagged(Protocol):
 
 
 class Node(Tagged, Protocol):
+    __slots__ = ()
+
     @property
-    def branches(self) -> set[Branch]: ...
+    def branches(self) -> tuple[Branch, ...]: ...
 
-    def pass_through(self, from_: Branch) -> Branch: ...
+    def pass_through(self, from_: Branch, state: bool = False) -> Branch: ...
@@ -0,0 +1,277 @@
+"""Compiled binary layout files, loaded by memory-mapping.
+
+A binary layout holds everything ``System.from_json`` would build, as
+flat arrays: node tags, track ends as integer branch ids, track lengths,
+switch states, train state, and the :class:`CompiledTopology` arrays the
+array engines step on. Loading maps the file and builds the objects from
+those arrays, with no JSON parsing or validation. The arrays stay backed
+by the file, so processes mapping the same file share its pages.
+
+Branch ids follow ``CompiledTopology``: three per switch (approach,
+through, diverge) followed by one per dead end.
+
+The file is a magic string, the length of a JSON header, the header and
+then the arrays, each aligned to 64 bytes. The header records the format
+version, the array offsets and the SHA-256 of the JSON source the file
+was compiled from, which ``System.from_file`` checks before reusing it.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import tempfile
+from collections import deque
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from trains.env.compiled import CompiledTopology
+from trains.env.topology import Topology
+from trains.env.train import Train
+
+
+if TYPE_CHECKING:
+    from trains.env.system import System
+
+
+MAGIC = b"TRAINSL\x00"
+VERSION = 1
+ALIGN = 64
+
+_SUFFIXES = ("approach", "through", "diverging")
+_PREFIX = struct.Struct("<8sQ")
+
+
+class BinaryLayoutError(Exception):
+    def __init__(self, path: str | os.PathLike[str], reason: str):
+        self.path = path
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return (
+            f"Cannot read binary layout {os.fspath(self.path)}: "
+            f"{self.reason}"
+        )
+
+
+def _encode_strings(values) -> tuple[np.ndarray, np.ndarray]:
+    encoded = [str(value).encode() for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(blob: np.ndarray, offsets: np.ndarray) -> list[str]:
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [
+        data[start:end].decode() for start, end in zip(bounds, bounds[1:])
+    ]
+
+
+def _arrays(system: System) -> dict[str, np.ndarray]:
+    topology = system.topology
+    compiled = topology.compiled
+    branch_index = compiled.branch_index
+    trains = system.trains
+
+    arrays: dict[str, np.ndarray] = {}
+    for name, values in (
+        ("switch_tags", [switch.tag for switch in topology.switches]),
+        ("deadend_tags", [end.tag for end in topology.deadends]),
+        ("train_tags", [train.tag for train in trains]),
+    ):
+        arrays[name], arrays[name + "_offsets"] = _encode_strings(values)
+
+    arrays["switch_state"] = np.array(system.switch_states, dtype=bool)
+    arrays["track_ends"] = np.array(
+        [
+            (branch_index[track.ends[0]], branch_index[track.ends[1]])
+            for track in topology.tracks
+        ],
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    arrays["track_lengths"] = np.array(
+        [track.length for track in topology.tracks], dtype=np.float64
+    )
+
+    histories = [
+        [branch_index[branch] for branch in train.history] for train in trains
+    ]
+    arrays["train_history"] = np.array(
+        [b for history in histories for b in history], dtype=np.int64
+    )
+    arrays["train_history_offsets"] = np.zeros(len(trains) + 1, np.int64)
+    np.cumsum(
+        [len(history) for history in histories],
+        out=arrays["train_history_offsets"][1:],
+    )
+    for name in ("head_distance", "length", "speed"):
+        arrays["train_" + name] = np.array(
+            [getattr(train, name) for train in trains], dtype=np.float64
+        )
+
+    for name in CompiledTopology.ARRAYS:
+        arrays["compiled_" + name] = getattr(compiled, name)
+    return arrays
+
+
+def write(
+    system: System,
+    path: str | os.PathLike[str],
+    source_hash: str | None = None,
+):
+    """Write ``system`` as a binary layout file.
+
+    The file is written next to ``path`` and then moved into place, so
+    processes loading it concurrently never see a partial file.
+    """
+    arrays = _arrays(system)
+
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        entries[name] = [array.dtype.str, list(array.shape), offset]
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    header = json.dumps(
+        {"version": VERSION, "source_hash": source_hash, "arrays": entries}
+    ).encode()
+    start = -(-(_PREFIX.size + len(header)) // ALIGN) * ALIGN
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, len(header)))
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(start + entries[name][2])
+                f.write(array.tobytes())
+            f.truncate(start + offset)
+        # Readable by every worker, not just the writing user.
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class BinaryLayout:
+    """A memory-mapped binary layout file.
+
+    ``arrays`` maps names to read-only views into the file.
+    ``source_hash`` is the hash recorded when the file was written.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]):
+        self.path = path
+        try:
+            buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        except (OSError, ValueError) as e:
+            raise BinaryLayoutError(path, str(e)) from e
+        if buffer.size < _PREFIX.size:
+            raise BinaryLayoutError(path, "file is truncated")
+        magic, length = _PREFIX.unpack(buffer[: _PREFIX.size].tobytes())
+        if magic != MAGIC:
+            raise BinaryLayoutError(path, "not a binary layout")
+        try:
+            header = json.loads(
+                buffer[_PREFIX.size : _PREFIX.size + length].tobytes()
+            )
+            version = header["version"]
+            if version != VERSION:
+                raise BinaryLayoutError(
+                    path, f"format version {version} is not supported"
+                )
+            start = -(-(_PREFIX.size + length) // ALIGN) * ALIGN
+
+            self.source_hash: str | None = header["source_hash"]
+            self.arrays: dict[str, np.ndarray] = {}
+            for name, (dtype, shape, offset) in header["arrays"].items():
+                dtype = np.dtype(dtype)
+                count = int(np.prod(shape, dtype=np.int64))
+                begin = start + offset
+                end = begin + count * dtype.itemsize
+                if end > buffer.size:
+                    raise BinaryLayoutError(path, "file is truncated")
+                view = buffer[begin:end].view(dtype).reshape(shape)
+                self.arrays[name] = view
+        except (ValueError, KeyError, TypeError) as e:
+            # A damaged header: bad JSON or missing and malformed entries.
+            raise BinaryLayoutError(path, f"bad header: {e!r}") from e
+
+    def topology(self) -> Topology:
+        """The layout, shared with any live system built from it."""
+        arrays = self.arrays
+        switch_tags = _decode_strings(
+            arrays["switch_tags"], arrays["switch_tags_offsets"]
+        )
+        deadend_tags = _decode_strings(
+            arrays["deadend_tags"], arrays["deadend_tags_offsets"]
+        )
+        keys = [
+            (tag, suffix) for tag in switch_tags for suffix in _SUFFIXES
+        ] + [(tag, "branch") for tag in deadend_tags]
+
+        ends = arrays["track_ends"].tolist()
+        lengths = arrays["track_lengths"].tolist()
+        topology = Topology.from_key(
+            (
+                tuple(switch_tags),
+                tuple(deadend_tags),
+                tuple(
+                    (keys[a], keys[b], length)
+                    for (a, b), length in zip(ends, lengths)
+                ),
+            )
+        )
+        if topology._compiled is None:
+            topology._compiled_arrays = {
+                name: arrays["compiled_" + name]
+                for name in CompiledTopology.ARRAYS
+            }
+        return topology
+
+    def system(self) -> System:
+        """Build a fresh system at the state the file was written in."""
+        from trains.env.system import System
+
+        arrays = self.arrays
+        topology = self.topology()
+        branches = [
+            branch for node in topology.nodes for branch in node.branches
+        ]
+
+        tags = _decode_strings(
+            arrays["train_tags"], arrays["train_tags_offsets"]
+        )
+        history = arrays["train_history"].tolist()
+        bounds = arrays["train_history_offsets"].tolist()
+        trains = []
+        for i, (tag, head_distance, length, speed) in enumerate(
+            zip(
+                tags,
+                arrays["train_head_distance"].tolist(),
+                arrays["train_length"].tolist(),
+                arrays["train_speed"].tolist(),
+            )
+        ):
+            train_history = [
+                branches[b] for b in history[bounds[i] : bounds[i + 1]]
+            ]
+            train = Train(tag, train_history[0], head_distance, length, speed)
+            if len(train_history) > 1:
+                train._history = deque(train_history)
+                train._behind = train._measure_behind()
+            trains.append(train)
+
+        return System(topology, trains, arrays["switch_state"].tolist())
+
+
+def read(path: str | os.PathLike[str]) -> System:
+    """Load the system stored in a binary layout file."""
+    return BinaryLayout(path).system()
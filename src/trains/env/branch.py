@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import sys
 from typing import TYPE_CHECKING
 
 
@@ -11,14 +12,23 @@ if TYPE_CHECKING:
 class Branch:
     """A branch endpoint of a switch or dead end."""
 
+    __slots__ = ("parent", "_tag_suffix", "track", "_tag")
+
     def __init__(self, parent: Node, tag_suffix: str):
         self.parent = parent
         self._tag_suffix = tag_suffix
         self.track: Track | None = None
+        self._tag: str | None = None
 
     @property
-    def tag(self) -> str | int:
-        return str(self.parent.tag) + "_" + self._tag_suffix
+    def tag(self) -> str:
+        # Built on first use and interned, so branches of the same name
+        # across topologies share one string.
+        tag = self._tag
+        if tag is None:
+            tag = sys.intern(str(self.parent.tag) + "_" + self._tag_suffix)
+            self._tag = tag
+        return tag
 
     def __str__(self) -> str:
         return str(self.tag)
@@ -0,0 +1,135 @@
+"""Integer-indexed array form of a system's topology."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, Mapping
+
+import numpy as np
+
+from trains.env.status import TrainStatus
+
+
+if TYPE_CHECKING:
+    from trains.env.branch import Branch
+    from trains.env.deadend import DeadEnd
+    from trains.env.switch import Switch
+    from trains.env.track import Track
+
+
+# Codes stored in the transition table where a head cannot continue.
+DEAD_END = int(TrainStatus.DEAD_END)
+WRONG_WAY = int(TrainStatus.WRONG_WAY)
+
+
+class CompiledTopology:
+    """Immutable layout compiled into flat NumPy arrays.
+
+    Branches are numbered switch by switch (approach, through, diverge),
+    followed by one branch per dead end. Tracks are numbered in order of
+    first discovery from those branches.
+
+    ``exit_table[b, s]`` is the branch a train departs from after running
+    the full length of the track it entered from branch ``b``, given that
+    the switch at the far end is in state ``s``. It holds ``DEAD_END`` or
+    ``WRONG_WAY`` when the train cannot continue. ``exit_switch[b]`` is
+    the index of that far switch, or ``-1`` for a dead end.
+    """
+
+    ARRAYS = (
+        "track_length",
+        "branch_track",
+        "branch_other",
+        "branch_forward",
+        "branch_switch",
+        "branch_length",
+        "exit_table",
+        "exit_switch",
+    )
+
+    def __init__(
+        self,
+        switches: Iterable[Switch],
+        deadends: Iterable[DeadEnd],
+        arrays: Mapping[str, np.ndarray] | None = None,
+    ):
+        """Compile ``switches`` and ``deadends``.
+
+        ``arrays`` may hold every array named in ``ARRAYS`` as compiled
+        earlier for the same layout, for instance memory-mapped from a
+        binary layout file; they are then used as they are.
+        """
+        self.switches: list[Switch] = list(switches)
+        self.deadends: list[DeadEnd] = list(deadends)
+
+        self.branches: list[Branch] = []
+        for switch in self.switches:
+            self.branches += [switch.approach, switch.through, switch.diverge]
+        for deadend in self.deadends:
+            self.branches.append(deadend.branch)
+
+        self.branch_index: dict[Branch, int] = {
+            branch: i for i, branch in enumerate(self.branches)
+        }
+        self.switch_index: dict[str | int, int] = {
+            switch.tag: i for i, switch in enumerate(self.switches)
+        }
+
+        self.tracks: list[Track] = []
+        self.track_index: dict[Track, int] = {}
+        for branch in self.branches:
+            track = branch.track
+            if track is not None and track not in self.track_index:
+                self.track_index[track] = len(self.tracks)
+                self.tracks.append(track)
+
+        if arrays is not None:
+            for name in self.ARRAYS:
+                setattr(self, name, arrays[name])
+            return
+
+        n_branches = len(self.branches)
+        n_switches = len(self.switches)
+
+        self.track_length = np.array(
+            [track.length for track in self.tracks], dtype=np.float64
+        )
+        self.branch_track = np.full(n_branches, -1, dtype=np.int64)
+        self.branch_other = np.full(n_branches, -1, dtype=np.int64)
+        self.branch_forward = np.zeros(n_branches, dtype=bool)
+        self.branch_switch = np.full(n_branches, -1, dtype=np.int64)
+        self.branch_switch[: 3 * n_switches] = np.repeat(
+            np.arange(n_switches), 3
+        )
+
+        for i, branch in enumerate(self.branches):
+            track = branch.track
+            if track is None:
+                continue
+            self.branch_track[i] = self.track_index[track]
+            self.branch_other[i] = self.branch_index[track.other(branch)]
+            self.branch_forward[i] = track.ends[0] is branch
+
+        connected = self.branch_track >= 0
+        self.branch_length = np.zeros(n_branches, dtype=np.float64)
+        self.branch_length[connected] = self.track_length[
+            self.branch_track[connected]
+        ]
+
+        # Arriving at a switch branch: approach leads to through (state 0)
+        # or diverge (state 1); through and diverge lead back to approach
+        # only when the switch is set for them.
+        arrival_table = np.full((n_branches, 2), DEAD_END, dtype=np.int64)
+        for s in range(n_switches):
+            approach, through, diverge = 3 * s, 3 * s + 1, 3 * s + 2
+            arrival_table[approach] = (through, diverge)
+            arrival_table[through] = (approach, WRONG_WAY)
+            arrival_table[diverge] = (WRONG_WAY, approach)
+
+        self.exit_table = np.full((n_branches, 2), DEAD_END, dtype=np.int64)
+        self.exit_table[connected] = arrival_table[
+            self.branch_other[connected]
+        ]
+        self.exit_switch = np.full(n_branches, -1, dtype=np.int64)
+        self.exit_switch[connected] = self.branch_switch[
+            self.branch_other[connected]
+        ]
@@ -15,13 +15,12 @@ class DeadEndCollision(Exception):
 
 
 class DeadEnd(Node):
+    __slots__ = ("tag", "branch", "branches")
+
     def __init__(self, tag: str | int = "deadend"):
         self.tag = tag
         self.branch = Branch(self, "branch")
+        self.branches: tuple[Branch, ...] = (self.branch,)
 
-    @property
-    def branches(self) -> set[Branch]:
-        return {self.branch}
-
-    def pass_through(self, from_: Branch) -> Branch:
+    def pass_through(self, from_: Branch, state: bool = False) -> Branch:
         raise DeadEndCollision(self)
@@ -0,0 +1,251 @@
+"""Graph encoding of systems for PyTorch Geometric."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Sequence
+
+import numpy as np
+
+from trains.env.switch import Switch
+
+
+if TYPE_CHECKING:
+    from torch_geometric.data import Batch, Data
+
+    from trains.env.system import System
+    from trains.env.topology import Topology
+
+
+NODE_FEATURES = ("switch", "deadend", "interior", "state")
+EDGE_FEATURES = ("length", "approach", "through", "diverge", "occupancy")
+
+_STATE = NODE_FEATURES.index("state")
+_OCCUPANCY = EDGE_FEATURES.index("occupancy")
+
+
+class GraphEncoder:
+    """Static graph of a topology plus buffers for per-step features.
+
+    Every track is cut into ``edge_subdivisions`` equal segments joined
+    by interior nodes, and every segment becomes a pair of directed
+    edges. Nodes are the topology's switches, then its dead ends, then
+    the interior nodes track by track. Segment ``k`` of track ``t`` runs
+    from ``track.ends[0]`` towards ``track.ends[1]`` and owns edges
+    ``2 * (t * edge_subdivisions + k)`` in that direction and the next
+    one back.
+
+    ``edge_index`` and the static columns are computed once. ``encode``
+    only writes the dynamic ones: switch states on switch nodes, and on
+    each edge the fraction of its segment covered by trains running in
+    the edge's direction. Column names are in ``NODE_FEATURES`` and
+    ``EDGE_FEATURES``.
+
+    Encoders are built through ``Topology.encoder`` so that systems on
+    one layout share them. They hold no output buffers: ``encode`` and
+    ``encode_batch`` allocate new tensors unless given an earlier
+    result to overwrite, and ``System.encode`` keeps one per system.
+    """
+
+    def __init__(self, topology: Topology, edge_subdivisions: int = 1):
+        if edge_subdivisions < 1:
+            raise ValueError("edge_subdivisions must be at least 1")
+
+        self.topology = topology
+        self.edge_subdivisions = s = edge_subdivisions
+        self.num_switches = len(topology.switches)
+        self.track_index = {
+            track: t for t, track in enumerate(topology.tracks)
+        }
+
+        node_index = {node: i for i, node in enumerate(topology.nodes)}
+        n_interior = len(topology.tracks) * (s - 1)
+        self.num_nodes = len(topology.nodes) + n_interior
+        self.num_edges = 2 * s * len(topology.tracks)
+
+        self.node_x = np.zeros(
+            (self.num_nodes, len(NODE_FEATURES)), dtype=np.float32
+        )
+        self.node_x[: self.num_switches, 0] = 1.0
+        self.node_x[self.num_switches : len(topology.nodes), 1] = 1.0
+        self.node_x[len(topology.nodes) :, 2] = 1.0
+
+        self.edge_x = np.zeros(
+            (self.num_edges, len(EDGE_FEATURES)), dtype=np.float32
+        )
+        self.edge_index = np.empty((2, self.num_edges), dtype=np.int64)
+        self.segment_length = np.empty(s * len(topology.tracks))
+
+        for t, track in enumerate(topology.tracks):
+            first = len(topology.nodes) + t * (s - 1)
+            chain = [
+                node_index[track.ends[0].parent],
+                *range(first, first + s - 1),
+                node_index[track.ends[1].parent],
+            ]
+            segments = slice(2 * t * s, 2 * (t + 1) * s)
+            self.edge_index[0, segments] = [
+                n for k in range(s) for n in (chain[k], chain[k + 1])
+            ]
+            self.edge_index[1, segments] = [
+                n for k in range(s) for n in (chain[k + 1], chain[k])
+            ]
+            self.edge_x[segments, 0] = track.length / s
+            self.segment_length[t * s : (t + 1) * s] = track.length / s
+
+            # Edges leaving a switch carry the branch they leave by.
+            for edge, branch in (
+                (2 * t * s, track.ends[0]),
+                (2 * (t + 1) * s - 1, track.ends[1]),
+            ):
+                parent = branch.parent
+                if isinstance(parent, Switch):
+                    column = 1 + parent.branches.index(branch)
+                    self.edge_x[edge, column] = 1.0
+
+    def write(self, system: System, node_x: np.ndarray, edge_x: np.ndarray):
+        """Write the dynamic features of ``system`` into the given rows."""
+        if system.topology is not self.topology:
+            raise ValueError("System does not use this encoder's topology")
+
+        node_x[: self.num_switches, _STATE] = system.switch_states
+
+        occupancy = edge_x[:, _OCCUPANCY]
+        occupancy[:] = 0.0
+        edges, covered = self._occupancy(system)
+        if edges.size:
+            np.add.at(occupancy, edges, covered)
+            np.minimum(occupancy, 1.0, out=occupancy)
+
+    def _occupancy(self, system: System) -> tuple[np.ndarray, np.ndarray]:
+        """Edge ids and the covered fraction of their segments."""
+        s = self.edge_subdivisions
+        track_index = self.track_index
+        rows = []
+        for train in system.trains:
+            # Direction on the first visit, as for the intervals.
+            forward = {
+                branch.track: branch is branch.track.ends[0]
+                for branch in reversed(train.history)
+            }
+            for track, (lo, hi) in system._train_intervals(train).items():
+                rows.append((track_index[track], lo, hi, forward[track]))
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        track, lo, hi, forward = (np.array(column) for column in zip(*rows))
+        segment = track[:, None] * s + np.arange(s)
+        length = self.segment_length[segment]
+        start = np.arange(s) * length
+        covered = np.minimum(hi[:, None], start + length) - np.maximum(
+            lo[:, None], start
+        )
+        covered = np.clip(covered / length, 0.0, 1.0)
+        edges = 2 * segment + (~forward)[:, None]
+        hit = covered > 0
+        return edges[hit], covered[hit]
+
+    def encode(self, system: System, out: Data | None = None) -> Data:
+        """Encode ``system`` as a ``Data``.
+
+        With ``out``, an earlier result of this encoder, its tensors are
+        overwritten in place and it is returned instead of a new one.
+        """
+        if out is None:
+            out, node_x, edge_x = self._allocate(1, as_batch=False)
+        else:
+            node_x, edge_x = self._buffers(out, 1)
+        self.write(system, node_x, edge_x)
+        return out
+
+    def encode_batch(
+        self, systems: Sequence[System], out: Batch | None = None
+    ) -> Batch:
+        """Encode many systems on this topology into one ``Batch``.
+
+        ``out`` is reused as in ``encode`` and must hold as many graphs.
+        """
+        batch_size = len(systems)
+        if out is None:
+            out, node_x, edge_x = self._allocate(batch_size, as_batch=True)
+        else:
+            node_x, edge_x = self._buffers(out, batch_size)
+
+        n, e = self.num_nodes, self.num_edges
+        for i, system in enumerate(systems):
+            self.write(
+                system,
+                node_x[i * n : (i + 1) * n],
+                edge_x[i * e : (i + 1) * e],
+            )
+        return out
+
+    def _buffers(
+        self, out: Data, batch_size: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """The NumPy views of an earlier result's feature tensors."""
+        node_x = out.x.numpy()
+        edge_x = out.edge_attr.numpy()
+        if (
+            node_x.shape[0] != batch_size * self.num_nodes
+            or edge_x.shape[0] != batch_size * self.num_edges
+        ):
+            raise ValueError("out was not encoded by this encoder")
+        return node_x, edge_x
+
+    def _allocate(self, batch_size: int, as_batch: bool) -> tuple:
+        import torch
+        from torch_geometric.data import Batch, Data
+
+        n, e = self.num_nodes, self.num_edges
+        node_x = np.tile(self.node_x, (batch_size, 1))
+        edge_x = np.tile(self.edge_x, (batch_size, 1))
+        offsets = np.repeat(np.arange(batch_size) * n, e)
+        edge_index = np.tile(self.edge_index, batch_size) + offsets
+
+        # ``from_numpy`` shares memory, so writing the NumPy buffers
+        # updates the tensors in place.
+        x = torch.from_numpy(node_x)
+        edge_attr = torch.from_numpy(edge_x)
+        edge_index = torch.from_numpy(edge_index)
+
+        if not as_batch:
+            data = Data(x=x, edge_index=edge_index, edge_attr=edge_attr)
+            return data, node_x, edge_x
+
+        graphs = torch.arange(batch_size + 1)
+        batch = Batch(
+            x=x,
+            edge_index=edge_index,
+            edge_attr=edge_attr,
+            batch=torch.arange(batch_size).repeat_interleave(n),
+            ptr=graphs * n,
+        )
+        # What ``Batch.from_data_list`` records so that ``get_example``
+        # and ``to_data_list`` can split the batch again.
+        batch._num_graphs = batch_size
+        batch._slice_dict = {
+            "x": graphs * n,
+            "edge_index": graphs * e,
+            "edge_attr": graphs * e,
+        }
+        batch._inc_dict = {
+            "x": torch.zeros(batch_size, dtype=torch.long),
+            "edge_index": graphs[:-1] * n,
+            "edge_attr": torch.zeros(batch_size, dtype=torch.long),
+        }
+        return batch, node_x, edge_x
+
+
+def encode_batch(
+    systems: Sequence[System],
+    edge_subdivisions: int = 1,
+    out: Batch | None = None,
+) -> Batch:
+    """Encode systems sharing one topology into a single ``Batch``.
+
+    Pass the previous result as ``out`` to overwrite it in place.
+    """
+    if not systems:
+        raise ValueError("Cannot encode an empty batch")
+    encoder = systems[0].topology.encoder(edge_subdivisions)
+    return encoder.encode_batch(systems, out)
@@ -0,0 +1,178 @@
+"""Event-driven simulation that jumps between track transitions."""
+
+from __future__ import annotations
+
+import heapq
+from typing import TYPE_CHECKING, Literal, NamedTuple
+
+from trains.exceptions import TrainCollisionError
+
+
+if TYPE_CHECKING:
+    from trains.env.system import System
+    from trains.env.track import Track
+    from trains.env.train import Train
+
+
+# Tail releases closer than this fraction of the train length are treated
+# as already done, so rounding cannot schedule an endless run of them.
+_TAIL_EPSILON = 1e-9
+
+
+class Event(NamedTuple):
+    time: float
+    train: Train
+    kind: Literal["head", "tail"]
+
+
+class EventScheduler:
+    """Advance a system from one track transition to the next.
+
+    A priority queue holds, for every moving train, the exact time at which
+    its head next reaches the end of its track or its tail next leaves a
+    track. Only trains with due events are moved; the others keep the
+    position they had at ``last_update[train]`` until they are synced.
+
+    Collisions are checked between the trains sharing a track with the
+    train of each event, and between all trains whenever ``advance_until``
+    syncs them. Trains meeting in the middle of a track are therefore
+    reported at the next event on that track or the next sync.
+
+    Call ``reschedule`` after changing a train's speed or position by hand.
+    """
+
+    def __init__(self, system: System, time: float = 0.0):
+        self.system = system
+        self.time = time
+        self.last_update: dict[Train, float] = {}
+        self._queue: list[tuple[float, int, Train, str]] = []
+        self._pending: dict[Train, tuple[float, int]] = {}
+        self._counter = 0
+        self.reschedule()
+
+    def reschedule(self, train: Train | None = None):
+        """Recompute the next event of ``train``, or of every train."""
+        trains = self.system.trains if train is None else [train]
+        for train in trains:
+            self.last_update.setdefault(train, self.time)
+            self._schedule(train)
+
+    def next_event_time(self) -> float | None:
+        self._drop_stale()
+        return self._queue[0][0] if self._queue else None
+
+    def advance_to_next_event(self) -> Event | None:
+        """Process the earliest pending event and return it."""
+        self._drop_stale()
+        if not self._queue:
+            return None
+
+        time, _, train, kind = heapq.heappop(self._queue)
+        del self._pending[train]
+        self.time = max(self.time, time)
+
+        if kind == "head":
+            remaining = train.track.length - train.head_distance
+            try:
+                if remaining > 0:
+                    train.move(remaining)
+                else:
+                    train.cross()
+            finally:
+                self.last_update[train] = time
+                self._schedule(train)
+        else:
+            self.sync(train)
+
+        self._check_around(train)
+        return Event(time, train, kind)
+
+    def advance_until(self, time: float) -> list[Event]:
+        """Process every event up to ``time`` and sync all trains to it."""
+        events = []
+        while (next_time := self.next_event_time()) is not None:
+            if next_time > time:
+                break
+            events.append(self.advance_to_next_event())
+
+        self.time = max(self.time, time)
+        for train in self.system.trains:
+            self.sync(train)
+
+        if collisions := self.system.detect_collisions():
+            raise TrainCollisionError(collisions)
+        return events
+
+    def sync(self, train: Train):
+        """Move ``train`` to the scheduler's current time."""
+        last = self.last_update.get(train, self.time)
+        self.last_update[train] = self.time
+        if self.time > last:
+            try:
+                train.step(self.time - last)
+            finally:
+                self._schedule(train)
+
+    def _schedule(self, train: Train):
+        self._pending.pop(train, None)
+        if train.speed <= 0:
+            return
+
+        distance = train.track.length - train.head_distance
+        kind = "head"
+        tail = self._tail_distance(train)
+        if tail is not None and tail < distance:
+            distance, kind = tail, "tail"
+
+        time = self.last_update[train] + distance / train.speed
+        self._counter += 1
+        self._pending[train] = (time, self._counter)
+        heapq.heappush(self._queue, (time, self._counter, train, kind))
+
+    def _tail_distance(self, train: Train) -> float | None:
+        """Distance the train can move before its tail leaves a track."""
+        history = train.history
+        if len(history) < 2:
+            return None
+        behind = sum(branch.track.length for branch in list(history)[1:-1])
+        distance = train.length - (train.head_distance + behind)
+        if distance <= _TAIL_EPSILON * train.length:
+            return None
+        return distance
+
+    def _drop_stale(self):
+        queue = self._queue
+        while queue:
+            time, counter, train, _ = queue[0]
+            if self._pending.get(train) == (time, counter):
+                return
+            heapq.heappop(queue)
+
+    def _check_around(self, train: Train):
+        occupancy = self.system.occupancy
+        tracks = {branch.track for branch in train.history}
+        for track in tracks:
+            for other in occupancy.trains_on(track):
+                if other is not train:
+                    self.sync(other)
+
+        system = self.system
+        collisions: list[tuple[Train, Train, Track]] = []
+        for track in tracks:
+            position = system._get_train_position_on_track(train, track)
+            for other in occupancy.trains_on(track):
+                if other is train:
+                    continue
+                other_position = system._get_train_position_on_track(
+                    other, track
+                )
+                if position is None or other_position is None:
+                    continue
+                start_a, end_a = position
+                start_b, end_b = other_position
+                if not (end_a < start_b or end_b < start_a):
+                    a, b = sorted((train, other), key=occupancy.order.get)
+                    collisions.append((a, b, track))
+
+        if collisions:
+            raise TrainCollisionError(collisions)
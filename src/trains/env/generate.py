@@ -0,0 +1,178 @@
+"""Procedural layouts for stress and scaling tests.
+
+``generate`` builds switches, dead ends and tracks directly into a
+:class:`~trains.env.topology.Topology`, so large layouts skip the JSON
+and model layers entirely. ``System.to_json`` turns the result into a
+valid ``SystemModel`` document when one is needed.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+from collections import deque
+from typing import TYPE_CHECKING, Callable
+
+from trains.env.deadend import DeadEnd
+from trains.env.switch import Switch
+from trains.env.system import System
+from trains.env.topology import Topology
+from trains.env.track import Track
+from trains.env.train import Train
+
+
+if TYPE_CHECKING:
+    from trains.env.branch import Branch
+
+
+class _Layout:
+    def __init__(
+        self, rng: random.Random, track_length: float | tuple[float, float]
+    ):
+        self.rng = rng
+        self.switches: list[Switch] = []
+        self.deadends: list[DeadEnd] = []
+        self.tracks: list[Track] = []
+        if isinstance(track_length, tuple):
+            lo, hi = track_length
+            self.track_length = lambda: rng.uniform(lo, hi)
+        else:
+            self.track_length = lambda: track_length
+
+    def switch(self) -> Switch:
+        switch = Switch(f"S{len(self.switches)}")
+        self.switches.append(switch)
+        return switch
+
+    def deadend(self) -> DeadEnd:
+        end = DeadEnd(f"D{len(self.deadends)}")
+        self.deadends.append(end)
+        return end
+
+    def connect(self, a: Branch, b: Branch):
+        track = Track((a, b), self.track_length())
+        a.track = b.track = track
+        self.tracks.append(track)
+
+
+def _loop(layout: _Layout, size: int, branching: int):
+    ring = [layout.switch() for _ in range(size)]
+    for i, switch in enumerate(ring):
+        layout.connect(switch.through, ring[(i + 1) % size].approach)
+        layout.connect(switch.diverge, layout.deadend().branch)
+
+
+def _ladder(layout: _Layout, size: int, branching: int):
+    lead = [layout.switch() for _ in range(size)]
+    layout.connect(layout.deadend().branch, lead[0].approach)
+    for a, b in zip(lead, lead[1:]):
+        layout.connect(a.through, b.approach)
+    layout.connect(lead[-1].through, layout.deadend().branch)
+    for switch in lead:
+        layout.connect(switch.diverge, layout.deadend().branch)
+
+
+def _grid(layout: _Layout, size: int, branching: int):
+    rows = max(2, 2 * round(math.sqrt(size) / 2))
+    cols = max(1, math.ceil(size / rows))
+    grid = [[layout.switch() for _ in range(cols)] for _ in range(rows)]
+    for row in grid:
+        layout.connect(layout.deadend().branch, row[0].approach)
+        for a, b in zip(row, row[1:]):
+            layout.connect(a.through, b.approach)
+        layout.connect(row[-1].through, layout.deadend().branch)
+    # Crossovers join each switch of an even row to the one diagonally
+    # below it; diverging branches left over end in dead ends.
+    for upper, lower in zip(grid[::2], grid[1::2]):
+        for a, b in zip(upper, lower[1:]):
+            layout.connect(a.diverge, b.diverge)
+        layout.connect(upper[-1].diverge, layout.deadend().branch)
+        layout.connect(lower[0].diverge, layout.deadend().branch)
+
+
+def _tree(layout: _Layout, size: int, branching: int):
+    # Every junction fans one track out into ``branching`` by a chain of
+    # ``branching - 1`` switches, breadth first until ``size`` is used.
+    frontier = deque([layout.deadend().branch])
+    while frontier:
+        stem = frontier.popleft()
+        if len(layout.switches) + branching - 1 > size:
+            layout.connect(stem, layout.deadend().branch)
+            continue
+        chain = [layout.switch() for _ in range(branching - 1)]
+        layout.connect(stem, chain[0].approach)
+        for a, b in zip(chain, chain[1:]):
+            layout.connect(a.through, b.approach)
+        frontier.extend(switch.diverge for switch in chain)
+        frontier.append(chain[-1].through)
+
+
+FAMILIES: dict[str, Callable[[_Layout, int, int], None]] = {
+    "loop": _loop,
+    "ladder": _ladder,
+    "grid": _grid,
+    "tree": _tree,
+}
+
+
+def generate(
+    family: str = "ladder",
+    size: int = 1000,
+    *,
+    branching: int = 2,
+    track_length: float | tuple[float, float] = 100.0,
+    trains: int = 0,
+    density: float | None = None,
+    train_length: float = 20.0,
+    speed: float = 1.0,
+    seed: int | None = None,
+) -> System:
+    """Build a system of about ``size`` switches.
+
+    ``family`` is one of ``FAMILIES``: ``"loop"`` is a ring of switches
+    with a siding at each, ``"ladder"`` a yard lead fanning out into
+    dead-end roads, ``"grid"`` parallel lines joined by crossovers and
+    ``"tree"`` splits every track into ``branching`` tracks until the
+    switches run out; the other families ignore ``branching``.
+    ``track_length`` is either a fixed length or a ``(low, high)`` range
+    to draw lengths from uniformly.
+
+    ``trains`` trains are placed on distinct tracks, each starting at
+    the first end of its track, so the layout starts collision free.
+    ``density`` instead gives the fraction of the tracks long enough
+    for a train to fill. The same ``seed`` gives the same system.
+    """
+    if family not in FAMILIES:
+        raise ValueError(f"Unknown layout family {family!r}")
+    if size < 1:
+        raise ValueError("size must be at least 1")
+    if branching < 2:
+        raise ValueError("branching must be at least 2")
+    if density is not None:
+        if trains:
+            raise ValueError("Pass either trains or density, not both")
+        if not 0.0 <= density <= 1.0:
+            raise ValueError("density must be between 0 and 1")
+
+    rng = random.Random(seed)
+    layout = _Layout(rng, track_length)
+    FAMILIES[family](layout, size, branching)
+    topology = Topology(layout.switches, layout.deadends, layout.tracks)
+
+    room = [
+        track for track in topology.tracks if track.length >= train_length
+    ]
+    if density is not None:
+        trains = round(density * len(room))
+    if trains > len(room):
+        raise ValueError(
+            f"Cannot place {trains} trains of length {train_length} on "
+            f"{len(room)} tracks long enough to hold them"
+        )
+    return System(
+        topology,
+        [
+            Train(f"T{i}", track.ends[0], train_length, train_length, speed)
+            for i, track in enumerate(rng.sample(room, trains))
+        ],
+    )
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable
+
+
+if TYPE_CHECKING:
+    from trains.env.base import Node
+    from trains.env.branch import Branch
+    from trains.env.track import Track
+    from trains.env.train import Train
+
+
+class OccupancyIndex:
+    """Which trains occupy each track, kept current as trains move.
+
+    Trains report entering a track with their head and leaving one with
+    their tail, and mark the tracks under their head and tail as changed
+    whenever they move. ``pop_changed`` hands those tracks to collision
+    detection, so it only revisits tracks where something moved.
+
+    The same updates also index trains by the node whose branch they
+    hold in their history, which is what blocks a switch from flipping.
+    """
+
+    def __init__(self, trains: Iterable[Train] = ()):
+        self.track_trains: dict[Track, dict[Train, int]] = {}
+        self.node_trains: dict[Node, dict[Train, int]] = {}
+        self.order: dict[Train, int] = {}
+        self.changed: set[Track] = set()
+        self._next_order = 0
+        for train in trains:
+            self.add(train)
+
+    def add(self, train: Train):
+        self.order[train] = self._next_order
+        self._next_order += 1
+        self.occupy(train)
+
+    def remove(self, train: Train):
+        self.release(train)
+        del self.order[train]
+
+    def occupy(self, train: Train):
+        for branch in train.history:
+            self.enter(train, branch)
+
+    def release(self, train: Train):
+        for branch in train.history:
+            self.leave(train, branch)
+
+    def enter(self, train: Train, branch: Branch):
+        track = branch.track
+        _count_in(self.track_trains, track, train)
+        _count_in(self.node_trains, branch.parent, train)
+        self.changed.add(track)
+
+    def leave(self, train: Train, branch: Branch):
+        track = branch.track
+        _count_out(self.track_trains, track, train)
+        _count_out(self.node_trains, branch.parent, train)
+        self.changed.add(track)
+
+    def touch(self, track: Track):
+        self.changed.add(track)
+
+    def trains_on(self, track: Track) -> list[Train]:
+        """Trains on ``track`` in the order they were added."""
+        trains = self.track_trains.get(track, {})
+        return sorted(trains, key=self.order.__getitem__)
+
+    def trains_at(self, node: Node) -> list[Train]:
+        """Trains holding a branch of ``node``, in the order added."""
+        trains = self.node_trains.get(node)
+        if not trains:
+            return []
+        return sorted(trains, key=self.order.__getitem__)
+
+    def pop_changed(self) -> set[Track]:
+        changed, self.changed = self.changed, set()
+        return changed
+
+
+def _count_in(index: dict, key: object, train: Train):
+    trains = index.setdefault(key, {})
+    trains[train] = trains.get(train, 0) + 1
+
+
+def _count_out(index: dict, key: object, train: Train):
+    trains = index[key]
+    trains[train] -= 1
+    if not trains[train]:
+        del trains[train]
+    if not trains:
+        del index[key]
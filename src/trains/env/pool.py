@@ -0,0 +1,308 @@
+"""Vector environments sharded across worker processes.
+
+Every worker runs a :class:`~trains.env.vector.VectorSystem` over its
+share of the environments. Actions, ``dt`` and every field of
+:class:`~trains.env.vector.VectorStep` live in one block of shared
+memory that workers read and write in place, so only short commands and
+acknowledgements go through the pipes.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import tempfile
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from trains.env.vector import VectorStep
+
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+
+    from trains.env.system import System
+    from trains.env.vector import VectorSystem
+
+
+# Shared buffers, with the dtype and per-environment shape of each.
+# ``"trains"`` and ``"switches"`` stand for the counts of the layout.
+FIELDS = {
+    "actions": (np.bool_, ("switches",)),
+    "dt": (np.float64, ()),
+    "head_branch": (np.int64, ("trains",)),
+    "head_distance": (np.float64, ("trains",)),
+    "switch_state": (np.bool_, ("switches",)),
+    "rejected": (np.bool_, ("switches",)),
+    "status": (np.int64, ("trains",)),
+    "partner": (np.int64, ("trains",)),
+    "collided": (np.bool_, ("trains",)),
+    "terminated": (np.bool_, ()),
+    "truncated": (np.bool_, ()),
+    # The state after finished environments were reset, for the
+    # properties of the same names.
+    "state_head_branch": (np.int64, ("trains",)),
+    "state_head_distance": (np.float64, ("trains",)),
+    "state_switch_state": (np.bool_, ("switches",)),
+}
+ALIGN = 64
+
+
+def _layout(
+    num_envs: int, num_trains: int, num_switches: int
+) -> tuple[dict[str, tuple[Any, tuple[int, ...], int]], int]:
+    """Dtype, shape and offset of every shared buffer, and the total."""
+    sizes = {"trains": num_trains, "switches": num_switches}
+    layout = {}
+    offset = 0
+    for name, (dtype, axes) in FIELDS.items():
+        shape = (num_envs, *(sizes[axis] for axis in axes))
+        layout[name] = (dtype, shape, offset)
+        nbytes = np.dtype(dtype).itemsize * int(np.prod(shape))
+        offset += -(-nbytes // ALIGN) * ALIGN
+    return layout, max(offset, 1)
+
+
+def _buffers(
+    memory: SharedMemory, layout: dict[str, tuple[Any, tuple[int, ...], int]]
+) -> dict[str, np.ndarray]:
+    return {
+        name: np.ndarray(shape, dtype, buffer=memory.buf, offset=offset)
+        for name, (dtype, shape, offset) in layout.items()
+    }
+
+
+def _worker(
+    conn: Connection,
+    path: str,
+    memory_name: str,
+    layout: dict[str, tuple[Any, tuple[int, ...], int]],
+    start: int,
+    stop: int,
+    max_steps: int | None,
+):
+    from trains.env.system import System
+    from trains.env.vector import VectorSystem
+
+    memory = SharedMemory(name=memory_name)
+    try:
+        system = System.from_binary(path)
+        envs = VectorSystem(system, stop - start, max_steps)
+        shard = {
+            name: buffer[start:stop]
+            for name, buffer in _buffers(memory, layout).items()
+        }
+        conn.send(None)
+        _serve(conn, envs, shard)
+    except Exception as e:
+        conn.send(e)
+    finally:
+        shard = None
+        try:
+            memory.close()
+        except BufferError:
+            # Still viewed from a traceback; exiting unmaps it anyway.
+            pass
+        conn.close()
+
+
+def _serve(
+    conn: Connection, envs: VectorSystem, shard: dict[str, np.ndarray]
+):
+    num_envs = envs.num_envs
+    while True:
+        command, argument = conn.recv()
+        if command == "close":
+            return
+        try:
+            if command == "step":
+                actions = shard["actions"] if argument else None
+                result = envs.step(actions, shard["dt"])
+                for name, value in zip(result._fields, result):
+                    shard[name][...] = value
+            elif command == "reset":
+                envs.reset()
+            else:
+                raise ValueError(f"Unknown command {command!r}")
+            shard["state_head_branch"][...] = envs.head_branch
+            shard["state_head_distance"][...] = envs.head_distance.reshape(
+                num_envs, -1
+            )
+            shard["state_switch_state"][...] = envs.switch_state
+        except Exception as e:
+            conn.send(e)
+        else:
+            conn.send(None)
+
+
+class ProcessVectorSystem:
+    """A :class:`~trains.env.vector.VectorSystem` split across processes.
+
+    The ``num_envs`` environments are divided into contiguous shards,
+    one per worker, and behave exactly as in a single ``VectorSystem``.
+    Workers load the layout from a binary layout file, so the compiled
+    topology is mapped once and shared between them.
+
+    ``step`` applies actions and waits for every worker; ``step_async``
+    only starts the step, leaving the caller free until ``step_wait``.
+    Results are views into shared memory, overwritten by the next step
+    or reset; copy them to keep them around. ``head_branch``,
+    ``head_distance`` and ``switch_state`` hold the current state as on
+    ``VectorSystem``, with finished environments already reset. Call
+    ``close`` (or use the pool as a context manager) to stop the
+    workers.
+    """
+
+    def __init__(
+        self,
+        system: System,
+        num_envs: int,
+        num_workers: int | None = None,
+        max_steps: int | None = None,
+        start_method: str | None = None,
+    ):
+        if num_envs < 1:
+            raise ValueError("num_envs must be positive")
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        if num_workers < 1:
+            raise ValueError("num_workers must be positive")
+        num_workers = min(num_workers, num_envs)
+
+        self.topology = system.topology.compiled
+        self.num_envs = num_envs
+        self.num_workers = num_workers
+        self.num_trains = len(system.trains)
+        self.num_switches = len(system.switch_states)
+        self._waiting = False
+        self._conns: list[Connection] = []
+        self._processes: list[multiprocessing.process.BaseProcess] = []
+
+        self._directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self._directory.name, "layout.bin")
+        system.to_binary(path)
+
+        layout, size = _layout(num_envs, self.num_trains, self.num_switches)
+        self._memory = SharedMemory(create=True, size=size)
+        self._buffers = _buffers(self._memory, layout)
+
+        context = multiprocessing.get_context(start_method)
+        bounds = np.linspace(0, num_envs, num_workers + 1).astype(int)
+        try:
+            for start, stop in zip(bounds.tolist(), bounds[1:].tolist()):
+                parent, child = context.Pipe()
+                process = context.Process(
+                    target=_worker,
+                    args=(
+                        child,
+                        path,
+                        self._memory.name,
+                        layout,
+                        start,
+                        stop,
+                        max_steps,
+                    ),
+                    daemon=True,
+                )
+                process.start()
+                child.close()
+                self._conns.append(parent)
+                self._processes.append(process)
+            self._wait()
+            self.reset()
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def head_branch(self) -> np.ndarray:
+        return self._buffers["state_head_branch"]
+
+    @property
+    def head_distance(self) -> np.ndarray:
+        return self._buffers["state_head_distance"].reshape(-1)
+
+    @property
+    def switch_state(self) -> np.ndarray:
+        return self._buffers["state_switch_state"]
+
+    def _send(self, command: str, argument: Any = None):
+        if self._waiting:
+            raise RuntimeError("A step is in progress; call step_wait first")
+        for conn in self._conns:
+            conn.send((command, argument))
+
+    def _wait(self):
+        errors = [conn.recv() for conn in self._conns]
+        for error in errors:
+            if error is not None:
+                raise error
+
+    def reset(self):
+        """Return every environment to the start."""
+        self._send("reset")
+        self._wait()
+
+    def step_async(self, actions: np.ndarray | None, dt: float | np.ndarray):
+        """Start a step with ``actions`` and ``dt``, as ``step`` takes."""
+        if self._waiting:
+            raise RuntimeError("A step is in progress; call step_wait first")
+        buffers = self._buffers
+        if actions is not None:
+            np.copyto(buffers["actions"], actions, casting="unsafe")
+        np.copyto(buffers["dt"], dt)
+        self._send("step", actions is not None)
+        self._waiting = True
+
+    def step_wait(self) -> VectorStep:
+        """Wait for the step started by ``step_async`` and return it."""
+        if not self._waiting:
+            raise RuntimeError("No step in progress; call step_async first")
+        self._waiting = False
+        self._wait()
+        return VectorStep(
+            *(self._buffers[field] for field in VectorStep._fields)
+        )
+
+    def step(
+        self, actions: np.ndarray | None, dt: float | np.ndarray
+    ) -> VectorStep:
+        """Like ``VectorSystem.step``, with every worker in parallel."""
+        self.step_async(actions, dt)
+        return self.step_wait()
+
+    def close(self):
+        """Stop the workers and release the shared memory."""
+        for conn in self._conns:
+            try:
+                conn.send(("close", None))
+            except OSError:
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for conn in self._conns:
+            conn.close()
+        self._conns = []
+        self._processes = []
+        if self._memory is not None:
+            self._buffers = {}
+            try:
+                self._memory.close()
+            except BufferError:
+                # Results the caller still holds keep the block mapped
+                # until they are gone; unlinking below still frees it.
+                pass
+            self._memory.unlink()
+            self._memory = None
+        self._directory.cleanup()
+
+    def __enter__(self) -> ProcessVectorSystem:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
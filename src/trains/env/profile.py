@@ -0,0 +1,158 @@
+"""Opt-in per-phase instrumentation of ``System.step``."""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+
+if TYPE_CHECKING:
+    from trains.env.branch import Branch
+    from trains.env.system import System
+
+
+class StepRecord(NamedTuple):
+    """What one profiled ``System.step`` did and how long it took.
+
+    Times are in seconds. ``transitions`` counts tracks entered by train
+    heads, each of them a pass through a switch since dead ends stop
+    trains, and ``diverging_passes`` the passes over a diverging branch.
+    ``tracks_checked`` and ``candidate_pairs`` are the tracks revisited
+    by the two collision checks and the pairs of trains sharing them;
+    ``collisions`` is the number of colliding pairs found. History
+    lengths, in branches per train, are taken after the move.
+    """
+
+    dt: float
+    pre_detect: float
+    move: float
+    post_detect: float
+    transitions: int
+    diverging_passes: int
+    tracks_checked: int
+    candidate_pairs: int
+    collisions: int
+    history_mean: float
+    history_max: int
+
+
+PHASES = ("pre_detect", "move", "post_detect")
+
+
+class StepProfiler:
+    """Records a :class:`StepRecord` for every step of a system.
+
+    Attach one with ``system.profiler = StepProfiler()`` and detach it by
+    setting ``profiler`` back to ``None``; without one ``System.step``
+    only pays a few attribute checks. Only discrete steps are profiled,
+    continuous ones are not recorded.
+
+    ``System.step`` reports its phases to the profiler as it runs them,
+    and trains report every track they enter, so a train that runs over
+    several tracks in one step is credited with each of them.
+    """
+
+    def __init__(self):
+        self.records: list[StepRecord] = []
+        self._phase: str | None = None
+
+    def clear(self):
+        self.records.clear()
+
+    def _begin(self, dt: float):
+        """Start recording a step of ``dt``."""
+        self._dt = dt
+        self._times = dict.fromkeys(PHASES, 0.0)
+        self._phase = None
+        self._transitions = self._diverging_passes = 0
+        self._tracks_checked = self._candidate_pairs = 0
+
+    def _start(self, phase: str, system: System | None = None):
+        """End the running phase and start ``phase``.
+
+        Pass ``system`` to count the collision candidates a detection
+        phase is about to check, outside the timed section.
+        """
+        self._stop()
+        if system is not None:
+            occupancy = system.occupancy
+            track_trains = occupancy.track_trains
+            for track in occupancy.changed:
+                n = len(track_trains.get(track, ()))
+                self._candidate_pairs += n * (n - 1) // 2
+            self._tracks_checked += len(occupancy.changed)
+        self._phase = phase
+        self._started = time.perf_counter()
+
+    def _stop(self):
+        if self._phase is not None:
+            elapsed = time.perf_counter() - self._started
+            self._times[self._phase] += elapsed
+            self._phase = None
+
+    def _transition(self, previous: Branch, branch: Branch):
+        """Count a train head leaving ``previous``'s track by ``branch``."""
+        self._transitions += 1
+        diverge = branch.parent.diverge
+        if branch is diverge or previous.other() is diverge:
+            self._diverging_passes += 1
+
+    def _end(self, system: System, collisions: list | None):
+        """Finish the step, recording it with the ``collisions`` found."""
+        self._stop()
+        lengths = [len(train.history) for train in system.trains]
+        times = self._times
+        self.records.append(
+            StepRecord(
+                self._dt,
+                times["pre_detect"],
+                times["move"],
+                times["post_detect"],
+                self._transitions,
+                self._diverging_passes,
+                self._tracks_checked,
+                self._candidate_pairs,
+                len(collisions) if collisions else 0,
+                sum(lengths) / len(lengths) if lengths else 0.0,
+                max(lengths, default=0),
+            )
+        )
+
+    def series(self) -> dict[str, list[Any]]:
+        """The records as columns, one entry per step."""
+        return {
+            field: [getattr(record, field) for record in self.records]
+            for field in StepRecord._fields
+        }
+
+    def summary(self) -> dict[str, Any]:
+        """Totals over all recorded steps, with each phase's share."""
+        steps = len(self.records)
+        totals = {
+            field: sum(getattr(record, field) for record in self.records)
+            for field in StepRecord._fields
+        }
+        elapsed = sum(totals[phase] for phase in PHASES)
+        return {
+            "steps": steps,
+            "time": elapsed,
+            "phases": {
+                phase: {
+                    "total": totals[phase],
+                    "mean": totals[phase] / steps if steps else 0.0,
+                    "share": totals[phase] / elapsed if elapsed else 0.0,
+                }
+                for phase in PHASES
+            },
+            "transitions": totals["transitions"],
+            "diverging_passes": totals["diverging_passes"],
+            "tracks_checked": totals["tracks_checked"],
+            "candidate_pairs": totals["candidate_pairs"],
+            "collisions": totals["collisions"],
+            "history_mean": (
+                totals["history_mean"] / steps if steps else 0.0
+            ),
+            "history_max": max(
+                (record.history_max for record in self.records), default=0
+            ),
+        }
@@ -0,0 +1,443 @@
+"""Columnar recording of ``System.step`` trajectories.
+
+A recording is a directory holding ``meta.json``, ``layout.bin`` (the
+system as it was when recording started, see :mod:`trains.env.binary`)
+and one append-only raw file per column. Row ``i`` of a per-step column
+describes the system after the ``i + 1``-th recorded step:
+
+``dt``
+    The time the step moved trains by, ``float64``: its ``dt``, or
+    the contact time when a continuous step stopped at a collision.
+``head_branch``
+    Per train, the branch its head departed from, numbered as in
+    :class:`~trains.env.compiled.CompiledTopology`, ``int64``.
+``head_distance``, ``speed``
+    Per train, ``float64``.
+``collision``
+    Per train, whether the step raised a collision involving it.
+
+Switch states rarely change, so they are logged only when they do:
+row ``j`` of ``switch_state`` holds every switch's state as of step
+``switch_step[j]``, where step ``-1`` is the start of the recording.
+
+Every ``keyframe_interval`` steps the full history of every train is
+logged too, as branch ids: row ``j`` of ``keyframe_history_length``
+holds the history length of each train after ``keyframe_step[j]``
+steps, and ``keyframe_history`` all the histories back to back. Together
+with the per-step columns they let :class:`TrajectoryReader` rebuild
+the system at any step from at most ``keyframe_interval - 1`` rows of
+recorded head positions.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+from collections import deque
+from typing import TYPE_CHECKING, Iterable
+
+import numpy as np
+
+from trains.env import binary
+from trains.env.snapshot import SystemSnapshot
+from trains.exceptions import TrainCollisionError
+
+
+if TYPE_CHECKING:
+    from trains.env.branch import Branch
+    from trains.env.system import System
+
+
+VERSION = 1
+
+
+class TrajectoryRecorder:
+    """Appends the state of a system after each step to a recording.
+
+    Attach one with ``system.recorder = TrajectoryRecorder(path,
+    system)``; every ``System.step`` from then on that moves trains is
+    recorded, including one that then raises, such as a collision or a
+    train running into a dead end. Rows are kept in preallocated buffers of
+    ``chunk_size`` steps and written out whenever one fills, on
+    ``flush`` and on ``close``. The set of trains must stay the same
+    while recording.
+    """
+
+    STEP_COLUMNS = {
+        "dt": (np.float64, ()),
+        "head_branch": (np.int64, ("trains",)),
+        "head_distance": (np.float64, ("trains",)),
+        "speed": (np.float64, ("trains",)),
+        "collision": (np.bool_, ("trains",)),
+    }
+    EVENT_COLUMNS = {
+        "switch_step": (np.int64, ()),
+        "switch_state": (np.bool_, ("switches",)),
+        "keyframe_step": (np.int64, ()),
+        "keyframe_history_length": (np.int64, ("trains",)),
+        "keyframe_history": (np.int64, ()),
+    }
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        system: System,
+        chunk_size: int = 4096,
+        keyframe_interval: int = 1024,
+    ):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        if keyframe_interval < 1:
+            raise ValueError("keyframe_interval must be positive")
+        self.path = path
+        self.chunk_size = chunk_size
+        self.keyframe_interval = keyframe_interval
+        self.steps = 0
+
+        self._trains = list(system.trains)
+        self._branch_index = system.topology.compiled.branch_index
+        sizes = {
+            "trains": len(self._trains),
+            "switches": len(system.switch_states),
+        }
+        columns = {**self.STEP_COLUMNS, **self.EVENT_COLUMNS}
+        shapes = {
+            name: tuple(sizes[axis] for axis in axes)
+            for name, (_, axes) in columns.items()
+        }
+
+        os.makedirs(path, exist_ok=True)
+        binary.write(system, os.path.join(path, "layout.bin"))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(
+                {
+                    "version": VERSION,
+                    "train_tags": [train.tag for train in self._trains],
+                    "keyframe_interval": keyframe_interval,
+                    "columns": {
+                        name: [np.dtype(dtype).str, list(shapes[name])]
+                        for name, (dtype, _) in columns.items()
+                    },
+                },
+                f,
+            )
+
+        self._files = {
+            name: open(os.path.join(path, name + ".bin"), "wb")
+            for name in columns
+        }
+        self._buffers = {
+            name: np.zeros((chunk_size, *shapes[name]), dtype=dtype)
+            for name, (dtype, _) in self.STEP_COLUMNS.items()
+        }
+        self._rows = 0
+        self._switch_states: list[bool] = []
+        self._log_switches(system, -1)
+
+    def record(
+        self,
+        system: System,
+        dt: float,
+        error: TrainCollisionError | None = None,
+    ):
+        """Append the state of ``system`` after moving trains by ``dt``.
+
+        ``error`` is the collision the step raised, if any.
+        """
+        trains = system.trains
+        if len(trains) != len(self._trains):
+            raise ValueError("Trains were added or removed while recording")
+        if self._files is None:
+            raise ValueError("Recorder is closed")
+
+        buffers = self._buffers
+        row = self._rows
+        branch_index = self._branch_index
+        buffers["dt"][row] = dt
+        buffers["head_branch"][row] = [
+            branch_index[train._history[0]] for train in trains
+        ]
+        buffers["head_distance"][row] = [
+            train._head_distance for train in trains
+        ]
+        buffers["speed"][row] = [train.speed for train in trains]
+        if error is not None:
+            collision = buffers["collision"][row]
+            index = {train: i for i, train in enumerate(trains)}
+            for train_a, train_b, _ in error.trains:
+                collision[index[train_a]] = True
+                collision[index[train_b]] = True
+
+        if system.switch_states != self._switch_states:
+            self._log_switches(system, self.steps)
+        self.steps += 1
+        if self.steps % self.keyframe_interval == 0:
+            self._log_keyframe(trains)
+        self._rows = row + 1
+        if self._rows == self.chunk_size:
+            self._write_rows()
+
+    def _log_switches(self, system: System, step: int):
+        self._switch_states = list(system.switch_states)
+        self._files["switch_step"].write(np.int64(step).tobytes())
+        self._files["switch_state"].write(
+            np.array(self._switch_states, dtype=np.bool_).tobytes()
+        )
+
+    def _log_keyframe(self, trains):
+        branch_index = self._branch_index
+        histories = [
+            [branch_index[branch] for branch in train._history]
+            for train in trains
+        ]
+        files = self._files
+        files["keyframe_step"].write(np.int64(self.steps).tobytes())
+        files["keyframe_history_length"].write(
+            np.array([len(h) for h in histories], dtype=np.int64).tobytes()
+        )
+        files["keyframe_history"].write(
+            np.array(
+                [b for history in histories for b in history], dtype=np.int64
+            ).tobytes()
+        )
+
+    def _write_rows(self):
+        rows = self._rows
+        for name, buffer in self._buffers.items():
+            self._files[name].write(buffer[:rows].tobytes())
+        # Collision flags are only ever set, so clear them for reuse.
+        self._buffers["collision"][:rows] = False
+        self._rows = 0
+
+    def flush(self):
+        """Write buffered steps out to the recording's files."""
+        if self._files is None:
+            return
+        self._write_rows()
+        for f in self._files.values():
+            f.flush()
+
+    def close(self):
+        if self._files is None:
+            return
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files = None
+
+    def __enter__(self) -> TrajectoryRecorder:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_ROW_PARTNERS = {
+    "head_branch": "dt",
+    "head_distance": "dt",
+    "speed": "dt",
+    "collision": "dt",
+    "switch_state": "switch_step",
+    "keyframe_history_length": "keyframe_step",
+}
+
+
+class TrajectoryReader:
+    """A recording made by :class:`TrajectoryRecorder`, memory-mapped.
+
+    ``columns`` maps every column name to a read-only array backed by
+    its file, so slicing or reducing over one only reads the pages it
+    touches. Steps are counted from the start of the recording: the
+    system after step ``n`` is row ``n - 1`` of the per-step columns and
+    step ``0`` is the system the recording started from. Steps still
+    buffered by a live recorder are not visible until it flushes.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta["version"] != VERSION:
+            raise ValueError(
+                f"Recording format version {meta['version']} "
+                "is not supported"
+            )
+        self.train_tags: list[str | int] = meta["train_tags"]
+        self.keyframe_interval: int = meta["keyframe_interval"]
+        self._train_index = {
+            tag: i for i, tag in enumerate(self.train_tags)
+        }
+
+        self.columns: dict[str, np.ndarray] = {
+            name: self._map(name, dtype, shape)
+            for name, (dtype, shape) in meta["columns"].items()
+        }
+        # Without trains or switches some columns hold no bytes at all;
+        # give them as many empty rows as the column they go with.
+        for name, partner in _ROW_PARTNERS.items():
+            column = self.columns[name]
+            if 0 in column.shape[1:]:
+                self.columns[name] = np.zeros(
+                    (len(self.columns[partner]), *column.shape[1:]),
+                    dtype=column.dtype,
+                )
+        # A recording cut short may end on a partly written chunk.
+        self.steps = min(
+            len(self.columns[name]) for name in TrajectoryRecorder.STEP_COLUMNS
+        )
+
+        self._layout = binary.BinaryLayout(os.path.join(path, "layout.bin"))
+        self.topology = self._layout.topology()
+
+        lengths = self.columns["keyframe_history_length"]
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths.sum(axis=1), out=offsets[1:])
+        keyframes = self.columns["keyframe_step"]
+        count = min(len(keyframes), len(lengths))
+        while count and (
+            keyframes[count - 1] > self.steps
+            or offsets[count] > len(self.columns["keyframe_history"])
+        ):
+            count -= 1
+        self._keyframe_steps = keyframes[:count]
+        self._keyframe_offsets = offsets[: count + 1]
+
+    def _map(self, name: str, dtype: str, shape: list[int]) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        file = os.path.join(self.path, name + ".bin")
+        row = dtype.itemsize * math.prod(shape)
+        rows = os.path.getsize(file) // row if row else 0
+        if rows == 0:
+            return np.zeros((0, *shape), dtype=dtype)
+        return np.memmap(file, dtype=dtype, mode="r", shape=(rows, *shape))
+
+    def __len__(self) -> int:
+        return self.steps
+
+    def train_index(self, tags: Iterable[str | int]) -> list[int]:
+        """Positions of the trains tagged ``tags`` in per-train columns."""
+        try:
+            return [self._train_index[tag] for tag in tags]
+        except KeyError as e:
+            raise KeyError(f"No train tagged {e.args[0]!r}") from None
+
+    def column(
+        self,
+        name: str,
+        steps: slice = slice(None),
+        trains: Iterable[str | int] | None = None,
+    ) -> np.ndarray:
+        """Rows ``steps`` of a per-step column, for ``trains`` only.
+
+        Row ``i`` describes the system after step ``i + 1``. Without
+        ``trains`` the result is a view into the file.
+        """
+        if name not in TrajectoryRecorder.STEP_COLUMNS:
+            raise KeyError(f"{name!r} is not a per-step column")
+        data = self.columns[name][: self.steps][steps]
+        if trains is None:
+            return data
+        if data.ndim == 1:
+            raise ValueError(f"{name!r} is not a per-train column")
+        return data[:, self.train_index(trains)]
+
+    def times(self) -> np.ndarray:
+        """Simulated time after each step."""
+        return np.cumsum(self.column("dt"))
+
+    def switch_states(self, step: int) -> np.ndarray:
+        """Every switch's state after ``step`` steps."""
+        self._check_step(step)
+        j = np.searchsorted(self.columns["switch_step"], step - 1, "right")
+        return self.columns["switch_state"][j - 1]
+
+    def _check_step(self, step: int):
+        if not 0 <= step <= self.steps:
+            raise IndexError(
+                f"Step {step} is outside the recording (0 to {self.steps})"
+            )
+
+    def system(self, step: int) -> System:
+        """Rebuild the system as it was after ``step`` steps.
+
+        The latest keyframe at or before ``step`` is restored into a
+        fresh system. From there every train's head follows its recorded
+        head branches, through the switches as they were set at each
+        step, to its recorded position. Nothing is simulated again, so
+        the result matches the recording even after steps that raised.
+        """
+        self._check_step(step)
+        system = self._layout.system()
+        k = int(np.searchsorted(self._keyframe_steps, step, "right")) - 1
+        start = 0
+        if k >= 0:
+            start = int(self._keyframe_steps[k])
+            system.restore(self._snapshot(k, start))
+        if step == start:
+            return system
+
+        branches = self.topology.compiled.branches
+        histories = [deque(train._history) for train in system.trains]
+        rows = self.columns["head_branch"][start:step].tolist()
+        for n, heads in zip(range(start + 1, step + 1), rows):
+            states = self.switch_states(n).tolist()
+            if states != system.switch_states:
+                system.switch_states[:] = states
+            for history, head in zip(histories, heads):
+                self._follow(system, history, branches[head])
+
+        columns = self.columns
+        for train, history, head_distance, speed in zip(
+            system.trains,
+            histories,
+            columns["head_distance"][step - 1].tolist(),
+            columns["speed"][step - 1].tolist(),
+        ):
+            train.place(history, head_distance)
+            train.speed = speed
+        return system
+
+    @staticmethod
+    def _follow(system: System, history: deque[Branch], head: Branch):
+        """Extend ``history`` along the route until it reaches ``head``."""
+        # A head that passes the same branch twice in one step has gone
+        # round a loop, which leaves the same tracks behind it.
+        for _ in range(len(system.topology.compiled.branches)):
+            if history[0] is head:
+                return
+            branch = system.next_branch(history[0])
+            if branch is None:
+                break
+            history.appendleft(branch)
+        if history[0] is not head:
+            raise ValueError(
+                f"Recording is inconsistent: no route from "
+                f"{history[0].tag} to {head.tag}"
+            )
+
+    def _snapshot(self, k: int, step: int) -> SystemSnapshot:
+        branches = self.topology.compiled.branches
+        columns = self.columns
+        offsets = self._keyframe_offsets
+        history = columns["keyframe_history"][
+            offsets[k] : offsets[k + 1]
+        ].tolist()
+        lengths = columns["keyframe_history_length"][k].tolist()
+        bounds = np.cumsum([0, *lengths]).tolist()
+
+        trains = []
+        for i, (head_distance, speed) in enumerate(
+            zip(
+                columns["head_distance"][step - 1].tolist(),
+                columns["speed"][step - 1].tolist(),
+            )
+        ):
+            train_history = tuple(
+                branches[b] for b in history[bounds[i] : bounds[i + 1]]
+            )
+            behind = sum(branch.track.length for branch in train_history[1:])
+            trains.append((train_history, head_distance, speed, behind))
+        return SystemSnapshot(
+            tuple(self.switch_states(step).tolist()), tuple(trains)
+        )
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from trains.env.branch import Branch
+
+
+class SystemSnapshot:
+    """Mutable state of a system, as captured by ``System.snapshot``.
+
+    Holds switch states and, per train, its history, ``head_distance``,
+    ``speed`` and the cached length behind its head track. Branches are
+    stored by reference, so the layout itself is never copied.
+    """
+
+    __slots__ = ("switch_states", "trains")
+
+    def __init__(
+        self,
+        switch_states: tuple[bool, ...],
+        trains: tuple[tuple[tuple[Branch, ...], float, float, float], ...],
+    ):
+        self.switch_states = switch_states
+        self.trains = trains
@@ -0,0 +1,37 @@
+"""Per-train outcome codes for the non-raising step modes."""
+
+from __future__ import annotations
+
+from enum import IntEnum
+from typing import TYPE_CHECKING, NamedTuple
+
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class TrainStatus(IntEnum):
+    """What happened to a train during a step.
+
+    The blocked codes match the ones stored in
+    ``CompiledTopology.exit_table``, so array engines report them as is.
+    """
+
+    OK = 0
+    DEAD_END = -1
+    WRONG_WAY = -2
+    COLLISION = -3
+
+
+class StepStatus(NamedTuple):
+    """Result of ``step_status``, one entry per train.
+
+    ``status`` holds :class:`TrainStatus` codes. A train that ends the
+    step overlapping another reports ``COLLISION`` even if it was also
+    blocked, and ``partner`` holds the index of the first train it
+    collides with, in the order collisions are detected; it is ``-1``
+    otherwise.
+    """
+
+    status: np.ndarray
+    partner: np.ndarray
@@ -0,0 +1,149 @@
+"""Swept (time-of-impact) collision detection over one step."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+
+if TYPE_CHECKING:
+    from trains.env.track import Track
+    from trains.env.train import Train
+
+
+class Placement(NamedTuple):
+    """A track along a train's route during one step.
+
+    ``start`` is the distance along the route, measured from the start of
+    the head track, at which the train enters ``track``. ``forward`` is
+    whether it runs from ``track.ends[0]`` to ``track.ends[1]``.
+    """
+
+    track: Track
+    forward: bool
+    start: float
+
+
+class Sweep:
+    """Route and head trajectory of a train over the next ``dt``.
+
+    The route covers the tracks under the train and the tracks its head
+    will reach, following the switches as they are set now. The head
+    moves at constant speed until ``stop``, the end of the track where a
+    dead end or wrong-way switch blocks it, if it gets there.
+    """
+
+    def __init__(self, train: Train, dt: float):
+        self.train = train
+        self.length = train.length
+        self.head = train.head_distance
+        self.speed = max(train.speed, 0.0)
+        self.stop: float | None = None
+        self.placements: list[Placement] = []
+
+        start = 0.0
+        for i, branch in enumerate(train.history):
+            track = branch.track
+            if i > 0:
+                start -= track.length
+            self.placements.append(
+                Placement(track, branch is track.ends[0], start)
+            )
+
+        system = train.system
+        reach = self.head + self.speed * dt
+        branch = train.history[0]
+        start = 0.0
+        while self.speed > 0 and start + branch.track.length <= reach:
+            start += branch.track.length
+            branch = system.next_branch(branch)
+            if branch is None:
+                self.stop = start
+                break
+            track = branch.track
+            self.placements.append(
+                Placement(track, branch is track.ends[0], start)
+            )
+
+    @property
+    def stop_time(self) -> float | None:
+        if self.stop is None:
+            return None
+        return (self.stop - self.head) / self.speed
+
+    def head_line(self, t0: float, t1: float) -> tuple[float, float]:
+        """Head position as ``(intercept, slope)`` in time over [t0, t1]."""
+        stop_time = self.stop_time
+        if stop_time is not None and (t0 + t1) / 2 >= stop_time:
+            return self.stop, 0.0
+        return self.head, self.speed
+
+    def interval(
+        self, placement: Placement, t0: float, t1: float
+    ) -> tuple[tuple[float, float], tuple[float, float]]:
+        """Unclipped train interval on a placement's track, in its frame.
+
+        Both ends are returned as ``(intercept, slope)`` lines in time.
+        """
+        head, speed = self.head_line(t0, t1)
+        start = placement.start
+        if placement.forward:
+            return (
+                (head - self.length - start, speed),
+                (head - start, speed),
+            )
+        track_length = placement.track.length
+        return (
+            (track_length - head + start, -speed),
+            (track_length - head + self.length + start, -speed),
+        )
+
+
+def _earliest(
+    constraints: list[tuple[float, float]], t0: float, t1: float
+) -> float | None:
+    """Earliest t in [t0, t1] with ``c + m * t <= 0`` for every (c, m)."""
+    lo, hi = t0, t1
+    for c, m in constraints:
+        if m == 0:
+            if c > 0:
+                return None
+        elif m > 0:
+            hi = min(hi, -c / m)
+        else:
+            lo = max(lo, -c / m)
+    return lo if lo <= hi else None
+
+
+def earliest_contact(
+    a: Sweep,
+    placement_a: Placement,
+    b: Sweep,
+    placement_b: Placement,
+    dt: float,
+) -> float | None:
+    """First time in [0, dt] the two trains overlap on a shared track."""
+    track_length = placement_a.track.length
+    times = sorted(
+        {0.0, dt}
+        | {
+            t
+            for t in (a.stop_time, b.stop_time)
+            if t is not None and 0.0 < t < dt
+        }
+    )
+    for t0, t1 in list(zip(times, times[1:])) or [(0.0, 0.0)]:
+        a_lo, a_hi = a.interval(placement_a, t0, t1)
+        b_lo, b_hi = b.interval(placement_b, t0, t1)
+        # Both trains are on the track and their clipped intervals meet.
+        constraints = [
+            (a_lo[0] - track_length, a_lo[1]),
+            (-a_hi[0], -a_hi[1]),
+            (b_lo[0] - track_length, b_lo[1]),
+            (-b_hi[0], -b_hi[1]),
+            (a_lo[0] - b_hi[0], a_lo[1] - b_hi[1]),
+            (b_lo[0] - a_hi[0], b_lo[1] - a_hi[1]),
+        ]
+        time = _earliest(constraints, t0, t1)
+        if time is not None:
+            return time
+    return None
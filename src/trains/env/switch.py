@@ -17,39 +17,47 @@ class SwitchPassthroughError(Exception):
         )
 
 
+_BRANCH_INDEX = {"approach": 0, "through": 1, "diverge": 2, "diverging": 2}
+
+
 class Switch:
-    def __init__(self, tag: str | int, state: bool = False):
+    __slots__ = ("tag", "approach", "through", "diverge", "branches")
+
+    def __init__(self, tag: str | int):
         self.tag = tag
         self.approach = Branch(self, tag_suffix="approach")
         self.through = Branch(self, tag_suffix="through")
         self.diverge = Branch(self, tag_suffix="diverging")
-        self.diverging = self.diverge
-        self.state = state
+        self.branches: tuple[Branch, Branch, Branch] = (
+            self.approach,
+            self.through,
+            self.diverge,
+        )
 
     def __str__(self) -> str:
         return str(self.tag)
 
     @property
-    def branches(self) -> set[Branch]:
-        return {self.approach, self.through, self.diverge}
+    def diverging(self) -> Branch:
+        return self.diverge
 
     def get_branch(self, branch: Literal["approach", "through", "diverge"]):
-        return {
-            "approach": self.approach,
-            "through": self.through,
-            "diverge": self.diverge,
-            "diverging": self.diverge,
-        }[branch]
-
-    def pass_through(self, from_: Branch) -> Branch:
+        return self.branches[_BRANCH_INDEX[branch]]
+
+    def pass_through(self, from_: Branch, state: bool = False) -> Branch:
+        """Branch a train leaves by when it enters from ``from_``.
+
+        Switches hold no state of their own; ``state`` is the setting of
+        this switch in the system the train runs in.
+        """
         if from_ is self.approach:
-            return self.through if not self.state else self.diverge
+            return self.through if not state else self.diverge
 
         # Coming from through or diverging - check if switch is in correct state
         wrong_state = (
-            self.state
+            state
             and from_ is self.through
-            or not self.state
+            or not state
             and from_ is self.diverge
         )
         if wrong_state:
@@ -1,62 +1,259 @@
 from __future__ import annotations
 
-from typing import Any, Iterable
-
-from trains.env.deadend import DeadEnd
+import gc
+import hashlib
+import heapq
+import json
+import os
+from collections.abc import MutableSequence
+from contextlib import contextmanager
+from operator import itemgetter
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Mapping
+
+from trains.env.occupancy import OccupancyIndex
+from trains.env.snapshot import SystemSnapshot
+from trains.env.status import StepStatus, TrainStatus
 from trains.env.switch import Switch
+from trains.env.topology import Topology
 from trains.env.track import Track
 from trains.env.train import Train
 from trains.exceptions import SwitchOverlapError, TrainCollisionError
-from trains.ser.system import (
-    BranchModel,
-    DeadEndBranchModel,
-)
+
+
+if TYPE_CHECKING:
+    from torch_geometric.data import Data
+
+    from trains.env.arrays import ArraySystem
+    from trains.env.base import Node
+    from trains.env.branch import Branch
+    from trains.env.deadend import DeadEnd
+    from trains.env.profile import StepProfiler
+    from trains.env.record import TrajectoryRecorder
+    from trains.env.sweep import Placement
+    from trains.ser.system import SystemModel
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """Hold off the cyclic garbage collector while building a layout.
+
+    Loading allocates hundreds of thousands of long-lived objects, and
+    the collections that triggers scan all of them again and again; on
+    large layouts that is most of the load time.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class TrainList(MutableSequence):
+    """The trains of a :class:`System`, a list that keeps it indexed.
+
+    Every edit (``append``, ``remove``, item assignment, ``del`` and the
+    rest of the list API) registers the trains it adds with the system's
+    occupancy index and ``train_map`` and unregisters the ones it drops,
+    so lookups never have to check for edits.
+    """
+
+    __slots__ = ("_system", "_items", "_counts")
+
+    def __init__(self, system: System, trains: Iterable[Train] = ()):
+        self._system = system
+        self._items: list[Train] = []
+        # How often each train is listed, so one listed twice stays
+        # registered until both entries are gone.
+        self._counts: dict[Train, int] = {}
+        self.extend(trains)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Train]:
+        return iter(self._items)
+
+    def __contains__(self, train: object) -> bool:
+        return train in self._counts
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = list(value)
+            old = self._items[index]
+            self._items[index] = value
+        else:
+            old = [self._items[index]]
+            self._items[index] = value
+            value = [value]
+        self._added(value)
+        self._dropped(old)
+
+    def __delitem__(self, index):
+        old = self._items[index]
+        del self._items[index]
+        self._dropped(old if isinstance(index, slice) else [old])
+
+    def insert(self, index: int, train: Train):
+        self._items.insert(index, train)
+        self._added([train])
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, TrainList):
+            other = other._items
+        return self._items == other
+
+    def __repr__(self) -> str:
+        return f"TrainList({self._items!r})"
+
+    def _added(self, trains: Iterable[Train]):
+        counts = self._counts
+        for train in trains:
+            count = counts.get(train, 0)
+            counts[train] = count + 1
+            if not count:
+                self._system._register(train)
+
+    def _dropped(self, trains: Iterable[Train]):
+        counts = self._counts
+        for train in trains:
+            count = counts[train] - 1
+            if count:
+                counts[train] = count
+            else:
+                del counts[train]
+                self._system._unregister(train)
 
 
 class System:
+    """Trains and switch states running on a shared :class:`Topology`.
+
+    The layout is immutable and may be shared by any number of systems;
+    a system only owns what changes during a simulation. Switch states
+    are kept in ``switch_states``, in the order of ``topology.switches``.
+    """
+
     def __init__(
         self,
-        switches: Iterable[Switch],
-        deadends: Iterable[DeadEnd],
+        topology: Topology,
         trains: Iterable[Train],
+        switch_states: Iterable[bool] | None = None,
     ):
-        self.switches = list(switches)
-        self.deadends = list(deadends)
-        self.trains = list(trains)
+        self.topology = topology
+        if switch_states is None:
+            self.switch_states = [False] * len(topology.switches)
+        else:
+            self.switch_states = list(switch_states)
+        self.occupancy = OccupancyIndex(())
+        self._train_map: dict[str | int, Train] = {}
+        self._trains = TrainList(self, trains)
+        self._track_collisions: dict[
+            Track, list[tuple[Train, Train, Track]]
+        ] = {}
+        self.profiler: StepProfiler | None = None
+        self.recorder: TrajectoryRecorder | None = None
+        # How far the last step moved trains, or None if it raised
+        # before moving them.
+        self._advanced: float | None = None
+        # ``encode`` results by ``edge_subdivisions``, reused in place.
+        self._encodings: dict[int, Data] = {}
 
     @classmethod
-    def from_json(cls, data: dict[str, Any]) -> System:
-        from trains.ser.system import SystemModel
+    def from_json(cls, data: dict[str, Any], validate: bool = True) -> System:
+        """Build a system from a parsed ``SystemModel`` document.
 
-        model = SystemModel(**data)
+        With ``validate=False`` the document is trusted: it is read as is,
+        without pydantic, and malformed input fails with whatever error
+        it happens to trigger.
+        """
+        with _gc_paused():
+            if not validate:
+                return cls._from_data(data)
 
-        switches: dict[str, Switch] = {}
-        for switch_model in model.switches:
-            switch = Switch(tag=switch_model.tag, state=switch_model.state)
-            switches |= {switch.tag: switch}
+            from trains.ser.system import SystemModel
 
-        deadends: dict[str, DeadEnd] = {}
-        for end_model in model.deadends:
-            end = DeadEnd(tag=end_model.tag)
-            deadends |= {end.tag: end}
+            return cls._from_model(SystemModel(**data))
 
-        def resolve_branch(bmodel: BranchModel):
-            if isinstance(bmodel, DeadEndBranchModel):
-                return deadends[bmodel.node].branch
-            else:
-                return switches[bmodel.node].get_branch(bmodel.branch)
-
-        tracks = []
-        for track_model in model.tracks:
-            from_branch = resolve_branch(track_model.from_)
-            to_branch = resolve_branch(track_model.to)
-            track = Track(
-                ends=(from_branch, to_branch),
-                length=track_model.length,
-            )
-            from_branch.track = track
-            to_branch.track = track
-            tracks.append(track)
+    @classmethod
+    def from_bytes(cls, data: bytes | str, validate: bool = True) -> System:
+        """Build a system from a raw JSON ``SystemModel`` document.
+
+        Validation parses the bytes directly in pydantic's JSON mode,
+        without building an intermediate dict. See ``from_json`` for
+        ``validate=False``.
+        """
+        with _gc_paused():
+            if not validate:
+                return cls._from_data(json.loads(data))
+
+            from trains.ser.system import SystemModel
+
+            return cls._from_model(SystemModel.model_validate_json(data))
+
+    @classmethod
+    def from_file(
+        cls,
+        path: str | os.PathLike[str],
+        validate: bool = True,
+        cache: bool | str | os.PathLike[str] = False,
+    ) -> System:
+        """Read a JSON ``SystemModel`` document with ``from_bytes``.
+
+        With ``cache`` the layout is also compiled into a binary file, at
+        ``cache`` or, if it is ``True``, at ``path`` with ``.bin`` added.
+        Later calls whose JSON has the same SHA-256 memory-map that file
+        instead of parsing the JSON again; see :mod:`trains.env.binary`.
+        A damaged cache file is rebuilt, and one that cannot be written
+        is skipped.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        if not cache:
+            return cls.from_bytes(data, validate=validate)
+
+        from trains.env import binary
+
+        if cache is True:
+            cache = os.fspath(path) + ".bin"
+        digest = hashlib.sha256(data).hexdigest()
+        try:
+            layout = binary.BinaryLayout(cache)
+        except (FileNotFoundError, binary.BinaryLayoutError):
+            layout = None
+        if layout is not None and layout.source_hash == digest:
+            with _gc_paused():
+                return layout.system()
+
+        system = cls.from_bytes(data, validate=validate)
+        try:
+            binary.write(system, cache, source_hash=digest)
+        except OSError:
+            # The cache only saves time; a read-only directory or a full
+            # disk must not fail the load.
+            pass
+        return system
+
+    @classmethod
+    def from_binary(cls, path: str | os.PathLike[str]) -> System:
+        """Load a system written by ``to_binary``, memory-mapping it."""
+        from trains.env.binary import read
+
+        with _gc_paused():
+            return read(path)
+
+    def to_binary(self, path: str | os.PathLike[str]):
+        """Write this system as a binary layout for ``from_binary``."""
+        from trains.env.binary import write
+
+        write(self, path)
+
+    @classmethod
+    def _from_model(cls, model: SystemModel) -> System:
+        topology = Topology.from_model(model)
 
         trains = {}
         for train_model in model.trains:
@@ -65,152 +262,541 @@ class System:
                 speed=train_model.speed,
                 length=train_model.length,
                 head_distance=train_model.head_distance,
-                head_branch=resolve_branch(train_model.head_branch),
+                head_branch=topology.resolve(train_model.head_branch),
+            )
+            trains |= {train.tag: train}
+
+        return cls(
+            topology=topology,
+            trains=trains.values(),
+            switch_states=[
+                switch_model.state for switch_model in model.switches
+            ],
+        )
+
+    @classmethod
+    def _from_data(cls, data: dict[str, Any]) -> System:
+        topology = Topology.from_data(data)
+
+        trains = {}
+        for train_data in data["trains"]:
+            train = Train(
+                tag=train_data["tag"],
+                speed=train_data["speed"],
+                length=train_data["length"],
+                head_distance=train_data["head_distance"],
+                head_branch=topology.resolve_data(train_data["head_branch"]),
             )
             trains |= {train.tag: train}
 
         return cls(
-            switches=switches.values(),
-            deadends=deadends.values(),
+            topology=topology,
             trains=trains.values(),
+            switch_states=[switch["state"] for switch in data["switches"]],
+        )
+
+    def to_json(self) -> dict[str, Any]:
+        """The layout, switch states and trains as ``from_json`` reads them."""
+
+        def branch_json(branch: Branch) -> dict[str, str]:
+            node = str(branch.parent.tag)
+            if isinstance(branch.parent, Switch):
+                name = branch._tag_suffix
+                return {
+                    "node": node,
+                    "branch": "diverge" if name == "diverging" else name,
+                }
+            return {"node": node}
+
+        return {
+            "switches": [
+                {"tag": str(switch.tag), "state": state}
+                for switch, state in zip(self.switches, self.switch_states)
+            ],
+            "deadends": [{"tag": str(end.tag)} for end in self.deadends],
+            "tracks": [
+                {
+                    "from_": branch_json(track.ends[0]),
+                    "to": branch_json(track.ends[1]),
+                    "length": track.length,
+                }
+                for track in self.topology.tracks
+            ],
+            "trains": [
+                {
+                    "tag": str(train.tag),
+                    "speed": train.speed,
+                    "length": train.length,
+                    "head_distance": train.head_distance,
+                    "head_branch": branch_json(train.head_branch),
+                }
+                for train in self.trains
+            ],
+        }
+
+    def to_arrays(self) -> ArraySystem:
+        """Compile this system into a struct-of-arrays stepping engine."""
+        from trains.env.arrays import ArraySystem
+
+        return ArraySystem(self)
+
+    def encode(self, edge_subdivisions: int = 1) -> Data:
+        """Encode the current state as a PyTorch Geometric ``Data``.
+
+        See :class:`~trains.env.encode.GraphEncoder`. The graph and its
+        static features are built once per topology. Each system keeps
+        its own output, so the returned tensors are overwritten by this
+        system's next call, but not by other systems on the layout.
+        """
+        encoder = self.topology.encoder(edge_subdivisions)
+        data = encoder.encode(self, self._encodings.get(edge_subdivisions))
+        self._encodings[edge_subdivisions] = data
+        return data
+
+    def step(
+        self, dt: float, continuous: bool = False, pre_check: bool = True
+    ):
+        """Advance every train by ``dt``.
+
+        By default collisions are sampled before and after moving. With
+        ``continuous`` the whole step is swept instead: if trains touch at
+        any time within it, every train is advanced to the earliest such
+        time and a ``TrainCollisionError`` carrying that time is raised.
+
+        The check before moving is skipped while the last check found no
+        collisions and nothing has moved or been edited since, which is
+        the case between consecutive steps. Pass ``pre_check=False`` to
+        skip it regardless and check only once, after moving.
+
+        While a :class:`~trains.env.profile.StepProfiler` is set as
+        ``profiler``, discrete steps are recorded phase by phase. While a
+        :class:`~trains.env.record.TrajectoryRecorder` is set as
+        ``recorder``, the state after every step that moved trains is
+        appended to it, whether or not the step then raised.
+        """
+        recorder = self.recorder
+        if recorder is None:
+            self._step(dt, continuous, pre_check)
+            return
+        self._advanced = None
+        error = None
+        try:
+            self._step(dt, continuous, pre_check)
+        except TrainCollisionError as e:
+            error = e
+            raise
+        finally:
+            # Steps that raise after moving trains are recorded too, with
+            # the time they actually moved them by.
+            if self._advanced is not None:
+                recorder.record(self, self._advanced, error)
+
+    def _step(self, dt: float, continuous: bool, pre_check: bool):
+        if continuous:
+            self._step_continuous(dt)
+            return
+        profiler = self.profiler
+        if profiler is not None:
+            profiler._begin(dt)
+        collisions = None
+        try:
+            if pre_check and not self._known_clean():
+                if profiler is not None:
+                    profiler._start("pre_detect", self)
+                collisions = self.detect_collisions()
+                if collisions:
+                    raise TrainCollisionError(collisions)
+
+            if profiler is not None:
+                profiler._start("move")
+            self._advanced = dt
+            for train in self.trains:
+                train.step(dt)
+
+            if profiler is not None:
+                profiler._start("post_detect", self)
+            if collisions := self.detect_collisions():
+                raise TrainCollisionError(collisions)
+        finally:
+            if profiler is not None:
+                profiler._end(self, collisions)
+
+    def step_status(self, dt: float) -> StepStatus:
+        """Advance every train by ``dt`` without raising.
+
+        Blocked trains stop at the end of their track and the rest keep
+        going. Collisions are checked once, after moving. The outcome for
+        each train is returned as arrays ordered like ``trains``.
+        """
+        import numpy as np
+
+        trains = self.trains
+        status = np.array(
+            [train.advance(dt * train.speed) for train in trains],
+            dtype=np.int64,
         )
+        partner = np.full(len(trains), -1, dtype=np.int64)
 
-    def step(self, dt: float):
         collisions = self.detect_collisions()
         if collisions:
-            raise TrainCollisionError(collisions)
-
+            index = {train: i for i, train in enumerate(trains)}
+            for train_a, train_b, _ in collisions:
+                a, b = index[train_a], index[train_b]
+                for row, other in ((a, b), (b, a)):
+                    status[row] = TrainStatus.COLLISION
+                    if partner[row] < 0:
+                        partner[row] = other
+        return StepStatus(status, partner)
+
+    def _step_continuous(self, dt: float):
+        contacts = self.detect_collisions_swept(dt)
+        if not contacts:
+            self._advanced = dt
+            for train in self.trains:
+                train.step(dt)
+            return
+
+        time = contacts[0][3]
+        self._advanced = time
         for train in self.trains:
-            train.step(dt)
+            train.step(time)
+        raise TrainCollisionError(
+            [contact[:3] for contact in contacts if contact[3] == time],
+            time=time,
+        )
 
-        if collisions := self.detect_collisions():
-            raise TrainCollisionError(collisions)
+    def snapshot(self) -> SystemSnapshot:
+        """Capture switch states and train positions for ``restore``."""
+        return SystemSnapshot(
+            tuple(self.switch_states),
+            tuple(
+                (
+                    tuple(train._history),
+                    train._head_distance,
+                    train.speed,
+                    train._behind,
+                )
+                for train in self.trains
+            ),
+        )
 
-    def set_switch_state(self, switch_tag: str | int, state: bool):
-        switch = self.node_map[switch_tag]
+    def restore(self, snapshot: SystemSnapshot):
+        """Return to the state captured by ``snapshot``.
 
-        overlapping_trains = []
-        for train in self.trains:
-            if self._train_overlaps_switch(train, switch):
-                overlapping_trains.append(train)
+        The snapshot must come from this system or one with the same
+        switches and trains, in the same order.
+        """
+        if len(snapshot.trains) != len(self.trains):
+            raise ValueError("Snapshot does not match this system's trains")
 
-        if overlapping_trains:
-            raise SwitchOverlapError(switch, overlapping_trains)
+        self.switch_states[:] = snapshot.switch_states
+        for train, state in zip(self.trains, snapshot.trains):
+            train._restore(*state)
 
-        switch.state = state
+    def get_switch_state(self, switch_tag: str | int) -> bool:
+        switch = self.topology.switch_map[switch_tag]
+        return self.switch_states[self.topology.switch_index[switch]]
 
-    def _train_overlaps_switch(self, train: Train, switch: Switch) -> bool:
-        for branch in switch.branches:
-            if branch in train.history:
-                return True
-        return False
+    def switch_state(self, node: Node) -> bool:
+        """State of ``node`` in this system; dead ends read as ``False``."""
+        index = self.topology.switch_index.get(node)
+        return index is not None and self.switch_states[index]
 
-    def detect_collisions(self) -> list[tuple[Train, Train, Track]] | None:
-        collisions = []
+    def next_branch(self, branch: Branch) -> Branch | None:
+        """Branch a train departing from ``branch`` continues from.
 
-        track_trains: dict[Track, list[Train]] = {}
-        for train in self.trains:
-            occupied_tracks = self._get_occupied_tracks(train)
-            for track in occupied_tracks:
-                if track not in track_trains:
-                    track_trains[track] = []
-                track_trains[track].append(train)
-
-        for track, trains_on_track in track_trains.items():
-            if len(trains_on_track) < 2:
-                continue
+        A single lookup in the topology's transition table, resolved with
+        this system's switch states. ``None`` means a dead end or a switch
+        set against the train blocks it.
+        """
+        index, unset, set_ = self.topology.exits[branch]
+        if index >= 0 and self.switch_states[index]:
+            return set_
+        return unset
 
-            for i, train_a in enumerate(trains_on_track):
-                for train_b in trains_on_track[i + 1 :]:
-                    if self._trains_collide_on_track(train_a, train_b, track):
-                        collisions.append((train_a, train_b, track))
+    def set_switch_state(self, switch_tag: str | int, state: bool):
+        switch = self.topology.switch_map[switch_tag]
 
-        return collisions if collisions else None
+        overlapping_trains = self._overlapping_trains(switch)
+        if overlapping_trains:
+            raise SwitchOverlapError(switch, overlapping_trains)
 
-    def _get_occupied_tracks(self, train: Train) -> set[Track]:
-        tracks = set()
-        distance_covered = 0.0
+        self.switch_states[self.topology.switch_index[switch]] = state
+
+    def set_switch_states(
+        self, states: Mapping[str | int, bool], strict: bool = True
+    ) -> dict[str | int, list[Train]]:
+        """Set many switches at once.
+
+        With ``strict`` nothing is changed and ``SwitchOverlapError`` is
+        raised for the first switch a train overlaps. Otherwise every free
+        switch is set and the blocked ones are returned, mapped to the
+        trains overlapping them.
+        """
+        topology = self.topology
+        switches = [
+            (topology.switch_map[tag], tag, state)
+            for tag, state in states.items()
+        ]
+
+        blocked: dict[str | int, list[Train]] = {}
+        for switch, tag, _ in switches:
+            overlapping_trains = self._overlapping_trains(switch)
+            if not overlapping_trains:
+                continue
+            if strict:
+                raise SwitchOverlapError(switch, overlapping_trains)
+            blocked[tag] = overlapping_trains
 
-        for i, branch in enumerate(train.history):
-            if branch.track is None:
-                break
+        switch_index = topology.switch_index
+        for switch, tag, state in switches:
+            if tag not in blocked:
+                self.switch_states[switch_index[switch]] = state
+        return blocked
 
-            tracks.add(branch.track)
+    def _overlapping_trains(self, switch: Switch) -> list[Train]:
+        """Trains on a track of ``switch``, read off the occupancy counts.
 
-            if i == 0:
-                distance_on_branch = train.head_distance
+        Flipping a free switch costs one dictionary lookup, however many
+        trains the system holds.
+        """
+        return self.occupancy.trains_at(switch)
+
+    def _train_overlaps_switch(self, train: Train, switch: Switch) -> bool:
+        return train in self.occupancy.node_trains.get(switch, ())
+
+    def detect_collisions(self) -> list[tuple[Train, Train, Track]] | None:
+        occupancy = self.occupancy
+        intervals: dict[Train, dict[Track, tuple[float, float]]] = {}
+        for track in occupancy.pop_changed():
+            track_collisions = self._detect_track_collisions(
+                track, occupancy.track_trains.get(track, ()), intervals
+            )
+            if track_collisions:
+                self._track_collisions[track] = track_collisions
             else:
-                distance_on_branch = branch.track.length
+                self._track_collisions.pop(track, None)
 
-            distance_covered += distance_on_branch
+        if not self._track_collisions:
+            return None
 
-            if distance_covered >= train.length:
-                break
+        tracks = sorted(self._track_collisions, key=self._first_occupant)
+        return [
+            collision
+            for track in tracks
+            for collision in self._track_collisions[track]
+        ]
+
+    def _known_clean(self) -> bool:
+        """Whether ``detect_collisions`` is certain to find nothing.
 
-        return tracks
+        The occupancy index marks every track a train moves on or is
+        edited on, so with no marked tracks and no collision left from
+        the last check there is nothing new to find.
+        """
+        return not self._track_collisions and not self.occupancy.changed
 
-    def _trains_collide_on_track(
-        self, train_a: Train, train_b: Train, track: Track
-    ) -> bool:
-        pos_a = self._get_train_position_on_track(train_a, track)
-        pos_b = self._get_train_position_on_track(train_b, track)
+    def detect_collisions_swept(
+        self, dt: float
+    ) -> list[tuple[Train, Train, Track, float]] | None:
+        """Find every pair of trains that touch within the next ``dt``.
 
-        if pos_a is None or pos_b is None:
-            return False
+        Each contact is reported once per pair and track with the earliest
+        time at which the trains touch, assuming constant speeds and the
+        current switch states. Contacts are sorted by time.
+        """
+        from trains.env.sweep import Sweep, earliest_contact
 
-        start_a, end_a = pos_a
-        start_b, end_b = pos_b
+        order = self.occupancy.order
 
-        return not (end_a < start_b or end_b < start_a)
+        track_placements: dict[Track, list[tuple[Sweep, Placement]]] = {}
+        for train in self.trains:
+            sweep = Sweep(train, dt)
+            for placement in sweep.placements:
+                track_placements.setdefault(placement.track, []).append(
+                    (sweep, placement)
+                )
+
+        earliest: dict[tuple[Train, Train, Track], float] = {}
+        for track, placements in track_placements.items():
+            for i, (sweep_a, placement_a) in enumerate(placements):
+                for sweep_b, placement_b in placements[i + 1 :]:
+                    if sweep_a.train is sweep_b.train:
+                        continue
+                    time = earliest_contact(
+                        sweep_a, placement_a, sweep_b, placement_b, dt
+                    )
+                    if time is None:
+                        continue
+                    train_a, train_b = sorted(
+                        (sweep_a.train, sweep_b.train), key=order.__getitem__
+                    )
+                    key = (train_a, train_b, track)
+                    earliest[key] = min(time, earliest.get(key, time))
+
+        if not earliest:
+            return None
+        contacts = [(*key, time) for key, time in earliest.items()]
+        contacts.sort(key=lambda c: (c[3], order[c[0]], order[c[1]]))
+        return contacts
+
+    @property
+    def trains(self) -> TrainList:
+        """The trains, as a list that keeps the system's indexes current."""
+        return self._trains
+
+    @trains.setter
+    def trains(self, trains: Iterable[Train]):
+        self._trains[:] = trains
+
+    def add_train(self, train: Train):
+        """Add ``train`` to the system, keeping every index current."""
+        self._trains.append(train)
+
+    def remove_train(self, train: Train):
+        """Remove ``train`` from the system, keeping every index current."""
+        self._trains.remove(train)
+
+    def _register(self, train: Train):
+        train.system = self
+        self.occupancy.add(train)
+        self._train_map[train.tag] = train
+
+    def _unregister(self, train: Train):
+        self.occupancy.remove(train)
+        train.system = None
+        if self._train_map.get(train.tag) is train:
+            del self._train_map[train.tag]
+
+    def _detect_track_collisions(
+        self,
+        track: Track,
+        trains_on_track: Iterable[Train],
+        intervals: dict[Train, dict[Track, tuple[float, float]]],
+    ) -> list[tuple[Train, Train, Track]]:
+        """Overlapping pairs on ``track``, found by sort and sweep.
+
+        ``intervals`` caches each train's intervals for the duration of
+        one ``detect_collisions`` call, so a train's history is walked
+        once however many changed tracks it covers. Pairs come out in
+        occupancy order, as the earlier pairwise scan produced them.
+        """
+        order = self.occupancy.order
+        spans = []
+        for train in trains_on_track:
+            train_intervals = intervals.get(train)
+            if train_intervals is None:
+                train_intervals = self._train_intervals(train)
+                intervals[train] = train_intervals
+            span = train_intervals.get(track)
+            if span is not None:
+                spans.append((span[0], span[1], order[train], train))
+        if len(spans) < 2:
+            return []
+
+        spans.sort(key=itemgetter(0))
+        # Intervals still open at the current start, keyed on their end.
+        # Every one of them overlaps each interval that starts before it
+        # is popped; touching ends count as a collision.
+        active: list[tuple[float, int, Train]] = []
+        pairs = []
+        for start, end, rank, train in spans:
+            while active and active[0][0] < start:
+                heapq.heappop(active)
+            for _, other_rank, other in active:
+                if other_rank < rank:
+                    pairs.append((other_rank, rank, other, train))
+                else:
+                    pairs.append((rank, other_rank, train, other))
+            heapq.heappush(active, (end, rank, train))
+
+        pairs.sort(key=itemgetter(0, 1))
+        return [(a, b, track) for _, _, a, b in pairs]
+
+    def _first_occupant(self, track: Track) -> tuple[int, int]:
+        """Sort key placing tracks in order of first occupation."""
+        order = self.occupancy.order
+        return min(
+            (order[train], [b.track for b in train.history].index(track))
+            for train in self.occupancy.track_trains[track]
+        )
+
+    def _get_occupied_tracks(self, train: Train) -> set[Track]:
+        return {branch.track for branch in train.history}
 
     def _get_train_position_on_track(
         self, train: Train, track: Track
     ) -> tuple[float, float] | None:
+        return self._train_intervals(train).get(track)
+
+    def _train_intervals(
+        self, train: Train
+    ) -> dict[Track, tuple[float, float]]:
+        """The span of ``train`` on every track under it, in one walk."""
+        intervals: dict[Track, tuple[float, float]] = {}
         distance_covered = 0.0
 
         for i, branch in enumerate(train.history):
-            if branch.track is None:
+            track = branch.track
+            if track is None:
                 break
 
             if i == 0:
                 distance_on_branch = train.head_distance
             else:
-                distance_on_branch = branch.track.length
+                distance_on_branch = track.length
 
-            if branch.track is track:
+            if track not in intervals:
                 if i == 0:
                     head_pos = train.head_distance
                     tail_pos = max(0.0, head_pos - train.length)
                 else:
                     remaining_length = train.length - distance_covered
-                    head_pos = branch.track.length
-                    tail_pos = branch.track.length - remaining_length
+                    head_pos = track.length
+                    tail_pos = track.length - remaining_length
+
+                # Measure from the track's first end so that trains running
+                # in opposite directions share a frame.
+                if branch is not track.ends[0]:
+                    head_pos = track.length - head_pos
+                    tail_pos = track.length - tail_pos
 
-                return (min(tail_pos, head_pos), max(tail_pos, head_pos))
+                intervals[track] = (
+                    min(tail_pos, head_pos),
+                    max(tail_pos, head_pos),
+                )
 
             distance_covered += distance_on_branch
 
             if distance_covered >= train.length:
                 break
 
-        return None
+        return intervals
+
+    @property
+    def switches(self) -> tuple[Switch, ...]:
+        return self.topology.switches
+
+    @property
+    def deadends(self) -> tuple[DeadEnd, ...]:
+        return self.topology.deadends
 
     @property
     def nodes(self):
-        return self.switches + self.deadends
+        return self.topology.nodes
 
     @property
     def node_map(self):
-        return self.switch_map | self.deadend_map
+        return self.topology.node_map
 
     @property
     def switch_map(self):
-        return {s.tag: s for s in self.switches}
+        return self.topology.switch_map
 
     @property
     def deadend_map(self):
-        return {d.tag: d for d in self.deadends}
+        return self.topology.deadend_map
 
     @property
-    def train_map(self):
-        return {t.tag: t for t in self.trains}
+    def train_map(self) -> dict[str | int, Train]:
+        return self._train_map
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterable, Mapping
+from weakref import WeakValueDictionary
+
+from trains.env.deadend import DeadEnd
+from trains.env.switch import Switch
+from trains.env.track import Track
+
+
+if TYPE_CHECKING:
+    from trains.env.branch import Branch
+    from trains.env.compiled import CompiledTopology
+    from trains.env.encode import GraphEncoder
+    from trains.ser.system import BranchModel, SystemModel
+
+
+def _branch_key(branch: Branch) -> tuple[str | int, str]:
+    return (branch.parent.tag, branch._tag_suffix)
+
+
+def _model_branch_key(bmodel: BranchModel) -> tuple[str, str]:
+    branch = getattr(bmodel, "branch", None)
+    if branch is None:
+        return (bmodel.node, "branch")
+    return (bmodel.node, "diverging" if branch == "diverge" else branch)
+
+
+def _data_branch_key(data: dict[str, str]) -> tuple[str, str]:
+    branch = data.get("branch")
+    if branch is None:
+        return (data["node"], "branch")
+    return (data["node"], "diverging" if branch == "diverge" else branch)
+
+
+def _resolve(node: Switch | DeadEnd, name: str) -> Branch:
+    # ``DeadEnd`` derives from a ``Protocol``, which makes isinstance
+    # checks against it slow; test for the plain ``Switch`` class.
+    if isinstance(node, Switch):
+        return node.get_branch(name)
+    return node.branch
+
+
+class Topology:
+    """Immutable layout: nodes, their branches and the tracks between them.
+
+    A topology holds no simulation state, so any number of systems can
+    share one. Two topologies are equal, and hash alike, when their node
+    tags and tracks are the same. ``from_model`` and ``from_data`` build
+    each distinct layout once and hand out the same object while it is
+    in use.
+
+    ``exits[b]`` is the transition table entry for a train departing from
+    branch ``b``: ``(switch, through, diverge)`` where ``switch`` is the
+    index of the switch at the far end of the track, or ``-1`` for a dead
+    end, and the other two are the branches the train continues from
+    with that switch unset and set. They are ``None`` where the train
+    cannot continue.
+    """
+
+    _cache: WeakValueDictionary[tuple, Topology] = WeakValueDictionary()
+
+    def __init__(
+        self,
+        switches: Iterable[Switch],
+        deadends: Iterable[DeadEnd],
+        tracks: Iterable[Track],
+        key: tuple | None = None,
+    ):
+        self.switches: tuple[Switch, ...] = tuple(switches)
+        self.deadends: tuple[DeadEnd, ...] = tuple(deadends)
+        self.tracks: tuple[Track, ...] = tuple(tracks)
+
+        self.switch_map = {switch.tag: switch for switch in self.switches}
+        self.deadend_map = {end.tag: end for end in self.deadends}
+        self.nodes = self.switches + self.deadends
+        self.node_map = self.switch_map | self.deadend_map
+        self.switch_index = {
+            switch: i for i, switch in enumerate(self.switches)
+        }
+
+        # Builders that start from a key pass it in rather than have it
+        # recomputed from the objects.
+        self.key = key or (
+            tuple(switch.tag for switch in self.switches),
+            tuple(end.tag for end in self.deadends),
+            tuple(
+                (
+                    _branch_key(track.ends[0]),
+                    _branch_key(track.ends[1]),
+                    track.length,
+                )
+                for track in self.tracks
+            ),
+        )
+        self.exits: dict[
+            Branch, tuple[int, Branch | None, Branch | None]
+        ] = {
+            branch: self._exit(branch)
+            for node in self.nodes
+            for branch in node.branches
+            if branch.track is not None
+        }
+        self._compiled: CompiledTopology | None = None
+        # Precompiled arrays to build ``compiled`` from, if any.
+        self._compiled_arrays: Mapping[str, Any] | None = None
+        self._encoders: dict[int, GraphEncoder] = {}
+
+    def _exit(
+        self, branch: Branch
+    ) -> tuple[int, Branch | None, Branch | None]:
+        # Spells out ``pass_through`` for both states; raising and
+        # catching its errors dominated building large layouts.
+        ends = branch.track.ends
+        arrival = ends[1] if ends[0] is branch else ends[0]
+        node = arrival.parent
+        if not isinstance(node, Switch):
+            return (-1, None, None)
+        index = self.switch_index[node]
+        if arrival is node.approach:
+            return (index, node.through, node.diverge)
+        if arrival is node.through:
+            return (index, node.approach, None)
+        return (index, None, node.approach)
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Topology):
+            return NotImplemented
+        return self.key == other.key
+
+    @classmethod
+    def from_model(cls, model: SystemModel) -> Topology:
+        return cls.from_key(
+            (
+                tuple(switch.tag for switch in model.switches),
+                tuple(end.tag for end in model.deadends),
+                tuple(
+                    (
+                        _model_branch_key(track.from_),
+                        _model_branch_key(track.to),
+                        track.length,
+                    )
+                    for track in model.tracks
+                ),
+            )
+        )
+
+    @classmethod
+    def from_data(cls, data: dict[str, Any]) -> Topology:
+        """Like ``from_model``, for an unvalidated ``SystemModel`` dict."""
+        return cls.from_key(
+            (
+                tuple(switch["tag"] for switch in data["switches"]),
+                tuple(end["tag"] for end in data["deadends"]),
+                tuple(
+                    (
+                        _data_branch_key(track["from_"]),
+                        _data_branch_key(track["to"]),
+                        track["length"],
+                    )
+                    for track in data["tracks"]
+                ),
+            )
+        )
+
+    @classmethod
+    def from_key(cls, key: tuple) -> Topology:
+        """The topology whose ``key`` is ``key``, built once while in use."""
+        topology = cls._cache.get(key)
+        if topology is None:
+            topology = cls._build(key)
+            cls._cache[key] = topology
+        return topology
+
+    @classmethod
+    def _build(cls, key: tuple) -> Topology:
+        switch_tags, deadend_tags, track_keys = key
+        switches = {tag: Switch(tag=tag) for tag in switch_tags}
+        deadends = {tag: DeadEnd(tag=tag) for tag in deadend_tags}
+        node_map = switches | deadends
+
+        tracks = []
+        for (from_node, from_name), (to_node, to_name), length in track_keys:
+            from_branch = _resolve(node_map[from_node], from_name)
+            to_branch = _resolve(node_map[to_node], to_name)
+            track = Track(ends=(from_branch, to_branch), length=length)
+            from_branch.track = track
+            to_branch.track = track
+            tracks.append(track)
+
+        return cls(switches.values(), deadends.values(), tracks, key)
+
+    @property
+    def compiled(self) -> CompiledTopology:
+        """The layout as NumPy arrays, built on first use."""
+        if self._compiled is None:
+            from trains.env.compiled import CompiledTopology
+
+            self._compiled = CompiledTopology(
+                self.switches, self.deadends, self._compiled_arrays
+            )
+        return self._compiled
+
+    def encoder(self, edge_subdivisions: int = 1) -> GraphEncoder:
+        """The shared graph encoder for ``edge_subdivisions``."""
+        encoder = self._encoders.get(edge_subdivisions)
+        if encoder is None:
+            from trains.env.encode import GraphEncoder
+
+            encoder = GraphEncoder(self, edge_subdivisions)
+            self._encoders[edge_subdivisions] = encoder
+        return encoder
+
+    def resolve(self, bmodel: BranchModel) -> Branch:
+        return _resolve(
+            self.node_map[bmodel.node], getattr(bmodel, "branch", "branch")
+        )
+
+    def resolve_data(self, data: dict[str, str]) -> Branch:
+        """Like ``resolve``, for an unvalidated branch dict."""
+        return _resolve(
+            self.node_map[data["node"]], data.get("branch", "branch")
+        )
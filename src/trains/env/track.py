@@ -10,6 +10,8 @@ if TYPE_CHECKING:
 
 
 class Track(Tagged):
+    __slots__ = ("tag", "ends", "length")
+
     def __init__(self, ends: tuple[Branch, Branch], length: float):
         self.tag = "track"
         self.ends = ends
@@ -1,16 +1,30 @@
 from collections import deque
+from itertools import islice
 from typing import TYPE_CHECKING
 
 from trains.env.branch import Branch
-from trains.env.deadend import DeadEndCollision
+from trains.env.deadend import DeadEnd, DeadEndCollision
+from trains.env.status import TrainStatus
 from trains.env.switch import SwitchPassthroughError
 
 
 if TYPE_CHECKING:
+    from trains.env.occupancy import OccupancyIndex
+    from trains.env.system import System
     from trains.env.track import Track
 
 
 class Train:
+    __slots__ = (
+        "tag",
+        "_head_distance",
+        "_length",
+        "speed",
+        "system",
+        "_history",
+        "_behind",
+    )
+
     def __init__(
         self,
         tag: str | int,
@@ -20,25 +34,57 @@ class Train:
         speed: float,
     ):
         self.tag: str | int = tag
-        self.head_distance: float = head_distance
-        self.length = length
+        self._head_distance: float = head_distance
+        self._length = length
         self.speed = speed
+        self.system: "System | None" = None
         self._history: deque[Branch] = deque([head_branch])
+        # Total length of the tracks behind the head track in ``_history``.
+        self._behind = 0.0
 
     def __str__(self) -> str:
         return str(self.tag)
 
+    @property
+    def occupancy(self) -> "OccupancyIndex | None":
+        system = self.system
+        return system.occupancy if system is not None else None
+
     @property
     def head_branch(self) -> Branch:
         return self._history[0]
 
+    @property
+    def head_distance(self) -> float:
+        return self._head_distance
+
+    @head_distance.setter
+    def head_distance(self, value: float):
+        self._reposition(self._history, value, trim=False)
+
+    @property
+    def length(self) -> float:
+        return self._length
+
+    @length.setter
+    def length(self, value: float):
+        self._length = value
+        self._reposition(self._history, self._head_distance, trim=False)
+
     @property
     def history(self) -> deque[Branch]:
+        """Branches under the train, head first.
+
+        Stepping drops the tail end as soon as the train has moved past
+        it. A history set by hand is kept whole until the next step or
+        ``trim``, so setting ``history`` and ``head_distance`` in either
+        order gives the same train; ``place`` sets both at once.
+        """
         return self._history
 
     @history.setter
     def history(self, value: deque[Branch]):
-        self._history = value
+        self._reposition(value, self._head_distance, trim=False)
 
     @property
     def track(self) -> "Track":
@@ -59,61 +105,202 @@ class Train:
 
     @property
     def tail_distance(self) -> float:
-        distance_covered = 0.0
+        history = self._history
+        covered = self._head_distance + self._behind
+        if covered < self._length:
+            return 0.0
+        # The tail is on the last track unless the history was set by
+        # hand and runs past it.
+        i = len(history) - 1
+        while i > 0 and covered - history[i].track.length >= self._length:
+            covered -= history[i].track.length
+            i -= 1
+        if i == 0:
+            return self._length
+        return self._length - (covered - history[i].track.length)
+
+    def place(self, history: deque[Branch], head_distance: float):
+        """Set ``history`` and ``head_distance`` together and trim."""
+        self._reposition(history, head_distance, trim=True)
+        return self
+
+    def _reposition(
+        self, history: deque[Branch], head_distance: float, trim: bool
+    ):
+        """Replace the train's position, re-registering its occupancy."""
+        occupancy = self.occupancy
+        if occupancy is not None:
+            occupancy.release(self)
+        self._history = history
+        self._head_distance = head_distance
+        if trim:
+            self._trim()
+        else:
+            self._behind = self._measure_behind()
+        if occupancy is not None:
+            occupancy.occupy(self)
+
+    def _restore(
+        self,
+        history: tuple[Branch, ...],
+        head_distance: float,
+        speed: float,
+        behind: float,
+    ):
+        """Reinstate a position captured by ``System.snapshot``."""
+        occupancy = self.occupancy
+        if occupancy is not None:
+            occupancy.release(self)
+        self._history = deque(history)
+        self._head_distance = head_distance
+        self._behind = behind
+        self.speed = speed
+        if occupancy is not None:
+            occupancy.occupy(self)
+
+    def _measure_behind(self) -> float:
+        return sum(
+            branch.track.length for branch in islice(self._history, 1, None)
+        )
 
-        for i, branch in enumerate(self.history):
-            if i == 0:
-                segment_length = self.head_distance
-            else:
-                if branch.track is None:
-                    return 0.0
-                segment_length = branch.track.length
+    def _enter(self, branch: Branch):
+        previous = self._history[0]
+        self._history.appendleft(branch)
+        self._head_distance = 0.0
+        self._behind += previous.track.length
+        system = self.system
+        if system is not None:
+            system.occupancy.enter(self, branch)
+            if system.profiler is not None:
+                system.profiler._transition(previous, branch)
 
-            if distance_covered + segment_length >= self.length:
-                distance_into_segment = self.length - distance_covered
-                return distance_into_segment
+    def _release_tail(self):
+        """Drop the tail end of the history once the train has left it."""
+        history = self._history
+        occupancy = self.occupancy
+        released = False
+        while len(history) > 1:
+            tail = history[-1]
+            covered = self._head_distance + self._behind - tail.track.length
+            if covered < self._length:
+                break
+            history.pop()
+            self._behind -= tail.track.length
+            released = True
+            if occupancy is not None:
+                occupancy.leave(self, tail)
+        if released:
+            # Re-sum rather than subtract so rounding errors cannot build up
+            # over long runs.
+            self._behind = self._measure_behind()
 
-            distance_covered += segment_length
-        return 0.0
+        if occupancy is not None:
+            occupancy.touch(history[0].track)
+            occupancy.touch(history[-1].track)
 
     def trim(self):
-        distance_left = self.length
+        """Drop history entries the train body no longer covers.
+
+        ``step`` already does this as the tail advances, so this only has
+        an effect after the train was edited by hand.
+        """
+        self._reposition(self._history, self._head_distance, trim=True)
+        return self
+
+    def _trim(self):
+        distance_left = self._length
         new_history: deque[Branch] = deque()
 
-        head_branch = self.history.popleft()
+        history = iter(self._history)
+        head_branch = next(history)
         new_history.append(head_branch)
-        distance_left -= self.head_distance
+        distance_left -= self._head_distance
 
-        while distance_left > 0 and self.history:
-            branch = self.history.popleft()
+        for branch in history:
+            if distance_left <= 0 or branch.track is None:
+                break
             new_history.append(branch)
-            if branch.track is not None:
-                distance_left -= branch.track.length
+            distance_left -= branch.track.length
 
-        self.history = new_history
-        return self
+        self._history = new_history
+        self._behind = self._measure_behind()
 
     def step(self, dt: float):
-        step_distance = dt * self.speed
-        while step_distance > 0:
-            current_track = self.track
-            remaining_on_track = current_track.length - self.head_distance
-
-            if step_distance < remaining_on_track:
-                self.head_distance += step_distance
-                step_distance = 0
-
-            else:
-                try:
-                    step_distance -= remaining_on_track
-                    head_branch = self.history[0]
-                    next_branch = head_branch.other()
-                    next_head_branch = next_branch.parent.pass_through(
-                        next_branch
-                    )
-                    self.history.appendleft(next_head_branch)
-                    self.head_distance = 0.0
-
-                except (DeadEndCollision, SwitchPassthroughError) as e:
-                    self.head_distance = current_track.length
-                    raise e
+        self.move(dt * self.speed)
+
+    def move(self, distance: float):
+        """Advance the head ``distance`` along the route."""
+        if self.advance(distance):
+            raise self._blocked_error()
+
+    def advance(self, distance: float) -> TrainStatus:
+        """Like ``move``, but report a blocked route instead of raising.
+
+        A blocked train stops at the end of its track, as with ``move``.
+        """
+        if distance <= 0:
+            return TrainStatus.OK
+
+        status = TrainStatus.OK
+        try:
+            while distance > 0:
+                remaining_on_track = self.track.length - self._head_distance
+
+                if distance < remaining_on_track:
+                    self._head_distance += distance
+                    distance = 0
+
+                else:
+                    distance -= remaining_on_track
+                    status = self._cross()
+                    if status:
+                        break
+        finally:
+            self._release_tail()
+        return status
+
+    def cross(self):
+        """Move the head from the end of its track onto the next track.
+
+        Raises ``DeadEndCollision`` or ``SwitchPassthroughError`` and leaves
+        the head at the end of its track if the next node blocks it.
+        """
+        try:
+            status = self._cross()
+        finally:
+            self._release_tail()
+        if status:
+            raise self._blocked_error()
+
+    def _cross(self) -> TrainStatus:
+        head_branch = self._history[0]
+        system = self.system
+        if system is not None:
+            next_branch = system.next_branch(head_branch)
+        else:
+            next_branch = self._pass_through(head_branch)
+
+        if next_branch is None:
+            self._head_distance = head_branch.track.length
+            if isinstance(head_branch.other().parent, DeadEnd):
+                return TrainStatus.DEAD_END
+            return TrainStatus.WRONG_WAY
+
+        self._enter(next_branch)
+        return TrainStatus.OK
+
+    def _pass_through(self, head_branch: Branch) -> Branch | None:
+        """Next branch for a train outside any system, or ``None``."""
+        arrival = head_branch.other()
+        try:
+            return arrival.parent.pass_through(arrival)
+        except (DeadEndCollision, SwitchPassthroughError):
+            return None
+
+    def _blocked_error(self) -> Exception:
+        """The error for the node blocking the head at the end of its track."""
+        arrival = self._history[0].other()
+        node = arrival.parent
+        if isinstance(node, DeadEnd):
+            return DeadEndCollision(node)
+        return SwitchPassthroughError(node, arrival)
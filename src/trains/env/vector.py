@@ -0,0 +1,203 @@
+"""Many independent copies of one system stepped as a batch."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+
+from trains.env.arrays import (
+    advance,
+    collision_pairs,
+    first_partners,
+    trim,
+)
+from trains.env.status import TrainStatus
+
+
+if TYPE_CHECKING:
+    from trains.env.system import System
+
+
+class VectorStep(NamedTuple):
+    """Batched result of ``VectorSystem.step``.
+
+    Per-train arrays have shape ``(num_envs, num_trains)`` and per-switch
+    arrays ``(num_envs, num_switches)``. They describe the state reached
+    by the step, before finished environments are reset.
+
+    ``status`` holds :class:`TrainStatus` codes as in ``step_status``,
+    and ``partner`` the index within the environment of each train's
+    first collision partner, or ``-1``.
+    """
+
+    head_branch: np.ndarray
+    head_distance: np.ndarray
+    switch_state: np.ndarray
+    rejected: np.ndarray
+    status: np.ndarray
+    partner: np.ndarray
+    collided: np.ndarray
+    terminated: np.ndarray
+    truncated: np.ndarray
+
+
+class VectorSystem:
+    """``num_envs`` independent states over one compiled topology.
+
+    Every environment starts from the state of ``system``. ``step`` takes
+    per-environment switch actions and ``dt`` and advances all trains of
+    all environments in one batched operation. Environments whose trains
+    collide, hit a dead end or run a switch the wrong way are terminated,
+    those reaching ``max_steps`` are truncated, and both are reset to the
+    initial state at the end of the step.
+
+    Train rows are laid out environment by environment, so train ``t`` of
+    environment ``e`` lives in row ``e * num_trains + t``.
+    """
+
+    def __init__(
+        self, system: System, num_envs: int, max_steps: int | None = None
+    ):
+        initial = system.to_arrays()
+        self.topology = initial.topology
+        self.num_envs = num_envs
+        self.num_trains = len(initial.length)
+        self.num_switches = len(initial.switch_state)
+        self.max_steps = max_steps
+
+        self._initial_switch_state = initial.switch_state
+        self._initial_head_distance = initial.head_distance
+        self._initial_history = initial.history
+        self._initial_history_len = initial.history_len
+
+        env = np.repeat(np.arange(num_envs), self.num_trains)
+        self._env = env
+        self._switch_offset = env * self.num_switches
+        self._track_offset = env * len(self.topology.tracks)
+        self.speed = np.tile(initial.speed, num_envs)
+        self.length = np.tile(initial.length, num_envs)
+
+        self.switch_state = np.empty(
+            (num_envs, self.num_switches), dtype=bool
+        )
+        self.head_distance = np.empty(num_envs * self.num_trains)
+        self.history = np.empty(
+            (num_envs * self.num_trains, initial.history.shape[1]),
+            dtype=np.int64,
+        )
+        self.history_len = np.empty(
+            num_envs * self.num_trains, dtype=np.int64
+        )
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.reset()
+
+    @property
+    def head_branch(self) -> np.ndarray:
+        return self.history[:, 0].reshape(self.num_envs, self.num_trains)
+
+    def reset(self, mask: np.ndarray | None = None):
+        """Return the environments selected by ``mask`` to the start."""
+        if mask is None:
+            envs = np.arange(self.num_envs)
+        else:
+            envs = np.flatnonzero(mask)
+        if not envs.size:
+            return
+        rows = (
+            envs[:, None] * self.num_trains + np.arange(self.num_trains)
+        ).ravel()
+        width = self._initial_history.shape[1]
+
+        self.switch_state[envs] = self._initial_switch_state
+        self.head_distance[rows] = np.tile(
+            self._initial_head_distance, len(envs)
+        )
+        self.history[rows] = -1
+        self.history[rows, :width] = np.tile(
+            self._initial_history, (len(envs), 1)
+        )
+        self.history_len[rows] = np.tile(
+            self._initial_history_len, len(envs)
+        )
+        self.steps[envs] = 0
+
+    def step(
+        self, actions: np.ndarray | None, dt: float | np.ndarray
+    ) -> VectorStep:
+        """Apply switch ``actions`` and advance every environment by ``dt``.
+
+        ``actions`` holds the requested state of every switch with shape
+        ``(num_envs, num_switches)``. Requests to flip a switch that a
+        train overlaps are ignored and reported in ``rejected``.
+        """
+        rejected = np.zeros_like(self.switch_state)
+        if actions is not None:
+            actions = np.asarray(actions, dtype=bool)
+            rejected = (actions != self.switch_state) & self._overlaps()
+            self.switch_state = np.where(rejected, self.switch_state, actions)
+
+        dt = np.broadcast_to(np.asarray(dt, dtype=np.float64), self.num_envs)
+        distance = dt[self._env] * self.speed
+        self.history, status = advance(
+            self.topology,
+            self.switch_state.ravel(),
+            self.history,
+            self.history_len,
+            self.head_distance,
+            distance,
+            self._switch_offset,
+        )
+        trim(
+            self.topology,
+            self.history,
+            self.history_len,
+            self.head_distance,
+            self.length,
+        )
+
+        train_a, train_b, _ = collision_pairs(
+            self.topology,
+            self.history,
+            self.history_len,
+            self.head_distance,
+            self.length,
+            self._track_offset,
+        )
+        partner = first_partners(len(status), train_a, train_b)
+        collided = partner >= 0
+        status[collided] = TrainStatus.COLLISION
+        partner[collided] -= (self._env * self.num_trains)[collided]
+
+        shape = (self.num_envs, self.num_trains)
+        status = status.reshape(shape)
+        partner = partner.reshape(shape)
+        collided = collided.reshape(shape)
+        self.steps += 1
+        terminated = (status != 0).any(axis=1)
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        if self.max_steps is not None:
+            truncated = ~terminated & (self.steps >= self.max_steps)
+
+        result = VectorStep(
+            head_branch=self.head_branch.copy(),
+            head_distance=self.head_distance.reshape(shape).copy(),
+            switch_state=self.switch_state.copy(),
+            rejected=rejected,
+            status=status,
+            partner=partner,
+            collided=collided,
+            terminated=terminated,
+            truncated=truncated,
+        )
+        self.reset(terminated | truncated)
+        return result
+
+    def _overlaps(self) -> np.ndarray:
+        """Which switches each environment's trains currently cover."""
+        overlaps = np.zeros((self.num_envs, self.num_switches), dtype=bool)
+        rows, cols = np.nonzero(
+            (self.history >= 0) & (self.history < 3 * self.num_switches)
+        )
+        overlaps[self._env[rows], self.history[rows, cols] // 3] = True
+        return overlaps
@@ -29,8 +29,13 @@ class SwitchOverlapError(Exception):
 class TrainCollisionError(Exception):
     """Raised when trains collide on a track."""
 
-    def __init__(self, trains: list[tuple[Train, Train, Track]]):
+    def __init__(
+        self,
+        trains: list[tuple[Train, Train, Track]],
+        time: float | None = None,
+    ):
         self.trains = trains
+        self.time = time
 
     def __str__(self) -> str:
         collisions = []
@@ -38,4 +43,7 @@ class TrainCollisionError(Exception):
             collisions.append(
                 f"{train_a.tag} and {train_b.tag} on track {track.tag}"
             )
-        return f"Train collision(s) detected: {', '.join(collisions)}"
+        message = f"Train collision(s) detected: {', '.join(collisions)}"
+        if self.time is not None:
+            message += f" at t={self.time:g}"
+        return message
@@ -0,0 +1,43 @@
+import json
+
+from trains.env import System
+
+
+def load(path, speeds=None):
+    """Load a system from ``path``, overriding train speeds by tag."""
+    with open(path) as f:
+        data = json.load(f)
+    for train in data["trains"]:
+        train["speed"] = (speeds or {}).get(train["tag"], train["speed"])
+    return System.from_json(data)
+
+
+def make_simple_system(trains_data, length=10.0):
+    """A single track of ``length`` between dead ends A and B."""
+    json_data = {
+        "switches": [],
+        "deadends": [{"tag": "A"}, {"tag": "B"}],
+        "tracks": [
+            {"from_": {"node": "A"}, "to": {"node": "B"}, "length": length}
+        ],
+        "trains": trains_data,
+    }
+    return System.from_json(json_data)
+
+
+def simple_train(tag, speed, head_distance, node="A", length=1.0):
+    """A train for ``make_simple_system``."""
+    return {
+        "tag": tag,
+        "speed": speed,
+        "length": length,
+        "head_distance": head_distance,
+        "head_branch": {"node": node},
+    }
+
+
+def make_collision_system():
+    """T2 runs into the stopped T1 two seconds in."""
+    return make_simple_system(
+        [simple_train("T1", 0.0, 5.0), simple_train("T2", 1.0, 2.0)]
+    )
@@ -0,0 +1,149 @@
+import random
+from unittest import TestCase
+
+from trains.env.deadend import DeadEndCollision
+from trains.env.switch import SwitchPassthroughError
+from trains.exceptions import SwitchOverlapError, TrainCollisionError
+
+from test.helpers import load, make_simple_system, simple_train
+
+
+def train_state(system):
+    return [
+        (train.head_branch.tag, round(train.head_distance, 9))
+        for train in system.trains
+    ]
+
+
+class TestArraySystemParity(TestCase):
+    def assert_same_run(self, reference, arrays, steps, dt, flips=()):
+        flips = dict(flips)
+        for i in range(steps):
+            if i in flips:
+                tag, state = flips[i]
+                errors = []
+                for target in (reference, arrays):
+                    try:
+                        target.set_switch_state(tag, state)
+                    except SwitchOverlapError as e:
+                        errors.append([t.tag for t in e.trains])
+                    else:
+                        errors.append(None)
+                self.assertEqual(errors[0], errors[1])
+
+            errors = []
+            for target in (reference, arrays):
+                try:
+                    target.step(dt)
+                except Exception as e:
+                    errors.append(e)
+                else:
+                    errors.append(None)
+
+            arrays.sync()
+            self.assertEqual(
+                train_state(reference), train_state(arrays.system)
+            )
+            self.assertEqual(type(errors[0]), type(errors[1]))
+            if errors[0] is not None:
+                return errors
+
+    def test_loop_matches_object_model(self):
+        reference = load("test/data/loop_system.json")
+        arrays = load("test/data/loop_system.json").to_arrays()
+
+        errors = self.assert_same_run(reference, arrays, 40, 1.0)
+
+        self.assertIsInstance(errors[1], SwitchPassthroughError)
+        self.assertEqual(errors[1].switch.tag, errors[0].switch.tag)
+
+    def test_random_flips_match_object_model(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            flips = {
+                rng.randrange(60): (rng.choice("ABC"), rng.random() < 0.5)
+                for _ in range(10)
+            }
+            dt = rng.choice([0.25, 0.5, 1.0, 3.0, 17.0])
+            reference = load("test/data/loop_system.json")
+            arrays = load("test/data/loop_system.json").to_arrays()
+            self.assert_same_run(reference, arrays, 60, dt, flips)
+
+    def test_dead_end_matches_object_model(self):
+        reference = load("test/data/simulate_system.json")
+        arrays = load("test/data/simulate_system.json").to_arrays()
+
+        errors = self.assert_same_run(reference, arrays, 30, 1.0)
+
+        self.assertIsInstance(errors[1], DeadEndCollision)
+        self.assertEqual(errors[1].dead_end.tag, "D3")
+        self.assertAlmostEqual(arrays.head_distance[0], 10.0)
+
+
+class TestArraySystemCollisions(TestCase):
+    def test_collision_pairs_match_object_model(self):
+        system = make_simple_system(
+            [
+                simple_train("T1", 0.0, 5.0),
+                simple_train("T2", 0.0, 4.5),
+                simple_train("T3", 0.0, 9.0),
+                simple_train("T4", 0.0, 5.5, node="B"),
+            ]
+        )
+
+        expected = [
+            (a.tag, b.tag, t) for a, b, t in system.detect_collisions()
+        ]
+        actual = [
+            (a.tag, b.tag, t)
+            for a, b, t in system.to_arrays().detect_collisions()
+        ]
+
+        self.assertEqual(expected, actual)
+        self.assertEqual(
+            [(a, b) for a, b, _ in actual],
+            [("T1", "T2"), ("T1", "T4"), ("T2", "T4")],
+        )
+
+    def test_opposite_directions_do_not_collide_at_far_ends(self):
+        system = make_simple_system(
+            [simple_train("T1", 0.0, 1.0), simple_train("T2", 0.0, 1.0, "B")]
+        )
+
+        self.assertIsNone(system.detect_collisions())
+        self.assertIsNone(system.to_arrays().detect_collisions())
+
+    def test_step_raises_collision(self):
+        arrays = make_simple_system(
+            [simple_train("T1", 0.0, 5.0), simple_train("T2", 1.0, 2.0)]
+        ).to_arrays()
+
+        arrays.step(1.0)
+
+        with self.assertRaises(TrainCollisionError) as ctx:
+            arrays.step(1.0)
+        a, b, _ = ctx.exception.trains[0]
+        self.assertEqual((a.tag, b.tag), ("T1", "T2"))
+
+    def test_pre_step_check_skipped_until_arrays_change(self):
+        arrays = make_simple_system(
+            [simple_train("T1", 1.0, 5.0), simple_train("T2", 1.0, 2.0)]
+        ).to_arrays()
+        calls = []
+        pairs = arrays.collision_pairs
+
+        def counting():
+            calls.append(None)
+            return pairs()
+
+        arrays.collision_pairs = counting
+
+        arrays.step(1.0)
+        arrays.step(1.0)
+        self.assertEqual(len(calls), 3)
+
+        # Writing to the state arrays brings the check back.
+        arrays.head_distance[1] = arrays.head_distance[0] - 0.5
+        with self.assertRaises(TrainCollisionError):
+            arrays.step(1.0)
+        self.assertEqual(len(calls), 4)
@@ -0,0 +1,151 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from trains.env import System
+from trains.env.binary import _PREFIX, MAGIC, BinaryLayout, BinaryLayoutError
+from trains.env.topology import Topology
+
+from test.helpers import load
+
+
+class TestBinaryLayout(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "layout.bin")
+
+    def test_round_trip(self):
+        G = load("test/data/loop_system.json")
+
+        G.to_binary(self.path)
+        H = System.from_binary(self.path)
+
+        self.assertIs(H.topology, G.topology)
+        self.assertEqual(H.to_json(), G.to_json())
+
+    def test_builds_layout_from_file(self):
+        G = load("test/data/simulate_system.json")
+        G.to_binary(self.path)
+        expected = G.to_json()
+        key = G.topology.key
+        del G
+        Topology._cache.clear()
+
+        H = System.from_binary(self.path)
+
+        self.assertEqual(H.topology.key, key)
+        self.assertEqual(H.to_json(), expected)
+        compiled = H.topology.compiled
+        self.assertIsInstance(compiled.exit_table.base, np.memmap)
+
+        reference = load("test/data/simulate_system.json")
+        engine = H.to_arrays()
+        for _ in range(5):
+            engine.step(1.0)
+            reference.step(1.0)
+        engine.sync()
+        self.assertEqual(H.to_json(), reference.to_json())
+
+    def test_keeps_histories(self):
+        G = load("test/data/loop_system.json")
+        G.step(4.0)
+        G.to_binary(self.path)
+
+        H = System.from_binary(self.path)
+
+        for train, expected in zip(H.trains, G.trains):
+            self.assertEqual(list(train.history), list(expected.history))
+            self.assertAlmostEqual(train.tail_distance, expected.tail_distance)
+        G.step(3.0)
+        H.step(3.0)
+        self.assertEqual(H.to_json(), G.to_json())
+
+    def test_invalid_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"{}")
+        with self.assertRaises(BinaryLayoutError):
+            BinaryLayout(self.path)
+
+        load("test/data/loop_system.json").to_binary(self.path)
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) // 2)
+        with self.assertRaises(BinaryLayoutError):
+            BinaryLayout(self.path)
+
+    def test_damaged_header(self):
+        for header in (b"{not json", b"{}", b'{"version": 1}'):
+            with self.subTest(header=header):
+                with open(self.path, "wb") as f:
+                    f.write(_PREFIX.pack(MAGIC, len(header)) + header)
+                with self.assertRaises(BinaryLayoutError):
+                    BinaryLayout(self.path)
+
+
+class TestLayoutCache(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.source = os.path.join(self.dir, "layout.json")
+        shutil.copy("test/data/loop_system.json", self.source)
+        self.cache = self.source + ".bin"
+
+    def test_written_on_first_load_and_reused(self):
+        G = System.from_file(self.source, cache=True)
+
+        self.assertTrue(os.path.exists(self.cache))
+        with patch.object(
+            System, "from_bytes", side_effect=AssertionError
+        ):
+            H = System.from_file(self.source, cache=True)
+        self.assertEqual(H.to_json(), G.to_json())
+
+    def test_stale_cache_is_rebuilt(self):
+        System.from_file(self.source, cache=True)
+        with open(self.source) as f:
+            data = json.load(f)
+        data["trains"][0]["speed"] = 3.0
+        with open(self.source, "w") as f:
+            json.dump(data, f)
+
+        G = System.from_file(self.source, cache=True)
+
+        self.assertEqual(G.trains[0].speed, 3.0)
+        self.assertEqual(System.from_binary(self.cache).trains[0].speed, 3.0)
+
+    def test_unreadable_cache_is_replaced(self):
+        with open(self.cache, "wb") as f:
+            f.write(b"garbage")
+
+        G = System.from_file(self.source, cache=self.cache)
+
+        self.assertEqual(
+            System.from_binary(self.cache).to_json(), G.to_json()
+        )
+
+    def test_damaged_header_is_rebuilt(self):
+        G = System.from_file(self.source, cache=True)
+        with open(self.cache, "r+b") as f:
+            f.seek(_PREFIX.size)
+            f.write(b"#")
+
+        H = System.from_file(self.source, cache=True)
+
+        self.assertEqual(H.to_json(), G.to_json())
+        self.assertEqual(
+            System.from_binary(self.cache).to_json(), G.to_json()
+        )
+
+    def test_failed_write_is_not_fatal(self):
+        with patch(
+            "trains.env.binary.write", side_effect=PermissionError
+        ):
+            G = System.from_file(self.source, cache=True)
+
+        self.assertEqual(G.to_json(), load(self.source).to_json())
+        self.assertFalse(os.path.exists(self.cache))
@@ -1,19 +1,13 @@
+import json
+import random
+from collections import deque
 from unittest import TestCase
 
 from trains.env import System
+from trains.env.train import Train
 from trains.exceptions import TrainCollisionError
 
-
-def make_simple_system(trains_data):
-    json_data = {
-        "switches": [],
-        "deadends": [{"tag": "A"}, {"tag": "B"}],
-        "tracks": [
-            {"from_": {"node": "A"}, "to": {"node": "B"}, "length": 10.0}
-        ],
-        "trains": trains_data,
-    }
-    return System.from_json(json_data)
+from test.helpers import load, make_simple_system, simple_train
 
 
 class TestCollisions(TestCase):
@@ -161,6 +155,35 @@ class TestHeadOnCollision(TestCase):
 
         self.assertIsNone(G.detect_collisions())
 
+    def test_trains_entering_from_opposite_ends(self):
+        """Positions from opposite ends are compared in one frame."""
+
+        def trains(head_distance_b):
+            return [
+                {
+                    "tag": "T1",
+                    "speed": 1.0,
+                    "length": 2.0,
+                    "head_distance": 3.0,  # Occupies [1, 3] from A
+                    "head_branch": {"node": "A"},
+                },
+                {
+                    "tag": "T2",
+                    "speed": 1.0,
+                    "length": 2.0,
+                    "head_distance": head_distance_b,
+                    "head_branch": {"node": "B"},
+                },
+            ]
+
+        # Occupies [7, 9] from A: the same offsets, far apart.
+        G = make_simple_system(trains(3.0))
+        self.assertIsNone(G.detect_collisions())
+
+        # Occupies [2, 4] from A: overlaps T1.
+        G = make_simple_system(trains(8.0))
+        self.assertIsNotNone(G.detect_collisions())
+
 
 class TestNoTrainCollisions(TestCase):
     def test_single_train_no_collision(self):
@@ -178,6 +201,31 @@ class TestNoTrainCollisions(TestCase):
         collisions = G.detect_collisions()
         self.assertIsNone(collisions)
 
+    def test_many_trains_match_pairwise_check(self):
+        rng = random.Random(7)
+        trains = [
+            {
+                "tag": f"T{i}",
+                "speed": 0.0,
+                "length": rng.choice([0.25, 0.5, 1.0]),
+                "head_distance": round(rng.uniform(1.0, 10.0), 2),
+                "head_branch": {"node": rng.choice(["A", "B"])},
+            }
+            for i in range(40)
+        ]
+        G = make_simple_system(trains)
+        track = G.trains[0].track
+
+        expected = []
+        for i, train_a in enumerate(G.trains):
+            a = G._get_train_position_on_track(train_a, track)
+            for train_b in G.trains[i + 1 :]:
+                b = G._get_train_position_on_track(train_b, track)
+                if not (a[1] < b[0] or b[1] < a[0]):
+                    expected.append((train_a, train_b, track))
+
+        self.assertEqual(G.detect_collisions(), expected)
+
     def test_trains_on_different_tracks_no_collision(self):
         json_data = {
             "switches": [],
@@ -355,3 +403,293 @@ class TestMultipleTrainCollisions(TestCase):
 
         collisions = G.detect_collisions()
         self.assertIsNone(collisions)
+
+
+class TestOccupancyIndex(TestCase):
+    def setUp(self):
+        self.G = load("test/data/loop_system.json")
+
+    def test_index_tracks_train_bodies(self):
+        for _ in range(12):
+            self.G.step(1.0)
+            for train in self.G.trains:
+                for track in self.G._get_occupied_tracks(train):
+                    self.assertIn(
+                        train, self.G.occupancy.track_trains[track]
+                    )
+            occupied = {
+                track
+                for train in self.G.trains
+                for track in self.G._get_occupied_tracks(train)
+            }
+            self.assertEqual(set(self.G.occupancy.track_trains), occupied)
+
+    def test_only_moved_tracks_are_rechecked(self):
+        self.G.detect_collisions()
+        self.G.train_map["T2"].speed = 0.0
+
+        self.G.train_map["T1"].step(0.5)
+
+        t1 = self.G.train_map["T1"]
+        self.assertEqual(
+            self.G.occupancy.changed, self.G._get_occupied_tracks(t1)
+        )
+
+    def test_external_edits_are_detected(self):
+        self.assertIsNone(self.G.detect_collisions())
+        t1 = self.G.train_map["T1"]
+        t2 = self.G.train_map["T2"]
+
+        t2.history = deque([t1.head_branch])
+        t2.head_distance = t1.head_distance
+
+        collisions = self.G.detect_collisions()
+        self.assertEqual(len(collisions), 1)
+        self.assertEqual(collisions[0][:2], (t1, t2))
+
+    def test_added_train_is_indexed(self):
+        t1 = self.G.train_map["T1"]
+        self.G.trains.append(
+            Train(
+                tag="T3",
+                head_branch=t1.head_branch,
+                head_distance=t1.head_distance - 1.0,
+                length=1.0,
+                speed=0.0,
+            )
+        )
+
+        collisions = self.G.detect_collisions()
+
+        self.assertEqual(
+            [(a.tag, b.tag) for a, b, _ in collisions], [("T1", "T3")]
+        )
+
+    def test_replaced_train_is_indexed(self):
+        self.assertIsNone(self.G.detect_collisions())
+        t1 = self.G.train_map["T1"]
+        t2 = self.G.train_map["T2"]
+        t3 = Train(
+            tag="T3",
+            head_branch=t1.head_branch,
+            head_distance=t1.head_distance - 1.0,
+            length=1.0,
+            speed=0.0,
+        )
+
+        self.G.trains[1] = t3
+
+        collisions = self.G.detect_collisions()
+        self.assertEqual(
+            [(a.tag, b.tag) for a, b, _ in collisions], [("T1", "T3")]
+        )
+        self.assertIs(t3.system, self.G)
+        self.assertIsNone(t2.system)
+
+    def test_length_edit_is_reindexed(self):
+        t1 = self.G.train_map["T1"]  # Occupies [2, 6]
+        self.G.add_train(
+            Train(
+                tag="T3",
+                head_branch=t1.head_branch,
+                head_distance=1.0,
+                length=0.5,
+                speed=0.0,
+            )
+        )
+        self.assertIsNone(self.G.detect_collisions())
+
+        t1.length = 5.5
+
+        collisions = self.G.detect_collisions()
+        self.assertEqual(
+            [(a.tag, b.tag) for a, b, _ in collisions], [("T1", "T3")]
+        )
+
+    def test_add_and_remove_train(self):
+        t1 = self.G.train_map["T1"]
+        t3 = Train(
+            tag="T3",
+            head_branch=t1.head_branch,
+            head_distance=t1.head_distance - 1.0,
+            length=1.0,
+            speed=0.0,
+        )
+
+        self.G.add_train(t3)
+
+        self.assertIs(self.G.train_map["T3"], t3)
+        self.assertIs(t3.system, self.G)
+        collisions = self.G.detect_collisions()
+        self.assertEqual(
+            [(a.tag, b.tag) for a, b, _ in collisions], [("T1", "T3")]
+        )
+
+        self.G.remove_train(t3)
+
+        self.assertNotIn("T3", self.G.train_map)
+        self.assertIsNone(t3.system)
+        self.assertIsNone(self.G.detect_collisions())
+
+    def test_train_map_follows_list_edits(self):
+        train_map = self.G.train_map
+        self.assertIs(self.G.train_map, train_map)
+
+        self.G.trains.pop()
+
+        self.assertEqual(set(self.G.train_map), {"T1"})
+
+    def test_train_map_follows_replacement(self):
+        t1 = self.G.train_map["T1"]
+        t3 = Train(
+            tag="T3",
+            head_branch=t1.head_branch,
+            head_distance=t1.head_distance,
+            length=1.0,
+            speed=0.0,
+        )
+
+        self.G.trains[1] = t3
+
+        self.assertEqual(set(self.G.train_map), {"T1", "T3"})
+        self.assertIs(self.G.train_map["T3"], t3)
+
+    def test_assigned_trains_are_indexed(self):
+        t1 = self.G.train_map["T1"]
+        t2 = self.G.train_map["T2"]
+
+        self.G.trains = [t2, t2]
+        del self.G.trains[0]
+
+        self.assertEqual(set(self.G.train_map), {"T2"})
+        self.assertIsNone(t1.system)
+        self.assertIs(t2.system, self.G)
+        self.assertEqual(list(self.G.occupancy.order), [t2])
+        self.assertEqual(self.G.trains, [t2])
+
+
+class TestPreStepCheck(TestCase):
+    def setUp(self):
+        self.G = load("test/data/loop_system.json")
+        self.calls = 0
+        detect = self.G.detect_collisions
+
+        def counting():
+            self.calls += 1
+            return detect()
+
+        self.G.detect_collisions = counting
+
+    def test_consecutive_steps_check_once(self):
+        self.G.step(1.0)
+        self.calls = 0
+
+        self.G.step(1.0)
+        self.G.step(1.0)
+
+        self.assertEqual(self.calls, 2)
+
+    def test_edits_between_steps_are_checked(self):
+        self.G.step(1.0)
+        self.calls = 0
+        t1 = self.G.train_map["T1"]
+        t2 = self.G.train_map["T2"]
+        t2.history = deque([t1.head_branch])
+        t2.head_distance = t1.head_distance
+
+        with self.assertRaises(TrainCollisionError):
+            self.G.step(1.0)
+        # Raised by the check before moving.
+        self.assertEqual(self.calls, 1)
+        self.assertAlmostEqual(t1.head_distance, 6.0 + 1.5)
+
+    def test_restore_is_checked(self):
+        snapshot = self.G.snapshot()
+        self.G.step(1.0)
+        self.G.restore(snapshot)
+        self.calls = 0
+
+        self.G.step(1.0)
+
+        self.assertEqual(self.calls, 2)
+
+    def test_single_post_step_check(self):
+        t1 = self.G.train_map["T1"]
+        t2 = self.G.train_map["T2"]
+        t2.history = deque([t1.head_branch])
+        t2.head_distance = t1.head_distance
+
+        with self.assertRaises(TrainCollisionError):
+            self.G.step(1.0, pre_check=False)
+        self.assertEqual(self.calls, 1)
+        # The trains moved before the collision was reported.
+        self.assertAlmostEqual(t1.head_distance, 6.0 + 1.5)
+
+
+class TestContinuousCollisions(TestCase):
+    def test_overtaking_within_one_step(self):
+        G = make_simple_system(
+            [simple_train("T1", 10.0, 2.0), simple_train("T2", 0.0, 6.0)],
+            length=100.0,
+        )
+
+        contacts = G.detect_collisions_swept(1.0)
+
+        self.assertEqual(len(contacts), 1)
+        t1, t2, _, time = contacts[0]
+        self.assertEqual((t1.tag, t2.tag), ("T1", "T2"))
+        self.assertAlmostEqual(time, 0.3)
+
+        # Sampling only the start and end of the step misses it.
+        G.step(1.0)
+        self.assertIsNone(G.detect_collisions())
+
+    def test_head_on_pass_through(self):
+        G = make_simple_system(
+            [
+                simple_train("T1", 10.0, 10.0),
+                simple_train("T2", 10.0, 10.0, "B"),
+            ],
+            length=100.0,
+        )
+
+        contacts = G.detect_collisions_swept(10.0)
+
+        # The heads start 80 apart and close at 20 per unit of time.
+        self.assertAlmostEqual(contacts[0][3], 4.0)
+
+    def test_continuous_step_stops_at_contact(self):
+        G = make_simple_system(
+            [simple_train("T1", 10.0, 2.0), simple_train("T2", 0.0, 6.0)],
+            length=100.0,
+        )
+
+        with self.assertRaises(TrainCollisionError) as ctx:
+            G.step(1.0, continuous=True)
+
+        self.assertAlmostEqual(ctx.exception.time, 0.3)
+        self.assertAlmostEqual(G.train_map["T1"].head_distance, 5.0)
+        self.assertIsNotNone(G.detect_collisions())
+
+    def test_no_contact_when_separated(self):
+        G = make_simple_system(
+            [simple_train("T1", 1.0, 2.0), simple_train("T2", 1.0, 6.0)],
+            length=100.0,
+        )
+
+        self.assertIsNone(G.detect_collisions_swept(50.0))
+        G.step(50.0, continuous=True)
+        self.assertAlmostEqual(G.train_map["T1"].head_distance, 52.0)
+
+    def test_contact_across_a_switch(self):
+        with open("test/data/simulate_system.json") as f:
+            data = json.load(f)
+        data["trains"].append(simple_train("T2", 0.0, 4.0))
+        data["trains"][-1]["head_branch"] = {"node": "S1", "branch": "through"}
+        data["trains"][0]["speed"] = 20.0
+        G = System.from_json(data)
+
+        contacts = G.detect_collisions_swept(1.0)
+
+        # T1 needs 5 to reach S1 and 3 more to reach T2's tail at 3.
+        self.assertAlmostEqual(contacts[0][3], 8.0 / 20.0)
@@ -0,0 +1,126 @@
+import importlib.util
+import unittest
+from unittest import TestCase
+
+import numpy as np
+
+from trains.env.encode import EDGE_FEATURES, NODE_FEATURES
+
+from test.helpers import load, make_simple_system, simple_train
+
+
+HAS_PYG = importlib.util.find_spec("torch_geometric") is not None
+
+STATE = NODE_FEATURES.index("state")
+OCCUPANCY = EDGE_FEATURES.index("occupancy")
+
+
+def make_line_system():
+    return make_simple_system(
+        [
+            simple_train("T1", 1.0, 5.0),
+            simple_train("T2", 1.0, 1.0, node="B", length=2.0),
+        ]
+    )
+
+
+def encode(system, edge_subdivisions=1):
+    encoder = system.topology.encoder(edge_subdivisions)
+    node_x = encoder.node_x.copy()
+    edge_x = encoder.edge_x.copy()
+    encoder.write(system, node_x, edge_x)
+    return encoder, node_x, edge_x
+
+
+class TestGraphEncoder(TestCase):
+    def test_static_graph(self):
+        G = load("test/data/loop_system.json")
+
+        encoder = G.topology.encoder(edge_subdivisions=3)
+
+        self.assertIs(G.topology.encoder(3), encoder)
+        self.assertEqual(encoder.num_nodes, 3 + 4 * 2)
+        self.assertEqual(encoder.edge_index.shape, (2, 2 * 3 * 4))
+        # The first edge leaves A by its through branch.
+        self.assertEqual(encoder.edge_index[0, 0], 0)
+        self.assertEqual(encoder.edge_x[0, 0], 4.0)
+        self.assertEqual(encoder.edge_x[0, EDGE_FEATURES.index("through")], 1)
+
+    def test_switch_states(self):
+        G = load("test/data/loop_system.json")
+
+        _, node_x, _ = encode(G)
+
+        self.assertEqual(list(node_x[:3, STATE]), [0.0, 0.0, 1.0])
+
+    def test_occupancy_by_direction(self):
+        G = make_line_system()
+
+        _, _, edge_x = encode(G, edge_subdivisions=5)
+
+        expected = np.zeros(10)
+        # T1 covers [4, 5] running from A: half of segment 2, forwards.
+        expected[4] = 0.5
+        # T2 covers [9, 10] in A's frame running from B: half of
+        # segment 4, backwards.
+        expected[9] = 0.5
+        np.testing.assert_allclose(edge_x[:, OCCUPANCY], expected)
+
+    def test_buffers_are_reused(self):
+        G = make_line_system()
+        encoder, node_x, edge_x = encode(G, edge_subdivisions=5)
+
+        G.step(1.5)
+        encoder.write(G, node_x, edge_x)
+
+        expected = np.zeros(10)
+        expected[[4, 6, 7, 9]] = [0.25, 0.25, 0.25, 0.75]
+        np.testing.assert_allclose(edge_x[:, OCCUPANCY], expected)
+
+    @unittest.skipUnless(HAS_PYG, "torch_geometric is not installed")
+    def test_encode_data(self):
+        G = make_line_system()
+
+        data = G.encode(edge_subdivisions=5)
+
+        self.assertEqual(tuple(data.edge_index.shape), (2, 10))
+        self.assertAlmostEqual(float(data.edge_attr[4, OCCUPANCY]), 0.5)
+        G.step(1.5)
+        self.assertIs(G.encode(edge_subdivisions=5), data)
+        self.assertAlmostEqual(float(data.edge_attr[4, OCCUPANCY]), 0.25)
+
+    @unittest.skipUnless(HAS_PYG, "torch_geometric is not installed")
+    def test_systems_keep_their_own_data(self):
+        G = make_line_system()
+        H = make_line_system()
+        H.step(1.5)
+
+        data = G.encode(edge_subdivisions=5)
+        other = H.encode(edge_subdivisions=5)
+
+        self.assertIsNot(other, data)
+        self.assertAlmostEqual(float(data.edge_attr[4, OCCUPANCY]), 0.5)
+
+    @unittest.skipUnless(HAS_PYG, "torch_geometric is not installed")
+    def test_encode_batch(self):
+        from trains.env.encode import encode_batch
+
+        systems = [make_line_system(), make_line_system()]
+        systems[1].step(1.5)
+
+        batch = encode_batch(systems, edge_subdivisions=5)
+
+        self.assertEqual(batch.num_graphs, 2)
+        first, second = batch.to_data_list()
+        self.assertAlmostEqual(float(first.edge_attr[4, OCCUPANCY]), 0.5)
+        self.assertAlmostEqual(float(second.edge_attr[6, OCCUPANCY]), 0.25)
+        self.assertEqual(int(second.edge_index.min()), 0)
+
+        systems[0].step(1.5)
+        again = encode_batch(systems, edge_subdivisions=5, out=batch)
+
+        self.assertIs(again, batch)
+        first = batch.get_example(0)
+        self.assertAlmostEqual(float(first.edge_attr[4, OCCUPANCY]), 0.25)
+        with self.assertRaises(ValueError):
+            encode_batch(systems[:1], edge_subdivisions=5, out=batch)
@@ -0,0 +1,87 @@
+import json
+from unittest import TestCase
+
+from trains.env import System
+from trains.env.deadend import DeadEndCollision
+from trains.env.events import EventScheduler
+from trains.exceptions import TrainCollisionError
+
+from test.helpers import load
+
+
+class TestEventScheduler(TestCase):
+    def test_next_event_time_is_exact(self):
+        G = load("data/example.json")
+        scheduler = EventScheduler(G)
+
+        event = scheduler.advance_to_next_event()
+
+        self.assertEqual(event.kind, "head")
+        self.assertAlmostEqual(event.time, (12.0 - 1.2) / 6.0)
+        self.assertIs(event.train.head_branch, G.switch_map["B"].through)
+        self.assertEqual(event.train.head_distance, 0.0)
+
+    def test_matches_fixed_stepping(self):
+        stepped = load("data/example.json")
+        G = load("data/example.json")
+        scheduler = EventScheduler(G)
+
+        for i in range(1, 41):
+            stepped.step(0.75)
+            scheduler.advance_until(0.75 * i)
+
+            expected = stepped.trains[0]
+            actual = G.trains[0]
+            self.assertEqual(
+                [b.tag for b in actual.history],
+                [b.tag for b in expected.history],
+            )
+            self.assertAlmostEqual(
+                actual.head_distance, expected.head_distance
+            )
+
+    def test_only_trains_with_due_events_move(self):
+        G = load("test/data/loop_system.json")
+        t1 = G.train_map["T1"]
+        t2 = G.train_map["T2"]
+        t2.speed = 0.5
+        scheduler = EventScheduler(G)
+
+        event = scheduler.advance_to_next_event()
+
+        self.assertIs(event.train, t1)
+        self.assertEqual(scheduler.last_update[t2], 0.0)
+        self.assertEqual(t2.head_distance, 9.0)
+
+    def test_dead_end_raises_at_event(self):
+        G = load("test/data/simulate_system.json")
+        scheduler = EventScheduler(G)
+
+        with self.assertRaises(DeadEndCollision):
+            scheduler.advance_until(100.0)
+
+        self.assertAlmostEqual(scheduler.time, 25.0)
+        self.assertAlmostEqual(G.trains[0].head_distance, 10.0)
+
+    def test_collision_at_track_entry(self):
+        with open("test/data/simulate_system.json") as f:
+            data = json.load(f)
+        data["trains"].append(
+            {
+                "tag": "T2",
+                "speed": 0.0,
+                "length": 1.0,
+                "head_distance": 0.5,
+                "head_branch": {"node": "S1", "branch": "through"},
+            }
+        )
+        G = System.from_json(data)
+        scheduler = EventScheduler(G)
+
+        with self.assertRaises(TrainCollisionError) as ctx:
+            scheduler.advance_until(100.0)
+
+        self.assertAlmostEqual(scheduler.time, 5.0)
+        a, b, track = ctx.exception.trains[0]
+        self.assertEqual((a.tag, b.tag), ("T1", "T2"))
+        self.assertIs(track, G.switch_map["S1"].through.track)
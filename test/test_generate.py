@@ -0,0 +1,78 @@
+from unittest import TestCase
+
+from trains.env import System
+from trains.env.generate import FAMILIES, generate
+from trains.env.switch import Switch
+from trains.ser import SystemModel
+
+
+class TestGenerate(TestCase):
+    def test_families_round_trip(self):
+        for family in FAMILIES:
+            with self.subTest(family=family):
+                G = generate(family, 50, trains=20, seed=0)
+
+                data = G.to_json()
+                SystemModel(**data)
+                H = System.from_json(data)
+
+                self.assertEqual(H.topology, G.topology)
+                self.assertEqual(
+                    [t.tag for t in H.trains], [t.tag for t in G.trains]
+                )
+                self.assertEqual(H.to_json(), data)
+
+    def test_placement_is_collision_free(self):
+        for family in FAMILIES:
+            with self.subTest(family=family):
+                G = generate(family, 200, trains=150, seed=1)
+
+                self.assertEqual(len(G.trains), 150)
+                self.assertFalse(G.detect_collisions())
+
+    def test_every_branch_is_connected(self):
+        for family in FAMILIES:
+            with self.subTest(family=family):
+                G = generate(family, 30, branching=3)
+
+                for node in G.nodes:
+                    for branch in node.branches:
+                        self.assertIsNotNone(branch.track)
+
+    def test_seed_and_track_lengths(self):
+        a = generate("grid", 100, track_length=(10.0, 30.0), trains=5, seed=3)
+        b = generate("grid", 100, track_length=(10.0, 30.0), trains=5, seed=3)
+
+        self.assertEqual(a.to_json(), b.to_json())
+        lengths = [track.length for track in a.topology.tracks]
+        self.assertTrue(all(10.0 <= length <= 30.0 for length in lengths))
+        self.assertGreater(len(set(lengths)), 1)
+
+    def test_tree_branching(self):
+        G = generate("tree", 40, branching=4)
+
+        self.assertLessEqual(len(G.switches), 40)
+        # Each junction is a chain of three switches fanning out to four
+        # tracks.
+        self.assertEqual(len(G.switches) % 3, 0)
+        self.assertTrue(all(isinstance(n, Switch) for n in G.switches))
+
+    def test_density(self):
+        G = generate("loop", 100, density=0.25, seed=0)
+
+        self.assertEqual(len(G.trains), 50)
+        self.assertFalse(G.detect_collisions())
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            generate("star")
+        with self.assertRaises(ValueError):
+            generate("tree", branching=1)
+        with self.assertRaises(ValueError):
+            generate("loop", 10, trains=21)
+        with self.assertRaises(ValueError):
+            generate("loop", 10, track_length=10.0, trains=1)
+        with self.assertRaises(ValueError):
+            generate("loop", 10, trains=1, density=0.5)
+        with self.assertRaises(ValueError):
+            generate("loop", 10, density=1.5)
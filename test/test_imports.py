@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+import trains
+
+
+HEAVY = ("numpy", "pydantic", "torch", "networkx", "jsonschema")
+
+
+def loaded_after(code):
+    """Heavy modules loaded by running ``code`` in a fresh interpreter."""
+    env = dict(os.environ)
+    src = os.path.dirname(os.path.dirname(trains.__file__))
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [src, env.get("PYTHONPATH")])
+    )
+    check = (
+        f"{code}\n"
+        "import sys, json\n"
+        f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", check],
+        check=True,
+        capture_output=True,
+        env=env,
+    )
+    return json.loads(out.stdout)
+
+
+class TestLazyImports(TestCase):
+    def test_core_import_is_light(self):
+        self.assertEqual(loaded_after("import trains.env"), [])
+
+    def test_stepping_is_light(self):
+        code = (
+            "from trains.env import System\n"
+            "from trains.env.topology import Topology\n"
+            "from trains.env.switch import Switch\n"
+            "from trains.env.deadend import DeadEnd\n"
+            "from trains.env.track import Track\n"
+            "from trains.env.train import Train\n"
+            "a, b = DeadEnd('A'), DeadEnd('B')\n"
+            "track = Track((a.branch, b.branch), 10.0)\n"
+            "a.branch.track = b.branch.track = track\n"
+            "G = System(Topology([], [a, b], [track]),\n"
+            "           [Train('T', a.branch, 1.0, 1.0, 1.0)])\n"
+            "G.step(1.0)\n"
+        )
+        self.assertEqual(loaded_after(code), [])
+
+    def test_heavy_modules_load_on_use(self):
+        code = (
+            "import json\n"
+            "from trains.env import System\n"
+            "with open('test/data/loop_system.json') as f:\n"
+            "    G = System.from_json(json.load(f))\n"
+        )
+        self.assertEqual(loaded_after(code), ["pydantic"])
+        self.assertEqual(
+            loaded_after(code + "G.to_arrays()\n"), ["numpy", "pydantic"]
+        )
+
+    def test_trusted_load_skips_pydantic(self):
+        code = (
+            "from trains.env import System\n"
+            "System.from_file('test/data/loop_system.json', validate=False)\n"
+        )
+        self.assertEqual(loaded_after(code), [])
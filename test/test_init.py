@@ -47,3 +47,58 @@ class TestJsonInit(TestCase):
         }
         for b in ["approach", "through", "diverge"]:
             self.assertIs(branches[b], deadends[b])
+
+    def test_compact_objects(self):
+        switch = self.G.switch_map["A"]
+        objects = [
+            switch,
+            switch.through,
+            switch.through.track,
+            self.G.deadend_map["approach"],
+            self.G.train_map["T"],
+        ]
+        for obj in objects:
+            self.assertFalse(hasattr(obj, "__dict__"), type(obj).__name__)
+
+        self.assertEqual(switch.through.tag, "A_through")
+        self.assertIs(switch.through.tag, switch.through.tag)
+        self.assertIs(switch.get_branch("diverge"), switch.diverging)
+        self.assertEqual(
+            switch.branches, (switch.approach, switch.through, switch.diverge)
+        )
+
+
+class TestLoaders(TestCase):
+    PATH = "test/data/simulate_system.json"
+
+    def setUp(self):
+        with open(self.PATH) as f:
+            self.expected = System.from_json(json.load(f))
+
+    def assert_same(self, system):
+        self.assertIs(system.topology, self.expected.topology)
+        self.assertEqual(system.to_json(), self.expected.to_json())
+
+    def test_from_file(self):
+        self.assert_same(System.from_file(self.PATH))
+
+    def test_from_bytes(self):
+        with open(self.PATH, "rb") as f:
+            data = f.read()
+
+        self.assert_same(System.from_bytes(data))
+        self.assert_same(System.from_bytes(data.decode()))
+
+    def test_trusted(self):
+        with open(self.PATH, "rb") as f:
+            data = f.read()
+
+        self.assert_same(System.from_bytes(data, validate=False))
+        self.assert_same(System.from_file(self.PATH, validate=False))
+        self.assert_same(System.from_json(json.loads(data), validate=False))
+
+    def test_validation_errors(self):
+        from pydantic import ValidationError
+
+        with self.assertRaises(ValidationError):
+            System.from_bytes(b'{"switches": [], "deadends": []}')
@@ -0,0 +1,64 @@
+from unittest import TestCase
+
+import numpy as np
+
+from trains.env.pool import ProcessVectorSystem
+from trains.env.vector import VectorSystem
+
+from test.helpers import load
+
+
+class TestProcessVectorSystem(TestCase):
+    def setUp(self):
+        self.system = load("test/data/loop_system.json")
+        self.P = ProcessVectorSystem(self.system, num_envs=5, num_workers=2)
+        self.addCleanup(self.P.close)
+
+    def test_matches_vector_system(self):
+        V = VectorSystem(self.system, num_envs=5)
+        rng = np.random.default_rng(0)
+
+        for i in range(20):
+            actions = rng.random((5, 3)) < 0.2
+            dts = rng.random(5) * 3
+            if i % 2:
+                result = self.P.step(actions, dts)
+            else:
+                self.P.step_async(actions, dts)
+                result = self.P.step_wait()
+            expected = V.step(actions, dts)
+            for field, value in zip(expected._fields, expected):
+                np.testing.assert_array_equal(
+                    getattr(result, field), value, err_msg=field
+                )
+            for name in ("head_branch", "head_distance", "switch_state"):
+                np.testing.assert_array_equal(
+                    getattr(self.P, name), getattr(V, name), err_msg=name
+                )
+
+    def test_reset(self):
+        initial = self.P.head_distance.copy()
+        self.assertEqual(initial.shape, (10,))
+
+        self.P.step(None, 1.0)
+        self.assertFalse((self.P.head_distance == initial).all())
+        self.P.reset()
+
+        np.testing.assert_array_equal(self.P.head_distance, initial)
+
+    def test_one_step_at_a_time(self):
+        self.P.step_async(None, 1.0)
+        with self.assertRaises(RuntimeError):
+            self.P.step_async(None, 1.0)
+        self.P.step_wait()
+        with self.assertRaises(RuntimeError):
+            self.P.step_wait()
+
+    def test_worker_errors_are_raised(self):
+        self.P.step_async(None, 1.0)
+        self.P._conns[0].recv()
+        self.P._waiting = False
+        # An unknown command fails in the worker and is reported back.
+        self.P._send("unknown")
+        with self.assertRaises(ValueError):
+            self.P._wait()
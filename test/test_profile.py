@@ -0,0 +1,83 @@
+import json
+from unittest import TestCase
+
+from trains.env.profile import PHASES, StepProfiler, StepRecord
+from trains.exceptions import TrainCollisionError
+
+from test.helpers import load, make_collision_system
+
+
+class TestStepProfiler(TestCase):
+    def setUp(self):
+        self.G = load("test/data/loop_system.json")
+        self.profiler = StepProfiler()
+        self.G.profiler = self.profiler
+
+    def test_counts(self):
+        self.G.step(4.0)
+        self.G.step(8.0)
+
+        first, second = self.profiler.records
+        self.assertEqual(first.transitions, 2)
+        self.assertEqual(first.diverging_passes, 0)
+        # T1 takes C's diverging branch, which is set.
+        self.assertEqual(second.transitions, 2)
+        self.assertEqual(second.diverging_passes, 1)
+        self.assertEqual(second.collisions, 0)
+        self.assertEqual(second.history_max, 2)
+        self.assertGreater(second.tracks_checked, 0)
+
+    def test_counts_tracks_passed_in_one_step(self):
+        self.G.remove_train(self.G.train_map["T2"])
+        self.G.set_switch_state("C", False)
+
+        # T1 runs off AB, over all of BC and onto CA.
+        self.G.step(19.0)
+
+        (record,) = self.profiler.records
+        self.assertEqual(record.transitions, 2)
+        self.assertEqual(record.history_max, 1)
+
+    def test_matches_unprofiled_step(self):
+        reference = load("test/data/loop_system.json")
+
+        for _ in range(10):
+            self.G.step(1.7)
+            reference.step(1.7)
+
+        for train, expected in zip(self.G.trains, reference.trains):
+            self.assertIs(train.head_branch, expected.head_branch)
+            self.assertAlmostEqual(train.head_distance, expected.head_distance)
+        self.assertEqual(len(self.profiler.records), 10)
+
+    def test_collision_is_recorded(self):
+        G = make_collision_system()
+        G.profiler = self.profiler
+
+        with self.assertRaises(TrainCollisionError):
+            for _ in range(100):
+                G.step(1.0)
+
+        self.assertGreater(self.profiler.records[-1].collisions, 0)
+
+    def test_exports(self):
+        for _ in range(3):
+            self.G.step(1.0)
+
+        series = self.profiler.series()
+        self.assertEqual(list(series), list(StepRecord._fields))
+        self.assertEqual(series["dt"], [1.0, 1.0, 1.0])
+
+        summary = self.profiler.summary()
+        self.assertEqual(summary["steps"], 3)
+        self.assertAlmostEqual(
+            sum(summary["phases"][phase]["share"] for phase in PHASES), 1.0
+        )
+        json.dumps(summary)
+
+    def test_detach(self):
+        self.G.step(1.0)
+        self.G.profiler = None
+        self.G.step(1.0)
+
+        self.assertEqual(len(self.profiler.records), 1)
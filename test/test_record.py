@@ -0,0 +1,258 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from trains.env import System
+from trains.env.deadend import DeadEndCollision
+from trains.env.record import TrajectoryReader, TrajectoryRecorder
+from trains.env.switch import SwitchPassthroughError
+from trains.exceptions import TrainCollisionError
+
+from test.helpers import (
+    load,
+    make_collision_system,
+    make_simple_system,
+    simple_train,
+)
+
+
+def column(path, name):
+    with open(os.path.join(path, "meta.json")) as f:
+        dtype, shape = json.load(f)["columns"][name]
+    data = np.fromfile(os.path.join(path, name + ".bin"), dtype=dtype)
+    return data.reshape(-1, *shape)
+
+
+class TestTrajectoryRecorder(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "run")
+        self.G = load("test/data/loop_system.json")
+
+    def test_records_every_step(self):
+        reference = load("test/data/loop_system.json")
+        branches = reference.topology.compiled.branches
+        self.G.recorder = TrajectoryRecorder(self.path, self.G, chunk_size=3)
+
+        expected = []
+        for _ in range(10):
+            self.G.step(1.7)
+            reference.step(1.7)
+            expected.append(
+                [(t.head_branch, t.head_distance) for t in reference.trains]
+            )
+        self.G.recorder.close()
+
+        self.assertEqual(column(self.path, "dt").tolist(), [1.7] * 10)
+        heads = column(self.path, "head_branch")
+        distances = column(self.path, "head_distance")
+        self.assertEqual(heads.shape, (10, 2))
+        for step, trains in enumerate(expected):
+            for i, (branch, distance) in enumerate(trains):
+                self.assertIs(branches[heads[step, i]], branch)
+                self.assertEqual(distances[step, i], distance)
+        speeds = column(self.path, "speed")
+        self.assertEqual(speeds.tolist(), [[1.5, 1.5]] * 10)
+        self.assertFalse(column(self.path, "collision").any())
+
+    def test_logs_switch_changes(self):
+        with TrajectoryRecorder(self.path, self.G) as recorder:
+            self.G.recorder = recorder
+            self.G.step(1.0)
+            self.G.switch_states[0] = True
+            self.G.step(1.0)
+            self.G.step(1.0)
+
+        self.assertEqual(column(self.path, "switch_step").tolist(), [-1, 1])
+        self.assertEqual(
+            column(self.path, "switch_state").tolist(),
+            [[False, False, True], [True, False, True]],
+        )
+
+    def test_records_collision(self):
+        G = make_collision_system()
+        G.recorder = TrajectoryRecorder(self.path, G)
+
+        with self.assertRaises(TrainCollisionError):
+            for _ in range(100):
+                G.step(1.0)
+        G.recorder.close()
+
+        collision = column(self.path, "collision")
+        self.assertEqual(collision[-1].tolist(), [True, True])
+        self.assertFalse(collision[:-1].any())
+
+        reader = TrajectoryReader(self.path)
+        H = reader.system(len(reader))
+        for train, expected in zip(H.trains, G.trains):
+            self.assertEqual(train.head_distance, expected.head_distance)
+
+    def test_records_step_stopped_by_dead_end(self):
+        G = make_simple_system([simple_train("T1", 1.0, 5.0)])
+        G.recorder = TrajectoryRecorder(self.path, G)
+
+        with self.assertRaises(DeadEndCollision):
+            G.step(10.0)
+        G.recorder.close()
+
+        self.assertEqual(column(self.path, "dt").tolist(), [10.0])
+        self.assertEqual(
+            column(self.path, "head_distance").tolist(),
+            [[G.trains[0].head_distance]],
+        )
+
+    def test_records_time_of_continuous_contact(self):
+        G = make_simple_system(
+            [
+                simple_train("T1", 1.0, 2.0),
+                simple_train("T2", 1.0, 2.0, "B"),
+            ]
+        )
+        G.recorder = TrajectoryRecorder(self.path, G)
+
+        with self.assertRaises(TrainCollisionError) as caught:
+            G.step(10.0, continuous=True)
+        G.recorder.close()
+
+        self.assertAlmostEqual(caught.exception.time, 3.0)
+        self.assertEqual(
+            column(self.path, "dt").tolist(), [caught.exception.time]
+        )
+        self.assertEqual(
+            column(self.path, "collision").tolist(), [[True, True]]
+        )
+
+    def test_fixed_trains(self):
+        self.G.recorder = TrajectoryRecorder(self.path, self.G)
+        self.G.remove_train(self.G.trains[0])
+
+        with self.assertRaises(ValueError):
+            self.G.step(1.0)
+
+
+class TestTrajectoryReader(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "run")
+
+        G = load("test/data/loop_system.json")
+        self.expected = [self.state(G)]
+        with TrajectoryRecorder(
+            self.path, G, chunk_size=5, keyframe_interval=4
+        ) as G.recorder:
+            for i in range(15):
+                if i == 6:
+                    G.switch_states[2] = False
+                if i == 9:
+                    G.trains[0].speed = 2.5
+                G.step(1.3)
+                self.expected.append(self.state(G))
+        self.reader = TrajectoryReader(self.path)
+
+    @staticmethod
+    def state(system):
+        return (
+            list(system.switch_states),
+            [
+                (list(train.history), train.head_distance, train.speed)
+                for train in system.trains
+            ],
+        )
+
+    def test_columns(self):
+        reader = self.reader
+        self.assertEqual(len(reader), 15)
+        self.assertEqual(reader.column("head_distance").shape, (15, 2))
+        self.assertIsInstance(reader.column("speed").base, np.memmap)
+
+        speeds = reader.column("speed", slice(8, 11), trains=["T1"])
+        self.assertEqual(speeds.tolist(), [[1.5], [2.5], [2.5]])
+        self.assertAlmostEqual(reader.times()[-1], 15 * 1.3)
+        with self.assertRaises(KeyError):
+            reader.column("speed", trains=["T3"])
+        with self.assertRaises(KeyError):
+            reader.column("switch_state")
+
+    def test_switch_states(self):
+        for step, (states, _) in enumerate(self.expected):
+            self.assertEqual(
+                self.reader.switch_states(step).tolist(), states
+            )
+        with self.assertRaises(IndexError):
+            self.reader.switch_states(16)
+
+    def test_rebuilds_every_step(self):
+        for step, expected in enumerate(self.expected):
+            self.assertEqual(self.state(self.reader.system(step)), expected)
+
+    def test_replay_is_bounded_by_keyframes(self):
+        follow = TrajectoryReader._follow
+        with patch.object(
+            System, "step", side_effect=AssertionError
+        ), patch.object(
+            TrajectoryReader, "_follow", side_effect=follow
+        ) as mock:
+            H = self.reader.system(14)
+        # Two steps past the keyframe at step 12, for each of two trains.
+        self.assertEqual(mock.call_count, 4)
+        self.assertEqual(self.state(H), self.expected[14])
+
+    def test_rebuilds_after_blocked_step(self):
+        G = load("test/data/loop_system.json")
+        G.remove_train(G.train_map["T2"])
+        expected = [self.state(G)]
+        path = os.path.join(self.dir, "blocked")
+        with TrajectoryRecorder(path, G, keyframe_interval=8) as G.recorder:
+            # T1 runs back into B by its diverging branch, which is unset.
+            with self.assertRaises(SwitchPassthroughError):
+                for _ in range(3):
+                    G.step(10.0)
+                    expected.append(self.state(G))
+            expected.append(self.state(G))
+            G.switch_states[1] = True
+            G.step(1.0)
+            expected.append(self.state(G))
+
+        reader = TrajectoryReader(path)
+        self.assertEqual(len(reader), 4)
+        for step, state in enumerate(expected):
+            self.assertEqual(self.state(reader.system(step)), state)
+
+    def test_rebuilds_after_continuous_contact(self):
+        G = make_simple_system(
+            [
+                simple_train("T1", 1.0, 2.0),
+                simple_train("T2", 1.0, 2.0, "B"),
+            ]
+        )
+        path = os.path.join(self.dir, "contact")
+        with TrajectoryRecorder(path, G) as G.recorder:
+            with self.assertRaises(TrainCollisionError):
+                G.step(10.0, continuous=True)
+
+        H = TrajectoryReader(path).system(1)
+
+        self.assertEqual(self.state(H), self.state(G))
+
+    def test_reads_flushed_steps_of_live_recording(self):
+        path = os.path.join(self.dir, "live")
+        G = load("test/data/loop_system.json")
+        G.recorder = TrajectoryRecorder(path, G, keyframe_interval=2)
+        self.addCleanup(G.recorder.close)
+        for _ in range(3):
+            G.step(1.0)
+        G.recorder.flush()
+        expected = self.state(G)
+        # Its keyframe is written, but the step itself is still buffered.
+        G.step(1.0)
+
+        reader = TrajectoryReader(path)
+        self.assertEqual(len(reader), 3)
+        self.assertEqual(self.state(reader.system(3)), expected)
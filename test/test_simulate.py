@@ -1,11 +1,16 @@
 import json
+from collections import deque
 from unittest import TestCase
+from unittest.mock import patch
 
 from trains.env import System
+from trains.env.system import TrainList
 from trains.env.deadend import DeadEndCollision
 from trains.env.switch import SwitchPassthroughError
 from trains.exceptions import TrainCollisionError, SwitchOverlapError
 
+from test.helpers import load
+
 
 class TestTrainMovement(TestCase):
     def setUp(self):
@@ -346,13 +351,12 @@ class TestSwitchStateChanges(TestCase):
             ],
         }
         G = System.from_json(json_data)
-        switch = G.switch_map["S1"]
 
-        self.assertFalse(switch.state)
+        self.assertFalse(G.get_switch_state("S1"))
 
         G.set_switch_state("S1", True)
 
-        self.assertTrue(switch.state)
+        self.assertTrue(G.get_switch_state("S1"))
 
     def test_switch_state_change_affects_train_path(self):
         json_data = {
@@ -466,11 +470,57 @@ class TestSwitchStateChanges(TestCase):
             ],
         }
         G = System.from_json(json_data)
-        switch = G.switch_map["S1"]
 
         G.set_switch_state("S1", True)
 
-        self.assertTrue(switch.state)
+        self.assertTrue(G.get_switch_state("S1"))
+
+    def test_overlap_follows_moving_trains(self):
+        G = load("test/data/loop_system.json")
+
+        G.set_switch_state("B", True)
+        G.set_switch_state("B", False)
+        for _ in range(4):
+            G.step(1.0)
+
+        with self.assertRaises(SwitchOverlapError) as ctx:
+            G.set_switch_state("B", True)
+        self.assertEqual([t.tag for t in ctx.exception.trains], ["T1"])
+
+    def test_flip_does_not_walk_the_trains(self):
+        G = load("test/data/loop_system.json")
+
+        with patch.object(TrainList, "__iter__", side_effect=AssertionError):
+            G.set_switch_state("B", True)
+            with self.assertRaises(SwitchOverlapError):
+                G.set_switch_state("C", False)
+
+        self.assertTrue(G.get_switch_state("B"))
+
+    def test_set_switch_states_strict(self):
+        G = load("test/data/loop_system.json")
+
+        with self.assertRaises(SwitchOverlapError) as ctx:
+            G.set_switch_states({"B": True, "C": False})
+
+        self.assertEqual(ctx.exception.switch.tag, "C")
+        self.assertFalse(G.get_switch_state("B"))
+        self.assertTrue(G.get_switch_state("C"))
+
+    def test_set_switch_states_lenient(self):
+        G = load("test/data/loop_system.json")
+
+        blocked = G.set_switch_states(
+            {"A": True, "B": True, "C": False}, strict=False
+        )
+
+        self.assertEqual(
+            {tag: [t.tag for t in trains] for tag, trains in blocked.items()},
+            {"A": ["T1"], "C": ["T2"]},
+        )
+        self.assertFalse(G.get_switch_state("A"))
+        self.assertTrue(G.get_switch_state("B"))
+        self.assertTrue(G.get_switch_state("C"))
 
 
 class TestDeadEndCollisions(TestCase):
@@ -691,6 +741,84 @@ class TestTrainTrim(TestCase):
 
         self.assertLessEqual(len(train.history), 2)
 
+    def test_history_stays_bounded_without_trim(self):
+        with open("data/example.json") as f:
+            G = System.from_json(json.load(f))
+        train = G.trains[0]
+
+        lengths = set()
+        for _ in range(500):
+            G.step(0.75)
+            lengths.add(len(train.history))
+
+        # A 10 long train never covers more than two of the 12/10/14 tracks.
+        self.assertLessEqual(max(lengths), 2)
+        covered = train.head_distance + sum(
+            branch.track.length for branch in list(train.history)[1:]
+        )
+        self.assertGreaterEqual(covered, train.length)
+
+    def test_tail_kept_after_crossing_a_whole_track(self):
+        G = load("test/data/loop_system.json")
+        train = G.train_map["T1"]
+
+        G.step(4.0)  # head reaches B
+        G.step(8.0)  # head runs through B-C, 2 into C's diverging track
+
+        self.assertEqual(
+            [branch.tag for branch in train.history],
+            ["C_diverging", "B_through"],
+        )
+        self.assertAlmostEqual(train.tail_distance, 2.0)
+
+    def test_placing_by_hand_keeps_the_tail(self):
+        G = load("test/data/loop_system.json")
+        t1 = G.train_map["T1"]
+        t2 = G.train_map["T2"]
+        A = G.switch_map["A"]
+        B = G.switch_map["B"]
+
+        t2.history = deque([A.through])
+        t2.head_distance = 11.0
+        # Set against T1's old head distance, the history alone would
+        # not reach back onto A-B.
+        t1.history = deque([B.through, A.through])
+        t1.head_distance = 1.0
+
+        self.assertEqual(
+            [branch.tag for branch in t1.history], ["B_through", "A_through"]
+        )
+        self.assertAlmostEqual(t1.tail_distance, 3.0)
+        collisions = G.detect_collisions()
+        self.assertEqual(
+            [(a.tag, b.tag) for a, b, _ in collisions], [("T1", "T2")]
+        )
+
+    def test_place_sets_position_at_once(self):
+        G = load("test/data/loop_system.json")
+        train = G.train_map["T1"]
+        A = G.switch_map["A"]
+        B = G.switch_map["B"]
+        C = G.switch_map["C"]
+
+        train.place(deque([B.through, A.through, C.through]), 5.0)
+
+        self.assertEqual(
+            [branch.tag for branch in train.history], ["B_through"]
+        )
+        self.assertAlmostEqual(train.head_distance, 5.0)
+
+    def test_tail_distance_behind_head_track(self):
+        with open("data/example.json") as f:
+            G = System.from_json(json.load(f))
+        train = G.trains[0]
+
+        G.step(2.0)  # head 1.2 + 12 -> 1.2 into the next track
+
+        self.assertIs(train.head_branch, G.switch_map["B"].through)
+        self.assertEqual(len(train.history), 2)
+        self.assertAlmostEqual(train.tail_distance, 10.0 - 1.2)
+
 
 class TestMultipleTrains(TestCase):
     def test_multiple_trains_move_independently(self):
@@ -0,0 +1,77 @@
+from unittest import TestCase
+
+from test.helpers import load
+
+
+def state(system):
+    return (
+        list(system.switch_states),
+        [
+            (
+                [branch.tag for branch in train.history],
+                train.head_distance,
+                train.speed,
+                train.tail_distance,
+            )
+            for train in system.trains
+        ],
+    )
+
+
+class TestSnapshot(TestCase):
+    def setUp(self):
+        self.G = load("test/data/loop_system.json")
+
+    def test_restore_returns_to_snapshot(self):
+        self.G.step(3.0)
+        snapshot = self.G.snapshot()
+        expected = state(self.G)
+
+        self.G.set_switch_state("B", True)
+        self.G.train_map["T2"].speed = 0.5
+        for _ in range(4):
+            self.G.step(1.0)
+        self.assertNotEqual(state(self.G), expected)
+
+        self.G.restore(snapshot)
+
+        self.assertEqual(state(self.G), expected)
+
+    def test_branching_runs_are_repeatable(self):
+        snapshot = self.G.snapshot()
+        runs = []
+        for _ in range(3):
+            self.G.restore(snapshot)
+            for _ in range(6):
+                self.G.step(1.0)
+            runs.append(state(self.G))
+
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(runs[1], runs[2])
+
+    def test_restore_keeps_collision_index_current(self):
+        t1 = self.G.train_map["T1"]
+        t2 = self.G.train_map["T2"]
+        snapshot = self.G.snapshot()
+        self.assertIsNone(self.G.detect_collisions())
+
+        t2.history = t1.history.copy()
+        t2.head_distance = t1.head_distance
+        self.assertIsNotNone(self.G.detect_collisions())
+
+        self.G.restore(snapshot)
+
+        self.assertIsNone(self.G.detect_collisions())
+
+    def test_snapshot_shares_layout(self):
+        snapshot = self.G.snapshot()
+
+        history = snapshot.trains[0][0]
+        self.assertIs(history[0], self.G.train_map["T1"].head_branch)
+
+    def test_restore_rejects_other_trains(self):
+        snapshot = self.G.snapshot()
+        self.G.trains.pop()
+
+        with self.assertRaises(ValueError):
+            self.G.restore(snapshot)
@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from trains.env.status import TrainStatus
+
+from test.helpers import load, make_collision_system
+
+
+class TestStepStatus(TestCase):
+    def test_dead_end(self):
+        G = load("test/data/simulate_system.json")
+
+        result = G.step_status(40.0)
+
+        self.assertEqual(list(result.status), [TrainStatus.DEAD_END])
+        self.assertEqual(list(result.partner), [-1])
+        train = G.trains[0]
+        self.assertEqual(train.head_branch.tag, "S2_through")
+        self.assertEqual(train.head_distance, 10.0)
+
+    def test_blocked_train_does_not_stop_others(self):
+        G = load("test/data/loop_system.json", {"T2": 0.1})
+
+        result = G.step_status(30.0)
+
+        self.assertEqual(
+            list(result.status), [TrainStatus.WRONG_WAY, TrainStatus.OK]
+        )
+        self.assertEqual(G.train_map["T1"].head_branch.tag, "C_diverging")
+        self.assertEqual(G.train_map["T2"].head_distance, 12.0)
+
+    def test_collision_partners(self):
+        G = make_collision_system()
+
+        result = G.step_status(2.0)
+
+        self.assertEqual(list(result.status), [TrainStatus.COLLISION] * 2)
+        self.assertEqual(list(result.partner), [1, 0])
+
+    def test_arrays_match_objects(self):
+        cases = [
+            (lambda: load("test/data/simulate_system.json"), 40.0),
+            (lambda: load("test/data/loop_system.json", {"T2": 0.1}), 30.0),
+            (make_collision_system, 2.0),
+        ]
+        for make, dt in cases:
+            expected = make().step_status(dt)
+            actual = make().to_arrays().step_status(dt)
+
+            self.assertEqual(list(actual.status), list(expected.status))
+            self.assertEqual(list(actual.partner), list(expected.partner))
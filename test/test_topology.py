@@ -0,0 +1,94 @@
+import json
+from unittest import TestCase
+
+from trains.env import System
+
+from test.helpers import load
+
+
+class TestSharedTopology(TestCase):
+    def setUp(self):
+        with open("test/data/loop_system.json") as f:
+            self.data = json.load(f)
+
+    def test_systems_share_layout(self):
+        a = System.from_json(self.data)
+        b = System.from_json(self.data)
+
+        self.assertIs(a.topology, b.topology)
+        self.assertIs(a.switch_map["B"], b.switch_map["B"])
+        self.assertIsNot(a.trains[0], b.trains[0])
+
+    def test_switch_states_are_per_system(self):
+        self.data["switches"][1]["state"] = True
+        a = System.from_json(self.data)
+        self.data["switches"][1]["state"] = False
+        b = System.from_json(self.data)
+
+        self.assertIs(a.topology, b.topology)
+        self.assertTrue(a.get_switch_state("B"))
+        self.assertFalse(b.get_switch_state("B"))
+
+        b.set_switch_state("B", True)
+        a.set_switch_state("B", False)
+
+        self.assertFalse(a.get_switch_state("B"))
+        self.assertTrue(b.get_switch_state("B"))
+
+    def test_trains_follow_their_own_system(self):
+        a = System.from_json(self.data)
+        b = System.from_json(self.data)
+        b.set_switch_state("B", True)
+
+        for _ in range(4):
+            a.step(1.0)
+            b.step(1.0)
+
+        self.assertEqual(a.train_map["T1"].head_branch.tag, "B_through")
+        self.assertEqual(b.train_map["T1"].head_branch.tag, "B_diverging")
+
+    def test_different_layouts_do_not_share(self):
+        a = System.from_json(self.data)
+        self.data["tracks"][0]["length"] += 1.0
+        b = System.from_json(self.data)
+
+        self.assertIsNot(a.topology, b.topology)
+        self.assertNotEqual(a.topology, b.topology)
+
+    def test_compiled_once(self):
+        a = System.from_json(self.data).to_arrays()
+        b = System.from_json(self.data).to_arrays()
+
+        self.assertIs(a.topology, b.topology)
+
+
+class TestTransitionTable(TestCase):
+    def setUp(self):
+        self.G = load("test/data/loop_system.json")
+
+    def test_exits_match_pass_through(self):
+        topology = self.G.topology
+        for branch, (index, unset, set_) in topology.exits.items():
+            arrival = branch.other()
+            for state, expected in ((False, unset), (True, set_)):
+                try:
+                    actual = arrival.parent.pass_through(arrival, state)
+                except Exception:
+                    actual = None
+                self.assertIs(actual, expected, branch.tag)
+            self.assertIs(topology.switches[index], arrival.parent)
+
+    def test_next_branch_uses_switch_state(self):
+        B = self.G.switch_map["B"]
+        A = self.G.switch_map["A"]
+
+        self.assertIs(self.G.next_branch(A.through), B.through)
+        self.G.set_switch_state("B", True)
+        self.assertIs(self.G.next_branch(A.through), B.diverge)
+
+    def test_wrong_way_is_blocked(self):
+        B = self.G.switch_map["B"]
+
+        # Leaving C along the diverging track arrives at B's diverging
+        # branch, which B blocks while it is unset.
+        self.assertIsNone(self.G.next_branch(B.diverge.other()))
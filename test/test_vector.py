@@ -0,0 +1,87 @@
+from unittest import TestCase
+
+import numpy as np
+
+from trains.env.status import TrainStatus
+from trains.env.vector import VectorSystem
+
+from test.helpers import load, make_collision_system
+
+
+class TestVectorSystem(TestCase):
+    def setUp(self):
+        self.V = VectorSystem(load("test/data/loop_system.json"), num_envs=3)
+
+    def test_envs_match_single_system(self):
+        actions = np.array(
+            [[False, False, True], [False, True, True], [False, False, False]]
+        )
+        dts = np.array([1.0, 0.5, 2.0])
+        references = [load("test/data/loop_system.json") for _ in range(3)]
+        for env, reference in enumerate(references):
+            reference.switch_states[:] = actions[env].tolist()
+
+        for _ in range(5):
+            result = self.V.step(actions, dts)
+            for env, reference in enumerate(references):
+                reference.step(dts[env])
+                self.assertEqual(
+                    [t.head_distance for t in reference.trains],
+                    list(result.head_distance[env]),
+                )
+                self.assertEqual(
+                    [t.head_branch.tag for t in reference.trains],
+                    [
+                        self.V.topology.branches[b].tag
+                        for b in result.head_branch[env]
+                    ],
+                )
+        self.assertFalse(result.terminated.any())
+
+    def test_rejects_flips_under_trains(self):
+        # T1 starts on the track leaving A's through branch.
+        actions = np.array([[True, False, True]] * 3)
+
+        result = self.V.step(actions, 0.0)
+
+        self.assertTrue(result.rejected[:, 0].all())
+        self.assertFalse(result.switch_state[:, 0].any())
+
+    def test_failed_env_is_reset(self):
+        dts = np.array([1.0, 1.0, 100.0])
+
+        result = self.V.step(None, dts)
+
+        self.assertEqual(list(result.terminated), [False, False, True])
+        # Both trains run into the blocked switch and end up overlapping;
+        # the collision takes precedence in the status.
+        self.assertEqual(
+            list(result.status[2]), [TrainStatus.COLLISION] * 2
+        )
+        self.assertEqual(list(result.partner[2]), [1, 0])
+        np.testing.assert_array_equal(
+            self.V.head_distance[4:], self.V.head_distance[:2] - 1.5
+        )
+        self.assertEqual(list(self.V.steps), [1, 1, 0])
+
+    def test_collision_terminates_env(self):
+        V = VectorSystem(make_collision_system(), num_envs=2)
+
+        result = V.step(None, np.array([1.0, 2.0]))
+
+        self.assertEqual(list(result.terminated), [False, True])
+        self.assertEqual(list(result.collided[1]), [True, True])
+        self.assertEqual(list(result.partner[1]), [1, 0])
+        self.assertEqual(list(V.head_distance), [5.0, 3.0, 5.0, 2.0])
+
+    def test_truncation(self):
+        V = VectorSystem(
+            load("test/data/loop_system.json"), num_envs=2, max_steps=2
+        )
+
+        V.step(None, 0.1)
+        result = V.step(None, 0.1)
+
+        self.assertTrue(result.truncated.all())
+        self.assertFalse(result.terminated.any())
+        self.assertEqual(list(V.steps), [0, 0])